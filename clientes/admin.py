@@ -29,6 +29,8 @@ class RemessaAdmin(admin.ModelAdmin):
         'cliente',
         'data_saida',
         'status',
+        'total_pecas',
+        'valor_total',
     )
     list_filter = ('status',)
     search_fields = ('cliente__nome_completo',)
@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ClientesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clientes'
+
+    def ready(self):
+        from elderCadastro.busca import reinstalar_triggers_busca
+        post_migrate.connect(reinstalar_triggers_busca, sender=self, dispatch_uid='reinstalar_triggers_busca')
@@ -0,0 +1,128 @@
+from decimal import Decimal
+import json
+from pathlib import Path
+import tempfile
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import RequestFactory
+
+from clientes.models import Cliente
+from elderCadastro import views
+from elderCadastro.banco import comando_inicial_sqlite, configuracao_sqlite
+from produtos.models import Produto
+
+# Configuração antiga: sem PRAGMAs, transações DEFERRED e a espera padrão do Python (5 s).
+CONFIGURACAO_ANTIGA = {'init_command': 'PRAGMA journal_mode=DELETE'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Simula vários terminais registrando vendas ao mesmo tempo (salvar_remessa_api) "
+        "e compara a configuração antiga do SQLite com a de elderCadastro/banco.py. "
+        "Usa um banco temporário, criado e apagado pelo próprio comando."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--terminais', type=int, default=8, help="Terminais (threads) simultâneos.")
+        parser.add_argument('--vendas', type=int, default=25, help="Vendas registradas por terminal.")
+        parser.add_argument('--itens', type=int, default=3, help="Produtos por venda.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stderr.write("Este benchmark é específico do SQLite.")
+            return
+
+        cenarios = [
+            ("Antes (DEFERRED, journal DELETE)", CONFIGURACAO_ANTIGA),
+            ("Depois (WAL + BEGIN IMMEDIATE)", configuracao_sqlite('')['OPTIONS']),
+        ]
+        for titulo, opcoes in cenarios:
+            resultado = self._executar_cenario(opcoes, options)
+            self.stdout.write(
+                f"{titulo}: {resultado['sucesso']} vendas ok, {resultado['erros']} erros "
+                f"({resultado['bloqueios']} 'database is locked'), "
+                f"{resultado['vendas_por_segundo']:.1f} vendas/s, "
+                f"p95 {resultado['p95_ms']:.1f} ms"
+            )
+        self.stdout.write(f"PRAGMAs aplicados: {comando_inicial_sqlite()}")
+
+    def _executar_cenario(self, opcoes, options):
+        # O banco de teste padrão do SQLite fica em memória; aqui precisa ser um arquivo.
+        opcoes_originais = connection.settings_dict['OPTIONS']
+        teste_original = connection.settings_dict['TEST']
+        pasta = tempfile.TemporaryDirectory()
+        connection.settings_dict['OPTIONS'] = opcoes
+        connection.settings_dict['TEST'] = dict(teste_original, NAME=str(Path(pasta.name) / 'benchmark.sqlite3'))
+        connection.close()
+        nome_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            return self._simular_terminais(options)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+            connection.settings_dict['OPTIONS'] = opcoes_originais
+            connection.settings_dict['TEST'] = teste_original
+            pasta.cleanup()
+
+    def _simular_terminais(self, options):
+        usuario = get_user_model().objects.create_user('benchmark')
+        cliente = Cliente.objects.create(
+            nome_completo='Cliente Benchmark', cpf_cnpj='000.000.000-99', telefone_whatsapp='0',
+            cep='0', cidade='-', estado='SP', bairro='-', rua='-', numero='0',
+        )
+        total_vendas = options['terminais'] * options['vendas']
+        produtos = [
+            Produto.objects.create(nome=f'Produto {i}', custo=Decimal('10.00'), margem_lucro=Decimal('100'), estoque=total_vendas)
+            for i in range(20)
+        ]
+        connection.close()
+
+        fabrica = RequestFactory()
+        tempos, erros = [], []
+        trava = threading.Lock()
+        largada = threading.Barrier(options['terminais'])
+
+        def terminal(numero):
+            largada.wait()
+            for venda in range(options['vendas']):
+                inicio_produto = (numero * options['vendas'] + venda) % len(produtos)
+                itens = [
+                    {'id': produtos[(inicio_produto + k) % len(produtos)].id, 'quantidade': 1}
+                    for k in range(options['itens'])
+                ]
+                request = fabrica.post('/', data=json.dumps({
+                    'cliente_id': cliente.id, 'tipo_remessa': 'VENDA',
+                    'forma_pagamento': 'PIX', 'produtos': itens,
+                }), content_type='application/json')
+                request.user = usuario
+
+                inicio = time.perf_counter()
+                resposta = views.salvar_remessa_api(request)
+                duracao = (time.perf_counter() - inicio) * 1000
+                with trava:
+                    if resposta.status_code == 200:
+                        tempos.append(duracao)
+                    else:
+                        erros.append(json.loads(resposta.content)['message'])
+            connections.close_all()
+
+        threads = [threading.Thread(target=terminal, args=(i,)) for i in range(options['terminais'])]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duracao_total = time.perf_counter() - inicio
+
+        tempos.sort()
+        return {
+            'sucesso': len(tempos),
+            'erros': len(erros),
+            'bloqueios': sum('locked' in erro for erro in erros),
+            'vendas_por_segundo': len(tempos) / duracao_total,
+            'p95_ms': tempos[int(len(tempos) * 0.95) - 1] if tempos else 0.0,
+        }
@@ -0,0 +1,97 @@
+import threading
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import RequestFactory
+from django.urls import reverse
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga das estratégias de conexão com o banco. Dispara requisições "
+        "concorrentes pelo handler WSGI completo (middlewares e sinais de início/fim de "
+        "requisição) e compara: uma conexão por requisição, conexões persistentes e, no "
+        "PostgreSQL, o pool nativo do Django. Use ELDER_BANCO=postgres e ELDER_PG_* para "
+        "medir contra um PostgreSQL local."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=8, help="Clientes (threads) simultâneos.")
+        parser.add_argument('--requisicoes', type=int, default=200, help="Requisições por cliente.")
+        parser.add_argument('--url', default=None, help="URL testada (padrão: API do catálogo de produtos).")
+
+    def handle(self, *args, **options):
+        url = options['url'] or reverse('produto_catalogo_api')
+        configuracao = connection.settings_dict
+        originais = {chave: configuracao[chave] for chave in ('CONN_MAX_AGE', 'OPTIONS')}
+
+        cenarios = [
+            ("Uma conexão por requisição (CONN_MAX_AGE=0)", {'CONN_MAX_AGE': 0}),
+            ("Conexões persistentes (CONN_MAX_AGE=600)", {'CONN_MAX_AGE': 600}),
+        ]
+        if connection.vendor == 'postgresql':
+            opcoes_pool = dict(originais['OPTIONS'], pool={'min_size': 2, 'max_size': options['clientes']})
+            cenarios.append(("Pool nativo do Django", {'CONN_MAX_AGE': 0, 'OPTIONS': opcoes_pool}))
+
+        self.stdout.write(f"Banco: {connection.vendor}, URL: {url}")
+        try:
+            for titulo, ajustes in cenarios:
+                self._fechar_conexoes()
+                configuracao.update(originais)
+                configuracao.update(ajustes)
+                resultado = self._executar(url, options['clientes'], options['requisicoes'])
+                self.stdout.write(
+                    f"{titulo}: {resultado['por_segundo']:.1f} req/s, "
+                    f"p95 {resultado['p95_ms']:.1f} ms, {resultado['erros']} erros"
+                )
+        finally:
+            self._fechar_conexoes()
+            configuracao.update(originais)
+
+    def _fechar_conexoes(self):
+        connections.close_all()
+        if hasattr(connection, 'close_pool'):
+            connection.close_pool()
+
+    def _executar(self, url, total_clientes, total_requisicoes):
+        handler = WSGIHandler()
+        fabrica = RequestFactory(HTTP_HOST='localhost')
+        tempos, erros = [], []
+        trava = threading.Lock()
+        largada = threading.Barrier(total_clientes)
+
+        def iniciar_resposta(status, cabecalhos, exc_info=None):
+            return None
+
+        def cliente():
+            largada.wait()
+            for _ in range(total_requisicoes):
+                environ = fabrica.get(url).environ
+                inicio = time.perf_counter()
+                resposta = handler(environ, iniciar_resposta)
+                b''.join(resposta)
+                resposta.close()  # dispara request_finished, que fecha (ou não) a conexão
+                duracao = (time.perf_counter() - inicio) * 1000
+                with trava:
+                    if resposta.status_code == 200:
+                        tempos.append(duracao)
+                    else:
+                        erros.append(resposta.status_code)
+            connections.close_all()
+
+        threads = [threading.Thread(target=cliente) for _ in range(total_clientes)]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duracao_total = time.perf_counter() - inicio
+
+        tempos.sort()
+        return {
+            'por_segundo': len(tempos) / duracao_total,
+            'p95_ms': tempos[int(len(tempos) * 0.95) - 1] if tempos else 0.0,
+            'erros': len(erros),
+        }
@@ -0,0 +1,90 @@
+from decimal import Decimal
+import os
+from pathlib import Path
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from clientes.models import Cliente, ItemRemessa, Remessa
+from elderCadastro.exportacao import exportar_recibos
+from produtos.models import Produto
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a vazão da exportação de recibos em lote (recibos por segundo, no total "
+        "e por processo) com diferentes quantidades de processos. Usa um banco "
+        "temporário, criado e apagado pelo próprio comando."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--remessas', type=int, default=200, help="Remessas exportadas.")
+        parser.add_argument('--itens', type=int, default=30, help="Itens por remessa.")
+        parser.add_argument(
+            '--processos', default=f"1,{os.cpu_count() or 1}",
+            help="Quantidades de processos a comparar, separadas por vírgula."
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stderr.write("Este benchmark é específico do SQLite.")
+            return
+
+        # O banco de teste padrão do SQLite fica em memória; aqui precisa ser um
+        # arquivo, que os processos filhos abrem pela variável ELDER_SQLITE_CAMINHO.
+        teste_original = connection.settings_dict['TEST']
+        caminho_original = os.environ.get('ELDER_SQLITE_CAMINHO')
+        pasta = tempfile.TemporaryDirectory()
+        caminho_banco = str(Path(pasta.name) / 'benchmark.sqlite3')
+        connection.settings_dict['TEST'] = dict(teste_original, NAME=caminho_banco)
+        os.environ['ELDER_SQLITE_CAMINHO'] = caminho_banco
+        connection.close()
+        nome_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            remessa_ids = self._criar_dados(options['remessas'], options['itens'])
+            self.stdout.write(
+                f"{len(remessa_ids)} remessas com {options['itens']} itens cada "
+                f"({os.cpu_count()} CPU(s) disponíveis)"
+            )
+            for processos in sorted({int(p) for p in options['processos'].split(',')}):
+                resultado = exportar_recibos(
+                    remessa_ids, Path(pasta.name) / f'recibos_{processos}.zip', processos=processos
+                )
+                self.stdout.write(
+                    f"  {processos} processo(s): {resultado['segundos']:.2f} s, "
+                    f"{resultado['recibos_por_segundo']:.1f} recibos/s, "
+                    f"{resultado['recibos_por_segundo'] / processos:.1f} recibos/s por processo"
+                )
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+            connection.settings_dict['TEST'] = teste_original
+            if caminho_original is None:
+                os.environ.pop('ELDER_SQLITE_CAMINHO', None)
+            else:
+                os.environ['ELDER_SQLITE_CAMINHO'] = caminho_original
+            pasta.cleanup()
+
+    def _criar_dados(self, total_remessas, itens_por_remessa):
+        cliente = Cliente.objects.create(
+            nome_completo='Cliente Benchmark', cpf_cnpj='000.000.000-99', telefone_whatsapp='0',
+            cep='0', cidade='-', estado='SP', bairro='-', rua='-', numero='0',
+        )
+        produtos = [
+            Produto.objects.create(nome=f'Produto {i}', custo=Decimal('10.00'), margem_lucro=Decimal('100'))
+            for i in range(itens_por_remessa)
+        ]
+        remessas = Remessa.objects.bulk_create(
+            Remessa(cliente=cliente, status='FINALIZADO') for _ in range(total_remessas)
+        )
+        # Direto com bulk_create: o benchmark não precisa das regras de estoque.
+        ItemRemessa.objects.bulk_create(
+            ItemRemessa(
+                remessa=remessa, produto=produto, quantidade=1,
+                preco_venda_unitario_na_saida=produto.preco_venda, status_item='VENDIDO',
+            )
+            for remessa in remessas
+            for produto in produtos
+        )
+        return [remessa.id for remessa in remessas]
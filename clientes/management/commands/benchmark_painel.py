@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from clientes.models import Cliente, ItemRemessa, Remessa
+from elderCadastro.painel import calcular_estatisticas_painel
+from produtos.models import Produto
+
+
+class _Desfazer(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o tempo dos números do painel inicial com muitos itens de remessa. "
+        "Os dados de teste são criados dentro de uma transação que é desfeita no final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--itens', type=int, default=1_000_000, help="Quantidade de itens de remessa criados.")
+        parser.add_argument('--produtos', type=int, default=1000, help="Produtos distintos (itens por remessa).")
+        parser.add_argument('--sem-antigo', action='store_true', help="Não mede o cálculo antigo (laço em Python).")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._criar_dados(options['itens'], options['produtos'])
+                self._medir(options['sem_antigo'])
+                raise _Desfazer()
+        except _Desfazer:
+            self.stdout.write("Dados de teste removidos (transação desfeita).")
+
+    def _criar_dados(self, total_itens, total_produtos):
+        inicio = time.perf_counter()
+        cliente = Cliente.objects.create(
+            nome_completo='Cliente Benchmark', cpf_cnpj='000.000.000-99', telefone_whatsapp='0',
+            cep='0', cidade='-', estado='SP', bairro='-', rua='-', numero='0',
+        )
+        produtos = Produto.objects.bulk_create([
+            Produto(nome=f'Produto Benchmark {i}', preco_venda='50.00', estoque=10, codigo_barras=f'9{i:012d}')
+            for i in range(total_produtos)
+        ])
+        total_remessas = -(-total_itens // total_produtos)
+        remessas = Remessa.objects.bulk_create([Remessa(cliente=cliente) for _ in range(total_remessas)])
+
+        status = [ItemRemessa.StatusItem.CONSIGNADO, ItemRemessa.StatusItem.VENDIDO, ItemRemessa.StatusItem.DEVOLVIDO]
+        lote = []
+        criados = 0
+        for remessa in remessas:
+            for produto in produtos:
+                if criados == total_itens:
+                    break
+                lote.append(ItemRemessa(
+                    remessa=remessa, produto=produto, quantidade=1 + criados % 5,
+                    preco_venda_unitario_na_saida='50.00', status_item=status[criados % 3],
+                ))
+                criados += 1
+                if len(lote) == 10_000:
+                    ItemRemessa.objects.bulk_create(lote)
+                    lote.clear()
+        ItemRemessa.objects.bulk_create(lote)
+        self.stdout.write(f"{criados} itens criados em {time.perf_counter() - inicio:.1f} s")
+
+    def _medir(self, sem_antigo):
+        if not sem_antigo:
+            inicio = time.perf_counter()
+            pecas, valor = 0, 0
+            for item in ItemRemessa.objects.filter(status_item='CONSIGNADO'):
+                pecas += item.quantidade
+                valor += item.preco_venda_unitario_na_saida * item.quantidade
+            Produto.get_valor_total_estoque()
+            Produto.get_quantidade_total_estoque()
+            self.stdout.write(f"Antes (laço em Python + 2 agregações): {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+        inicio = time.perf_counter()
+        calcular_estatisticas_painel()
+        self.stdout.write(f"Depois (2 agregações, índice de cobertura): {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+        if connection.vendor == 'sqlite':
+            consulta = ItemRemessa.objects.filter(status_item='CONSIGNADO').values('quantidade', 'preco_venda_unitario_na_saida')
+            self.stdout.write(f"Plano da consulta dos consignados: {consulta.explain()}")
@@ -0,0 +1,43 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from elderCadastro.gerarRecibo import LinhaRecibo, gerar_recibo_pdf
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o tempo de geração e o tamanho do PDF de um recibo com muitas linhas. "
+        "Não usa o banco de dados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=2000, help="Quantidade de linhas do recibo.")
+        parser.add_argument('--repeticoes', type=int, default=5, help="Quantas vezes o recibo é gerado.")
+
+    def handle(self, *args, **options):
+        linhas = options['linhas']
+
+        def gerar_linhas():
+            for i in range(1, linhas + 1):
+                yield LinhaRecibo(f'Produto de teste {i}', Decimal('10.00') + i % 50, 1 + i % 3, f'{i:013d}')
+
+        tempos = []
+        for _ in range(options['repeticoes']):
+            inicio = time.perf_counter()
+            resultado = gerar_recibo_pdf(
+                linhas=gerar_linhas(),
+                nome_cliente='Cliente Benchmark',
+                situacao='EM ABERTO',
+                data_nota='01/01/2025',
+                remessa_id=1,
+                retornar_bytes=True,
+            )
+            tempos.append(time.perf_counter() - inicio)
+
+        tamanho = len(resultado['pdf_bytes'])
+        paginas = resultado['pdf_bytes'].count(b'/Type /Page\n')
+        self.stdout.write(f"Recibo com {linhas} linhas ({paginas} páginas)")
+        self.stdout.write(f"  melhor tempo: {min(tempos) * 1000:.1f} ms")
+        self.stdout.write(f"  tamanho do PDF: {tamanho / 1024:.1f} KiB")
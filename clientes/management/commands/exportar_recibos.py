@@ -0,0 +1,58 @@
+from datetime import date
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from elderCadastro.exportacao import exportar_recibos, filtrar_remessas_exportacao
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera os recibos de todas as remessas de um período (filtros opcionais de "
+        "status e cliente) em paralelo e grava todos em um único arquivo ZIP."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', type=date.fromisoformat, help="Data inicial da saída (AAAA-MM-DD).")
+        parser.add_argument('--fim', type=date.fromisoformat, help="Data final da saída, inclusive (AAAA-MM-DD).")
+        parser.add_argument('--status', default='', choices=['', 'ABERTO', 'FINALIZADO'], help="Status das remessas.")
+        parser.add_argument('--cliente', type=int, help="ID do cliente.")
+        parser.add_argument(
+            '--processos', type=int, default=os.cpu_count() or 1,
+            help="Quantidade de processos geradores de PDF (padrão: número de CPUs)."
+        )
+        parser.add_argument('--saida', default='recibos.zip', help="Arquivo ZIP de destino.")
+
+    def handle(self, *args, **options):
+        if options['inicio'] and options['fim'] and options['inicio'] > options['fim']:
+            raise CommandError("A data inicial é depois da data final.")
+
+        remessa_ids = filtrar_remessas_exportacao(
+            inicio=options['inicio'],
+            fim=options['fim'],
+            status=options['status'],
+            cliente_id=options['cliente'],
+        )
+        if not remessa_ids:
+            self.stdout.write("Nenhuma remessa encontrada com esses filtros.")
+            return
+
+        processos = max(1, options['processos'])
+        self.stdout.write(f"Exportando {len(remessa_ids)} recibo(s) com {processos} processo(s)...")
+
+        ultimo_decimo = [0]
+
+        def progresso(concluidos, total):
+            # Uma linha a cada 10% concluído.
+            decimo = concluidos * 10 // total
+            if decimo > ultimo_decimo[0]:
+                ultimo_decimo[0] = decimo
+                self.stdout.write(f"  {concluidos}/{total} recibos ({decimo * 10}%)")
+
+        resultado = exportar_recibos(remessa_ids, options['saida'], processos=processos, progresso=progresso)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['recibos']} recibo(s) gravados em {options['saida']} "
+            f"em {resultado['segundos']:.1f} s ({resultado['recibos_por_segundo']:.1f} recibos/s, "
+            f"{resultado['recibos_por_segundo'] / processos:.1f} por processo)."
+        ))
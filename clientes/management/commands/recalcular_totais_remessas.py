@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from clientes.models import Remessa
+from elderCadastro.banco import transacao_escrita
+
+
+class Command(BaseCommand):
+    help = "Reconstrói os totais armazenados (peças e valores) de todas as remessas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help="Remessas recalculadas por transação.")
+
+    def handle(self, *args, **options):
+        ids = list(Remessa.objects.order_by('pk').values_list('pk', flat=True))
+        lote = options['lote']
+
+        for inicio in range(0, len(ids), lote):
+            with transacao_escrita():
+                Remessa.recalcular_totais(ids[inicio:inicio + lote])
+
+        self.stdout.write(self.style.SUCCESS(f"Totais recalculados para {len(ids)} remessa(s)."))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:56
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0006_alter_remessa_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='remessa',
+            name='total_pecas',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Total de Peças'),
+        ),
+        migrations.AddField(
+            model_name='remessa',
+            name='valor_consignado',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12, verbose_name='Valor Ainda Consignado'),
+        ),
+        migrations.AddField(
+            model_name='remessa',
+            name='valor_devolvido',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12, verbose_name='Valor Devolvido'),
+        ),
+        migrations.AddField(
+            model_name='remessa',
+            name='valor_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12, verbose_name='Valor Total'),
+        ),
+        migrations.AddField(
+            model_name='remessa',
+            name='valor_vendido',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12, verbose_name='Valor Vendido'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, Q, Sum
+
+
+def preencher_totais(apps, schema_editor):
+    Remessa = apps.get_model('clientes', 'Remessa')
+    ItemRemessa = apps.get_model('clientes', 'ItemRemessa')
+
+    valor_item = F('quantidade') * F('preco_venda_unitario_na_saida')
+    totais = ItemRemessa.objects.values('remessa_id').annotate(
+        pecas=Sum('quantidade'),
+        valor=Sum(valor_item, output_field=models.DecimalField()),
+        vendido=Sum(valor_item, filter=Q(status_item='VENDIDO'), output_field=models.DecimalField()),
+        devolvido=Sum(valor_item, filter=Q(status_item='DEVOLVIDO'), output_field=models.DecimalField()),
+        consignado=Sum(valor_item, filter=Q(status_item='CONSIGNADO'), output_field=models.DecimalField()),
+    )
+
+    remessas = []
+    for linha in totais:
+        remessas.append(Remessa(
+            pk=linha['remessa_id'],
+            total_pecas=linha['pecas'] or 0,
+            valor_total=linha['valor'] or Decimal('0.00'),
+            valor_vendido=linha['vendido'] or Decimal('0.00'),
+            valor_devolvido=linha['devolvido'] or Decimal('0.00'),
+            valor_consignado=linha['consignado'] or Decimal('0.00'),
+        ))
+    Remessa.objects.bulk_update(
+        remessas,
+        ['total_pecas', 'valor_total', 'valor_vendido', 'valor_devolvido', 'valor_consignado'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0007_remessa_totais_armazenados'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_totais, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0008_preencher_totais_remessa'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='remessa',
+            index=models.Index(fields=['-data_saida', '-id'], name='remessa_data_saida_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='remessa',
+            index=models.Index(fields=['status', '-data_saida', '-id'], name='remessa_status_data_idx'),
+        ),
+    ]
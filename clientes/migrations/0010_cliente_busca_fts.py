@@ -0,0 +1,78 @@
+from django.db import migrations
+
+# CPF/CNPJ e telefone entram no índice só com os dígitos.
+DOCUMENTO = "replace(replace(replace({0}.cpf_cnpj, '.', ''), '-', ''), '/', '')"
+TELEFONE = "replace(replace(replace(replace({0}.telefone_whatsapp, '(', ''), ')', ''), '-', ''), ' ', '')"
+
+SQL_CRIAR = [
+    """
+    CREATE VIRTUAL TABLE cliente_busca USING fts5(
+        nome, documento, telefone,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER cliente_busca_ai AFTER INSERT ON clientes_cliente BEGIN
+        INSERT INTO cliente_busca(rowid, nome, documento, telefone)
+        VALUES (new.id, new.nome_completo, {DOCUMENTO.format('new')}, {TELEFONE.format('new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER cliente_busca_au AFTER UPDATE OF nome_completo, cpf_cnpj, telefone_whatsapp ON clientes_cliente BEGIN
+        UPDATE cliente_busca
+        SET nome = new.nome_completo, documento = {DOCUMENTO.format('new')}, telefone = {TELEFONE.format('new')}
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER cliente_busca_ad AFTER DELETE ON clientes_cliente BEGIN
+        DELETE FROM cliente_busca WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    INSERT INTO cliente_busca(rowid, nome, documento, telefone)
+    SELECT id, nome_completo, {DOCUMENTO.format('clientes_cliente')}, {TELEFONE.format('clientes_cliente')}
+    FROM clientes_cliente
+    """,
+]
+
+SQL_REMOVER = [
+    "DROP TRIGGER IF EXISTS cliente_busca_ai",
+    "DROP TRIGGER IF EXISTS cliente_busca_au",
+    "DROP TRIGGER IF EXISTS cliente_busca_ad",
+    "DROP TABLE IF EXISTS cliente_busca",
+]
+
+
+def fts5_disponivel(conexao):
+    if conexao.vendor != 'sqlite':
+        return False
+    with conexao.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+class RunSQLComFTS5(migrations.RunSQL):
+    """
+    RunSQL aplicado só no SQLite com FTS5. Nos outros casos a busca usa
+    '__icontains' (ver elderCadastro/busca.py).
+    """
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if fts5_disponivel(schema_editor.connection):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0009_remessa_indices_historico'),
+    ]
+
+    operations = [
+        RunSQLComFTS5(SQL_CRIAR, SQL_REMOVER),
+    ]
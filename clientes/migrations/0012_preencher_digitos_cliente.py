@@ -0,0 +1,25 @@
+import re
+
+from django.db import migrations
+
+
+def preencher_digitos(apps, schema_editor):
+    Cliente = apps.get_model('clientes', 'Cliente')
+
+    clientes = []
+    for cliente in Cliente.objects.only('cpf_cnpj', 'telefone_whatsapp').iterator(chunk_size=1000):
+        cliente.cpf_cnpj_digitos = re.sub(r'\D', '', cliente.cpf_cnpj or '')
+        cliente.telefone_digitos = re.sub(r'\D', '', cliente.telefone_whatsapp or '')
+        clientes.append(cliente)
+    Cliente.objects.bulk_update(clientes, ['cpf_cnpj_digitos', 'telefone_digitos'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0011_cliente_digitos_busca'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_digitos, migrations.RunPython.noop),
+    ]
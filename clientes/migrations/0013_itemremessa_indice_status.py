@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0012_preencher_digitos_cliente'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='itemremessa',
+            index=models.Index(fields=['status_item', 'quantidade', 'preco_venda_unitario_na_saida'], name='itemremessa_status_idx'),
+        ),
+    ]
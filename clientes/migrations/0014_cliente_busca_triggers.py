@@ -0,0 +1,65 @@
+from django.db import migrations
+
+# A migração 0011 recria a tabela clientes_cliente (o SQLite não adiciona
+# colunas indexadas no lugar), e os triggers do índice de busca somem junto.
+# Aqui eles são criados de novo e o índice é recarregado, já que alterações
+# feitas sem os triggers não chegaram a ele.
+
+DOCUMENTO = "replace(replace(replace({0}.cpf_cnpj, '.', ''), '-', ''), '/', '')"
+TELEFONE = "replace(replace(replace(replace({0}.telefone_whatsapp, '(', ''), ')', ''), '-', ''), ' ', '')"
+
+SQL_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS cliente_busca_ai AFTER INSERT ON clientes_cliente BEGIN
+        INSERT INTO cliente_busca(rowid, nome, documento, telefone)
+        VALUES (new.id, new.nome_completo, {DOCUMENTO.format('new')}, {TELEFONE.format('new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS cliente_busca_au
+    AFTER UPDATE OF nome_completo, cpf_cnpj, telefone_whatsapp ON clientes_cliente BEGIN
+        UPDATE cliente_busca
+        SET nome = new.nome_completo, documento = {DOCUMENTO.format('new')}, telefone = {TELEFONE.format('new')}
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cliente_busca_ad AFTER DELETE ON clientes_cliente BEGIN
+        DELETE FROM cliente_busca WHERE rowid = old.id;
+    END
+    """,
+    "DELETE FROM cliente_busca",
+    f"""
+    INSERT INTO cliente_busca(rowid, nome, documento, telefone)
+    SELECT id, nome_completo, {DOCUMENTO.format('clientes_cliente')}, {TELEFONE.format('clientes_cliente')}
+    FROM clientes_cliente
+    """,
+]
+
+
+def indice_busca_existe(conexao):
+    if conexao.vendor != 'sqlite':
+        return False
+    with conexao.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cliente_busca'")
+        return cursor.fetchone() is not None
+
+
+class RunSQLComIndiceBusca(migrations.RunSQL):
+    """
+    RunSQL aplicado só se o índice FTS5 foi criado pela migração 0010.
+    """
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if indice_busca_existe(schema_editor.connection):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0013_itemremessa_indice_status'),
+    ]
+
+    operations = [
+        RunSQLComIndiceBusca(SQL_TRIGGERS, migrations.RunSQL.noop),
+    ]
@@ -1,13 +1,22 @@
 # -*- coding: utf-8 -*-
 
 from django.db import models
-from django.db.models import Sum, F
+from django.db.models import Sum, F, Q
 from django.utils import timezone
 from decimal import Decimal
+import re
 
 # É necessário importar o seu modelo de Produto para criar a relação
 # Ajuste o caminho 'seu_app.models' se o modelo Produto estiver em outro lugar.
 from produtos.models import Produto 
+from produtos.estoque import devolver_estoque, reservar_estoque
+from elderCadastro.painel import invalidar_painel
+
+def somente_digitos(valor):
+    """
+    Remove a formatação de CPF/CNPJ e telefone, deixando só os dígitos.
+    """
+    return re.sub(r'\D', '', valor or '')
 
 # Model 1: Cliente / Fornecedor (O "Quem")
 # Centraliza as informações de contato. Um booleano diferencia clientes de fornecedores.
@@ -110,6 +119,24 @@ class Cliente(models.Model):
         help_text="Informe o complemento do endereço (se houver)."
     )
     
+    # --- Campos de Busca ---
+    # Cópias só com os dígitos do documento e do telefone, mantidas no save(),
+    # para que a busca por números use o índice em vez de '__icontains'.
+    cpf_cnpj_digitos = models.CharField(
+        max_length=14,
+        db_index=True,
+        editable=False,
+        blank=True,
+        default=''
+    )
+    telefone_digitos = models.CharField(
+        max_length=15,
+        db_index=True,
+        editable=False,
+        blank=True,
+        default=''
+    )
+
     # --- Campos de Controle ---
     data_cadastro = models.DateTimeField(
         verbose_name='Data de Cadastro',
@@ -128,6 +155,14 @@ class Cliente(models.Model):
         else:
             return f"{self.nome_completo} (Cliente)"
 
+    def save(self, *args, **kwargs):
+        self.cpf_cnpj_digitos = somente_digitos(self.cpf_cnpj)
+        self.telefone_digitos = somente_digitos(self.telefone_whatsapp)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'cpf_cnpj_digitos', 'telefone_digitos'}
+        super().save(*args, **kwargs)
+
     # --- Métodos de Negócio ---
     def get_saldo_devedor_total(self):
         """
@@ -185,55 +220,121 @@ class Remessa(models.Model):
         verbose_name="Status da Remessa"
     )
 
+    # --- Totais Armazenados ---
+    # Mantidos por atualizar_totais() sempre que os itens mudam, para que as
+    # listagens não precisem agregar os itens de cada remessa.
+    # O comando 'recalcular_totais_remessas' reconstrói todos eles.
+    total_pecas = models.PositiveIntegerField(
+        verbose_name="Total de Peças",
+        default=0,
+        editable=False
+    )
+    valor_total = models.DecimalField(
+        verbose_name="Valor Total",
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False
+    )
+    valor_vendido = models.DecimalField(
+        verbose_name="Valor Vendido",
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False
+    )
+    valor_devolvido = models.DecimalField(
+        verbose_name="Valor Devolvido",
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False
+    )
+    valor_consignado = models.DecimalField(
+        verbose_name="Valor Ainda Consignado",
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False
+    )
+
     class Meta:
         verbose_name = "Remessa de Consignado"
         verbose_name_plural = "Remessas de Consignado"
         ordering = ['-data_saida']
+        indexes = [
+            # Paginação por cursor do histórico (ordem -data_saida, -id).
+            models.Index(fields=['-data_saida', '-id'], name='remessa_data_saida_idx'),
+            models.Index(fields=['status', '-data_saida', '-id'], name='remessa_status_data_idx'),
+        ]
 
     def __str__(self):
         return f"Remessa de {self.cliente.nome_completo} em {self.data_saida.strftime('%d/%m/%Y')}"
 
     # --- Métodos de Negócio ---
-    def calcular_totais(self):
+    CAMPOS_TOTAIS = ['total_pecas', 'valor_total', 'valor_vendido', 'valor_devolvido', 'valor_consignado']
+
+    @classmethod
+    def recalcular_totais(cls, remessa_ids):
         """
-        Calcula os totais de itens vendidos, devolvidos e ainda em posse do cliente
-        para ESTA remessa específica.
+        Recalcula e grava os totais armazenados das remessas informadas,
+        com uma única agregação agrupada e um único bulk_update.
+        Retorna a lista de remessas atualizadas.
         """
-        itens = self.itens.all() # Usando o related_name 'itens' do ItemRemessa
-        
-        total_vendido = itens.filter(status_item='VENDIDO').aggregate(
-            total=Sum(F('quantidade') * F('preco_venda_unitario_na_saida'))
-        )['total'] or Decimal('0.00')
-        
-        total_devolvido = itens.filter(status_item='DEVOLVIDO').aggregate(
-            total=Sum(F('quantidade') * F('preco_venda_unitario_na_saida'))
-        )['total'] or Decimal('0.00')
+        valor_item = F('quantidade') * F('preco_venda_unitario_na_saida')
+        totais = {
+            linha['remessa_id']: linha
+            for linha in ItemRemessa.objects.filter(remessa_id__in=remessa_ids).values('remessa_id').annotate(
+                pecas=Sum('quantidade'),
+                valor=Sum(valor_item, output_field=models.DecimalField()),
+                vendido=Sum(valor_item, filter=Q(status_item='VENDIDO'), output_field=models.DecimalField()),
+                devolvido=Sum(valor_item, filter=Q(status_item='DEVOLVIDO'), output_field=models.DecimalField()),
+                consignado=Sum(valor_item, filter=Q(status_item='CONSIGNADO'), output_field=models.DecimalField()),
+            )
+        }
 
-        total_consignado = itens.filter(status_item='CONSIGNADO').aggregate(
-            total=Sum(F('quantidade') * F('preco_venda_unitario_na_saida'))
-        )['total'] or Decimal('0.00')
+        remessas = list(cls.objects.filter(pk__in=remessa_ids).only('pk'))
+        for remessa in remessas:
+            linha = totais.get(remessa.pk, {})
+            remessa.total_pecas = linha.get('pecas') or 0
+            remessa.valor_total = linha.get('valor') or Decimal('0.00')
+            remessa.valor_vendido = linha.get('vendido') or Decimal('0.00')
+            remessa.valor_devolvido = linha.get('devolvido') or Decimal('0.00')
+            remessa.valor_consignado = linha.get('consignado') or Decimal('0.00')
+        cls.objects.bulk_update(remessas, cls.CAMPOS_TOTAIS)
+        return remessas
 
+    def atualizar_totais(self):
+        """
+        Recalcula os totais armazenados desta remessa a partir dos seus itens.
+        Deve ser chamado por todo código que cria, altera ou remove itens.
+        """
+        atualizada = self.recalcular_totais([self.pk])[0]
+        for campo in self.CAMPOS_TOTAIS:
+            setattr(self, campo, getattr(atualizada, campo))
+
+    def calcular_totais(self):
+        """
+        Retorna os totais de itens vendidos, devolvidos e ainda em posse do cliente
+        para ESTA remessa específica.
+        """
         return {
-            'vendido': total_vendido,
-            'devolvido': total_devolvido,
-            'ainda_consignado': total_consignado,
+            'vendido': self.valor_vendido,
+            'devolvido': self.valor_devolvido,
+            'ainda_consignado': self.valor_consignado,
         }
     
     def get_total_pecas(self):
         """
         Retorna o total de peças (itens) que estão nesta remessa.
         """
-        return self.itens.aggregate(total=Sum('quantidade'))['total'] or 0
+        return self.total_pecas
     
     def get_valor_total(self):
         """
         Retorna o valor total de todos os itens nesta remessa.
         """
-        valor_total = self.itens.aggregate(
-            total=Sum(F('quantidade') * F('preco_venda_unitario_na_saida'), output_field=models.DecimalField())
-        )['total'] or Decimal('0.00')
-
-        valor_total_string_formatted = f"R$ {valor_total:.2f}".replace('.', ',')
+        valor_total_string_formatted = f"R$ {self.valor_total:.2f}".replace('.', ',')
         return valor_total_string_formatted
 
 
@@ -277,6 +378,13 @@ class ItemRemessa(models.Model):
         verbose_name = "Item da Remessa"
         verbose_name_plural = "Itens da Remessa"
         unique_together = ('remessa', 'produto') # Garante que não haja o mesmo produto duas vezes na mesma remessa.
+        indexes = [
+            # Cobre a soma dos itens consignados do painel inicial (elderCadastro/painel.py).
+            models.Index(
+                fields=['status_item', 'quantidade', 'preco_venda_unitario_na_saida'],
+                name='itemremessa_status_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.quantidade}x {self.produto.nome} ({self.status_item})"
@@ -287,14 +395,21 @@ class ItemRemessa(models.Model):
             # 1. "Congela" o preço de venda do produto no momento da criação.
             self.preco_venda_unitario_na_saida = self.produto.preco_venda
             
-            # 2. Subtrai a quantidade do estoque principal do produto.
-            if self.produto.estoque >= self.quantidade:
-                self.produto.estoque = F('estoque') - self.quantidade
-                self.produto.save(update_fields=['estoque'])
-            else:
-                raise ValueError(f"Estoque insuficiente para o produto {self.produto.nome}.")
+            # 2. Subtrai a quantidade do estoque principal do produto. A conferência
+            #    do estoque é feita pelo próprio UPDATE, e não com o valor em memória.
+            reservar_estoque(self.produto_id, self.quantidade)
+            self.produto.refresh_from_db(fields=['estoque'])
 
         super().save(*args, **kwargs)
+        self.remessa.atualizar_totais()
+        invalidar_painel()
+
+    def delete(self, *args, **kwargs):
+        remessa = self.remessa
+        resultado = super().delete(*args, **kwargs)
+        remessa.atualizar_totais()
+        invalidar_painel()
+        return resultado
 
     # --- Métodos de Negócio ---
     def devolver_ao_estoque(self, quantidade_devolver):
@@ -305,8 +420,8 @@ class ItemRemessa(models.Model):
         """
         if self.status_item == 'CONSIGNADO' and 0 < quantidade_devolver <= self.quantidade:
             self.quantidade -= quantidade_devolver
-            self.produto.estoque = F('estoque') + quantidade_devolver
-            self.produto.save(update_fields=['estoque'])
+            devolver_estoque(self.produto_id, quantidade_devolver)
+            self.produto.refresh_from_db(fields=['estoque'])
             # Se toda a quantidade foi devolvida, muda o status para DEVOLVIDO
             if self.quantidade == 0:
                 self.status_item = 'DEVOLVIDO'
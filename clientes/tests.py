@@ -1,3 +1,255 @@
-from django.test import TestCase
+from decimal import Decimal
+import io
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from elderCadastro.gerarRecibo import gerar_recibo_remessa
+from elderCadastro.recibos import remessas_para_recibo, versao_recibo
+from produtos.models import Produto
+
+from .models import Cliente, ItemRemessa, Remessa
+from .views import REMESSAS_POR_PAGINA
+
+
+def criar_cliente(**kwargs):
+    dados = {
+        'nome_completo': 'Maria da Silva',
+        'cpf_cnpj': '123.456.789-00',
+        'telefone_whatsapp': '(11) 98765-4321',
+        'cep': '01000-000',
+        'cidade': 'São Paulo',
+        'estado': 'SP',
+        'bairro': 'Centro',
+        'rua': 'Rua A',
+        'numero': '10',
+    }
+    dados.update(kwargs)
+    return Cliente.objects.create(**dados)
+
+
+def criar_produto(nome, estoque=10, custo='10.00'):
+    return Produto.objects.create(
+        nome=nome, custo=Decimal(custo), margem_lucro=Decimal('100'), estoque=estoque
+    )
+
+
+class TotaisRemessaTests(TestCase):
+    def setUp(self):
+        self.cliente = criar_cliente()
+        self.remessa = Remessa.objects.create(cliente=self.cliente, status='ABERTO')
+        self.anel = criar_produto('Anel')
+        self.brinco = criar_produto('Brinco', custo='5.00')
+
+    def test_totais_acompanham_os_itens(self):
+        item_anel = ItemRemessa.objects.create(remessa=self.remessa, produto=self.anel, quantidade=3)
+        ItemRemessa.objects.create(remessa=self.remessa, produto=self.brinco, quantidade=2)
+        self.remessa.refresh_from_db()
+        self.assertEqual(self.remessa.total_pecas, 5)
+        self.assertEqual(self.remessa.valor_total, Decimal('80.00'))
+        self.assertEqual(self.remessa.valor_consignado, Decimal('80.00'))
+
+        item_anel.devolver_ao_estoque(1)
+        self.remessa.refresh_from_db()
+        self.assertEqual(self.remessa.total_pecas, 4)
+        self.assertEqual(self.remessa.get_valor_total(), 'R$ 60,00')
+
+    def test_saida_confere_o_estoque_do_banco_e_nao_o_da_memoria(self):
+        # Outro terminal vendeu todo o estoque depois que 'self.anel' foi carregado.
+        Produto.objects.filter(pk=self.anel.pk).update(estoque=1)
+
+        with self.assertRaisesMessage(ValueError, 'Estoque insuficiente para o produto: Anel'):
+            ItemRemessa.objects.create(remessa=self.remessa, produto=self.anel, quantidade=2)
+
+        ItemRemessa.objects.create(remessa=self.remessa, produto=self.anel, quantidade=1)
+        self.assertEqual(self.anel.estoque, 0)
+
+    def test_comando_reconstroi_totais(self):
+        ItemRemessa.objects.create(remessa=self.remessa, produto=self.anel, quantidade=2)
+        Remessa.objects.update(total_pecas=0, valor_total=0, valor_consignado=0)
+
+        call_command('recalcular_totais_remessas', stdout=io.StringIO())
+
+        self.remessa.refresh_from_db()
+        self.assertEqual(self.remessa.total_pecas, 2)
+        self.assertEqual(self.remessa.calcular_totais()['ainda_consignado'], Decimal('40.00'))
+
+    def test_historico_renderiza_com_uma_consulta(self):
+        for _ in range(5):
+            remessa = Remessa.objects.create(cliente=self.cliente, status='ABERTO')
+            ItemRemessa.objects.create(remessa=remessa, produto=self.anel, quantidade=1)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('cliente_historicoRemessa'))
+
+        self.assertContains(response, 'R$ 20,00')
+
+
+class HistoricoRemessaTests(TestCase):
+    def setUp(self):
+        self.cliente = criar_cliente(cpf_cnpj='000.000.000-00', telefone_whatsapp='(00) 00000-0000')
+        # Todas com a mesma data, para exercitar o desempate pelo ID no cursor.
+        agora = timezone.now()
+        self.remessas = [
+            Remessa.objects.create(cliente=self.cliente, data_saida=agora)
+            for _ in range(REMESSAS_POR_PAGINA + 5)
+        ]
+
+    def test_paginacao_por_cursor_percorre_todas_as_remessas(self):
+        vistas = []
+        url = reverse('cliente_historicoRemessa')
+        while url:
+            response = self.client.get(url)
+            vistas.extend(r.id for r in response.context['remessas'])
+            proxima = response.context['proxima_pagina_url']
+            url = reverse('cliente_historicoRemessa') + proxima if proxima else None
+
+        self.assertEqual(vistas, sorted((r.id for r in self.remessas), reverse=True))
+
+    def test_termo_numerico_busca_id_exato(self):
+        alvo = next(r for r in self.remessas if '0' not in str(r.id))
+        response = self.client.get(reverse('cliente_historicoRemessa'), {'busca_cliente': str(alvo.id)})
+
+        self.assertEqual([r.id for r in response.context['remessas']], [alvo.id])
+
+
+class DigitosClienteTests(TestCase):
+    def setUp(self):
+        self.cliente = criar_cliente(cpf_cnpj='321.654.987-11', telefone_whatsapp='(47) 99123-4567')
+
+    def test_save_mantem_campos_so_com_digitos(self):
+        self.assertEqual(self.cliente.cpf_cnpj_digitos, '32165498711')
+        self.assertEqual(self.cliente.telefone_digitos, '47991234567')
+
+        self.cliente.telefone_whatsapp = '(47) 3333-0000'
+        self.cliente.save(update_fields=['telefone_whatsapp'])
+        self.cliente.refresh_from_db()
+        self.assertEqual(self.cliente.telefone_digitos, '4733330000')
+
+    def test_historico_busca_telefone_pelo_prefixo(self):
+        remessa = Remessa.objects.create(cliente=self.cliente)
+        outro = criar_cliente(cpf_cnpj='111.111.111-11', telefone_whatsapp='(21) 98888-7777')
+        Remessa.objects.create(cliente=outro)
+
+        response = self.client.get(reverse('cliente_historicoRemessa'), {'busca_cliente': '(47) 9912'})
+
+        self.assertEqual([r.id for r in response.context['remessas']], [remessa.id])
+
+    def test_consulta_por_documento_usa_campo_de_digitos(self):
+        criar_cliente(cpf_cnpj='999.999.999-99', telefone_whatsapp='(11) 90000-0000')
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('cliente_consultar'), {'cpf_cnpj': '321.654'})
+
+        self.assertEqual(list(response.context['registros']), [self.cliente])
+        self.assertIn('cpf_cnpj_digitos', consultas[-1]['sql'])
+
+    def test_triggers_de_busca_sobrevivem_as_migracoes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Os índices FTS5 só existem no SQLite.')
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%busca%'")
+            triggers = {linha[0] for linha in cursor.fetchall()}
+
+        self.assertEqual(len(triggers), 6)
+
+
+class ReciboRemessaTests(TestCase):
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+        configuracao = override_settings(RECIBOS_DIR=self.diretorio.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+        self.client.force_login(get_user_model().objects.create_user('balcao', password='senha'))
+        self.remessa = Remessa.objects.create(cliente=criar_cliente(), status='ABERTO')
+        self.anel = criar_produto('Anel')
+        ItemRemessa.objects.create(remessa=self.remessa, produto=self.anel, quantidade=2)
+        self.url = reverse('cliente_reciboRemessaPdf', args=[self.remessa.id])
+
+    def test_recibo_carrega_os_produtos_junto_com_os_itens(self):
+        for indice in range(5):
+            ItemRemessa.objects.create(remessa=self.remessa, produto=criar_produto(f'Brinco {indice}'), quantidade=1)
+
+        with self.assertNumQueries(2):
+            resultado = gerar_recibo_remessa(self.remessa.id)
+
+        self.assertTrue(resultado['pdf_bytes'].startswith(b'%PDF'))
+
+    def test_reimpressao_vem_do_disco_e_respeita_o_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        etag = response['ETag']
+
+        with mock.patch('elderCadastro.gerarRecibo.gerar_recibo_remessa') as gerar:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+            nao_modificado = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        gerar.assert_not_called()
+        self.assertEqual(nao_modificado.status_code, 304)
+
+    def test_alterar_a_remessa_gera_nova_versao(self):
+        etag = self.client.get(self.url)['ETag']
+        ItemRemessa.objects.create(remessa=self.remessa, produto=criar_produto('Colar'), quantidade=1)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        response.close()
+        self.assertEqual(len(list(Path(self.diretorio.name).glob('remessa_*.pdf'))), 1)
+
+    def test_editar_produto_ou_item_gera_nova_versao(self):
+        remessa = remessas_para_recibo().get(pk=self.remessa.pk)
+        versoes = {versao_recibo(remessa)}
+
+        Produto.objects.filter(pk=self.anel.pk).update(nome='Anel Dourado')
+        versoes.add(versao_recibo(remessa))
+        Produto.objects.filter(pk=self.anel.pk).update(codigo_barras='7891234567895')
+        versoes.add(versao_recibo(remessa))
+        # Troca de itens que mantém os totais armazenados da remessa.
+        self.remessa.itens.update(produto=criar_produto('Colar'))
+        versoes.add(versao_recibo(remessa))
+
+        self.assertEqual(len(versoes), 4)
+
+    def test_impressao_antiga_responde_com_a_url_do_pdf(self):
+        response = self.client.post(
+            reverse('cliente_imprimirReciboAntigo'),
+            data=json.dumps({'remessaID': self.remessa.id}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['pdf_url'], self.url)
+
+    def test_impressao_antiga_valida_a_requisicao(self):
+        url = reverse('cliente_imprimirReciboAntigo')
+
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertEqual(self.client.post(url, data='{', content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.post(url, data='{}', content_type='application/json').status_code, 400)
+        self.client.logout()
+        anonimo = self.client.post(url, data=json.dumps({'remessaID': self.remessa.id}), content_type='application/json')
+        self.assertEqual(anonimo.status_code, 302)
+
+    def test_recibo_exige_login(self):
+        self.client.logout()
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_remessa_inexistente(self):
+        url = reverse('cliente_reciboRemessaPdf', args=[self.remessa.id + 1])
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -11,4 +11,6 @@ urlpatterns = [
     path('consultar/', views.cliente_consultar, name='cliente_consultar'),
     path('historicoRemessa/', views.cliente_historicoRemessa, name='cliente_historicoRemessa'),
     path('imprimirReciboAntigo/', views.imprimir_recibo_remessa_antiga, name='cliente_imprimirReciboAntigo'),
+    path('exportarRecibos/', views.exportar_recibos_api, name='cliente_exportarRecibos'),
+    path('remessa/<int:remessa_id>/recibo.pdf', views.recibo_remessa_pdf, name='cliente_reciboRemessaPdf'),
 ]
\ No newline at end of file
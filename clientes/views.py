@@ -6,8 +6,15 @@ from .forms import FornecedorForm
 from .models import Cliente, Remessa
 from django.db.models import Q
 import json
-from django.http import JsonResponse
-from elderCadastro.gerarRecibo import gerar_recibo_pdf as gerar_recibo_pdf_func
+from datetime import date, datetime
+from django.http import FileResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import condition, require_GET, require_POST
+from elderCadastro.busca import filtrar_busca, filtro_digitos
+from elderCadastro.recibos import obter_recibo_remessa, remessas_para_recibo, versao_recibo
+from tarefas.models import TarefaPDF
+from tarefas.views import resposta_tarefa
 
 # Create your views here.
 def cliente_home(request):
@@ -60,15 +67,13 @@ def cliente_consultar(request):
     query_cidade = request.GET.get('cidade', '')
     query_tipo = request.GET.get('tipo', '')
 
-    # Aplica os filtros se eles foram preenchidos
-    if query_nome:
-        queryset = queryset.filter(nome_completo__icontains=query_nome)
-    
-    if query_doc:
-        queryset = queryset.filter(cpf_cnpj__icontains=query_doc)
-
-    if query_tel:
-        queryset = queryset.filter(telefone_whatsapp__icontains=query_tel)
+    # Aplica os filtros se eles foram preenchidos (nome, documento e
+    # telefone usam o índice de busca)
+    queryset = filtrar_busca(queryset, 'cliente_busca', colunas={
+        'nome': query_nome,
+        'documento': query_doc,
+        'telefone': query_tel,
+    })
 
     if query_cidade:
         # Supondo que a cidade está no campo 'endereco'
@@ -88,90 +93,162 @@ def cliente_consultar(request):
 
     return render(request, 'clientes/cliente_consultar.html', context)
 
+REMESSAS_POR_PAGINA = 30
+
+def _cursor_remessa(remessa):
+    """
+    Cursor de paginação: a posição de uma remessa na ordem (-data_saida, -id).
+    """
+    return f"{remessa.data_saida.isoformat()}_{remessa.id}"
+
 def cliente_historicoRemessa(request):
     """
     View para listar e filtrar o histórico de remessas de produtos para clientes.
+    A listagem é paginada por cursor (keyset): cada página continua a partir
+    da última remessa da página anterior, então o custo não cresce com o histórico.
     """
     
-    # 1. Começamos com a consulta base, buscando todas as remessas.
-    lista_remessas = Remessa.objects.select_related('cliente').order_by('-data_saida')
+    # 1. Começamos com a consulta base. Os totais já estão gravados na própria remessa.
+    lista_remessas = Remessa.objects.select_related('cliente').order_by('-data_saida', '-id')
 
     # 2. Pegamos os valores dos filtros da URL.
-    filtro_busca_cliente = request.GET.get('busca_cliente', '') # Novo campo de busca
+    filtro_busca_cliente = request.GET.get('busca_cliente', '').strip() # Novo campo de busca
     filtro_status = request.GET.get('status', '')
+    cursor = request.GET.get('apos', '')
 
     # 3. Aplicamos os filtros na nossa consulta, se eles foram preenchidos.
     if filtro_busca_cliente:
-        # Usamos um objeto Q para criar uma consulta OR (OU) nos campos do modelo Cliente relacionado.
-        # Buscamos remessas cujo cliente tenha:
-        # - O nome contendo o termo de busca, OU
-        # - O CPF/CNPJ contendo o termo de busca, OU
-        # - O telefone contendo o termo de busca, OU
-        # - O ID da remessa contendo o termo de busca.
-        lista_remessas = lista_remessas.filter(
-            Q(cliente__nome_completo__icontains=filtro_busca_cliente) |
-            Q(cliente__cpf_cnpj__icontains=filtro_busca_cliente) |
-            Q(cliente__telefone_whatsapp__icontains=filtro_busca_cliente) |
-            Q(id__icontains=filtro_busca_cliente)
-        )
+        # Um termo numérico é buscado por prefixo no CPF/CNPJ e no telefone
+        # (campos só com dígitos e indexados), e também pode ser o ID da remessa.
+        filtro = filtro_digitos('cliente_busca', filtro_busca_cliente, relacao='cliente')
+        if filtro is not None:
+            if filtro_busca_cliente.isdigit():
+                filtro |= Q(id=int(filtro_busca_cliente))
+            lista_remessas = lista_remessas.filter(filtro)
+        else:
+            # Texto: nome, documento ou telefone do cliente pelo índice de busca.
+            lista_remessas = filtrar_busca(lista_remessas, 'cliente_busca', filtro_busca_cliente, relacao='cliente')
 
     # Filtro por Status (continua o mesmo)
     if filtro_status:
         lista_remessas = lista_remessas.filter(status=filtro_status)
 
+    # 4. Continuamos a partir do cursor da página anterior, se houver.
+    if cursor:
+        try:
+            data_cursor, id_cursor = cursor.rsplit('_', 1)
+            data_cursor = datetime.fromisoformat(data_cursor)
+            id_cursor = int(id_cursor)
+        except ValueError:
+            cursor = ''
+        else:
+            lista_remessas = lista_remessas.filter(
+                Q(data_saida__lt=data_cursor) |
+                Q(data_saida=data_cursor, id__lt=id_cursor)
+            )
+
+    # Buscamos uma remessa a mais só para saber se existe próxima página.
+    remessas = list(lista_remessas[:REMESSAS_POR_PAGINA + 1])
+    proxima_pagina_url = None
+    if len(remessas) > REMESSAS_POR_PAGINA:
+        remessas = remessas[:REMESSAS_POR_PAGINA]
+        parametros = request.GET.copy()
+        parametros['apos'] = _cursor_remessa(remessas[-1])
+        proxima_pagina_url = f"?{parametros.urlencode()}"
+
+    primeira_pagina_url = None
+    if cursor:
+        parametros = request.GET.copy()
+        parametros.pop('apos', None)
+        primeira_pagina_url = f"?{parametros.urlencode()}"
+
     context = {
-        'remessas': lista_remessas,
+        'remessas': remessas,
         'valores_filtro': request.GET,
+        'proxima_pagina_url': proxima_pagina_url,
+        'primeira_pagina_url': primeira_pagina_url,
     }
 
     return render(request, 'clientes/cliente_historicoRemessa.html', context)
 
+@login_required
+@require_POST
 def imprimir_recibo_remessa_antiga(request):
     """
     View para imprimir recibo de remessa antiga.
+    O PDF não vai no JSON: a resposta traz a URL de recibo_remessa_pdf.
     """
-    data = json.loads(request.body)
-    remessaID = data.get('remessaID')
-    remessa = Remessa.objects.get(id=remessaID)
-    itensRemessa = remessa.itens.all()
-
-    # Preparar dados para a função gerar_recibo_pdf_func
-    nome_cliente = remessa.cliente.nome_completo
-    data_saida = remessa.data_saida.strftime('%d/%m/%Y') if remessa.data_saida else 'N/A'
-    tipoRemessa = 'EM ABERTO' if remessa.status == 'ABERTO' else 'FINALIZADO'
-
-    count = 1
-    my_prod = {}
-    my_sale = {}
-    codigo_barras = []
-
-    for item in itensRemessa:
-        item_quantidade = item.quantidade
-        produto = item.produto
-        produto_nome = produto.nome
-        produto_codigo_barras = produto.codigo_barras
-        preco_unitario = item.preco_venda_unitario_na_saida
-
-        temp_list = [produto_nome, float(preco_unitario)]
-        
-        my_prod[count] = temp_list
-        my_sale[count] = int(item_quantidade)
-        codigo_barras.append(produto_codigo_barras)
-        count += 1
-
-    resultado = gerar_recibo_pdf_func(
-                my_prod=my_prod,
-                my_sale=my_sale,
-                codigo_barras=codigo_barras,
-                nome_cliente=nome_cliente,
-                data_nota=data_saida,
-                remessa_id=remessaID,
-                situacao=tipoRemessa,
-                retornar_bytes=True
-            )
-    
+    try:
+        data = json.loads(request.body)
+        remessaID = int(data['remessaID'])
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return JsonResponse({'status': 'error', 'message': 'Remessa não informada.'}, status=400)
+    remessa = get_object_or_404(remessas_para_recibo(), pk=remessaID)
+
     return JsonResponse({
                 'success': True,
-                'pdf_base64': resultado['pdf_base64'],
-                'nome_arquivo': resultado['nome_arquivo']
-            })
\ No newline at end of file
+                'pdf_url': reverse('cliente_reciboRemessaPdf', args=[remessa.pk]),
+                'nome_arquivo': f"recibo_remessa_{remessa.pk}.pdf"
+            })
+
+def _etag_recibo_remessa(request, remessa_id):
+    """
+    ETag do recibo: a versão do conteúdo da remessa (None se ela não existir).
+    """
+    remessa = remessas_para_recibo().filter(pk=remessa_id).first()
+    return versao_recibo(remessa) if remessa else None
+
+@login_required
+@require_GET
+@condition(etag_func=_etag_recibo_remessa)
+def recibo_remessa_pdf(request, remessa_id):
+    """
+    Recibo de uma remessa em PDF, lido do arquivo de recibos já gerados.
+    Com o ETag, o navegador revalida (If-None-Match) e recebe 304 se a
+    remessa não mudou, sem baixar o PDF de novo.
+    """
+    remessa = get_object_or_404(remessas_para_recibo(), pk=remessa_id)
+    response = FileResponse(
+        obter_recibo_remessa(remessa).open('rb'),
+        content_type='application/pdf',
+        as_attachment=True,
+        filename=f"recibo_remessa_{remessa.pk}.pdf",
+    )
+    # Sempre revalidar: o PDF só é reaproveitado se o ETag continuar igual.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+@login_required
+@require_POST
+def exportar_recibos_api(request):
+    """
+    API que enfileira a exportação dos recibos de todas as remessas de um
+    período (com filtros opcionais de status e cliente) em um único ZIP.
+    A tarefa é executada pelo worker ('processar_tarefas'); a resposta traz
+    a URL para acompanhar o progresso e baixar o arquivo.
+    """
+    try:
+        data = json.loads(request.body or '{}')
+        inicio = date.fromisoformat(data['inicio'])
+        fim = date.fromisoformat(data['fim'])
+        cliente_id = int(data['cliente_id']) if data.get('cliente_id') else None
+    except (KeyError, TypeError, ValueError) as e:
+        return JsonResponse({'status': 'error', 'message': f'Período ou cliente inválido: {e}'}, status=400)
+
+    status = data.get('status', '')
+    if inicio > fim:
+        return JsonResponse({'status': 'error', 'message': 'A data inicial é depois da data final.'}, status=400)
+    if status and status not in Remessa.StatusRemessa.values:
+        return JsonResponse({'status': 'error', 'message': 'Status inválido.'}, status=400)
+
+    tarefa = TarefaPDF.enfileirar(
+        TarefaPDF.TipoTarefa.EXPORTACAO,
+        {
+            'inicio': inicio.isoformat(),
+            'fim': fim.isoformat(),
+            'status': status,
+            'cliente_id': cliente_id,
+        },
+        responsavel=request.user,
+    )
+    return resposta_tarefa(tarefa)
@@ -0,0 +1,163 @@
+"""
+Configuração do banco de dados SQLite para uso com vários terminais.
+
+Cada conexão aberta executa os PRAGMAs abaixo:
+- synchronous=NORMAL: bem menos fsync por commit;
+- busy_timeout: quem encontra o banco ocupado espera em vez de falhar
+  com "database is locked";
+- cache_size e mmap_size: mais páginas do banco em memória;
+- journal_mode=WAL, só no perfil de produção: leituras não bloqueiam a
+  escrita (e vice-versa). O modo WAL fica gravado no cabeçalho do arquivo,
+  então não é ligado no desenvolvimento, para não alterar o db.sqlite3 do
+  repositório a cada comando do manage.py.
+
+As transações de escrita usam transacao_escrita(), que começa com BEGIN
+IMMEDIATE: a trava de escrita é pega logo no início, e a espera do
+busy_timeout funciona. Numa transação comum (DEFERRED), quem lê e depois
+tenta escrever recebe "database is locked" na hora, sem esperar. As demais
+transações (admin, sessões, leituras) continuam DEFERRED e não disputam a
+trava de escrita.
+
+configuracao_banco() escolhe o banco pelo perfil de implantação e pelas
+variáveis de ambiente (ver settings.py):
+- ELDER_BANCO: 'sqlite' (padrão) ou 'postgres';
+- ELDER_SQLITE_CAMINHO: arquivo do SQLite;
+- ELDER_CONN_MAX_AGE: segundos que uma conexão fica aberta entre requisições;
+- ELDER_PG_NOME, ELDER_PG_USUARIO, ELDER_PG_SENHA, ELDER_PG_HOST, ELDER_PG_PORTA;
+- ELDER_PG_POOL=1: usa o pool de conexões nativo do Django (psycopg[pool]),
+  com ELDER_PG_POOL_MIN / ELDER_PG_POOL_MAX conexões.
+"""
+import os
+from contextlib import contextmanager
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+# Tempo máximo (em ms) que uma conexão espera pela trava de escrita.
+TEMPO_ESPERA_BLOQUEIO_MS = 20_000
+
+PRAGMAS_SQLITE = {
+    'synchronous': 'NORMAL',
+    'busy_timeout': TEMPO_ESPERA_BLOQUEIO_MS,
+    'cache_size': -20_000,  # negativo = em KiB, ou seja, ~20 MB
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+PRAGMAS_SQLITE_PERFIS = {
+    'desenvolvimento': PRAGMAS_SQLITE,
+    'producao': {'journal_mode': 'WAL', **PRAGMAS_SQLITE},
+}
+
+
+def comando_inicial_sqlite(pragmas=PRAGMAS_SQLITE):
+    """
+    Monta o 'init_command' com os PRAGMAs informados.
+    """
+    return ';'.join(f'PRAGMA {nome}={valor}' for nome, valor in pragmas.items())
+
+
+def configuracao_sqlite(caminho, pragmas=PRAGMAS_SQLITE):
+    """
+    Retorna a entrada de DATABASES para o arquivo SQLite informado.
+    """
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': caminho,
+        'OPTIONS': {
+            'init_command': comando_inicial_sqlite(pragmas),
+        },
+    }
+
+
+@contextmanager
+def transacao_escrita(using=DEFAULT_DB_ALIAS):
+    """
+    Igual a transaction.atomic(), mas no SQLite a transação começa com BEGIN
+    IMMEDIATE. Usar nos trechos que gravam no banco, principalmente nos que
+    leem antes de gravar. Dentro de outra transação vira só um savepoint.
+    """
+    conexao = connections[using]
+    if conexao.vendor != 'sqlite' or conexao.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    # O transaction_mode é lido das OPTIONS a cada conexão aberta, e só é
+    # usado no BEGIN, executado ao entrar no atomic.
+    conexao.ensure_connection()
+    modo_anterior = conexao.transaction_mode
+    conexao.transaction_mode = 'IMMEDIATE'
+    try:
+        with transaction.atomic(using=using):
+            conexao.transaction_mode = modo_anterior
+            yield
+    finally:
+        conexao.transaction_mode = modo_anterior
+
+
+# Tempo (em segundos) que uma conexão é reaproveitada entre requisições, por
+# perfil. No desenvolvimento o runserver cria uma thread por requisição, então
+# manter conexões abertas só as acumularia.
+CONN_MAX_AGE_PERFIS = {
+    'desenvolvimento': 0,
+    'producao': 600,
+}
+
+
+def _verdadeiro(valor):
+    return str(valor).strip().lower() in ('1', 'true', 'sim', 's', 'yes')
+
+
+def configuracao_postgres(ambiente, conn_max_age):
+    """
+    Retorna a entrada de DATABASES para o PostgreSQL, a partir das variáveis
+    ELDER_PG_*. Com ELDER_PG_POOL ligado, as conexões vêm do pool nativo do
+    Django, que exige CONN_MAX_AGE = 0.
+    """
+    opcoes = {}
+    if _verdadeiro(ambiente.get('ELDER_PG_POOL', '')):
+        opcoes['pool'] = {
+            'min_size': int(ambiente.get('ELDER_PG_POOL_MIN', 2)),
+            'max_size': int(ambiente.get('ELDER_PG_POOL_MAX', 10)),
+        }
+        conn_max_age = 0
+
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': ambiente.get('ELDER_PG_NOME', 'elder_cadastro'),
+        'USER': ambiente.get('ELDER_PG_USUARIO', ''),
+        'PASSWORD': ambiente.get('ELDER_PG_SENHA', ''),
+        'HOST': ambiente.get('ELDER_PG_HOST', 'localhost'),
+        'PORT': ambiente.get('ELDER_PG_PORTA', '5432'),
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': opcoes,
+    }
+
+
+def configuracao_banco(perfil, caminho_sqlite, ambiente=None):
+    """
+    Retorna a entrada 'default' de DATABASES para o perfil informado,
+    aplicando as variáveis de ambiente ELDER_*.
+    """
+    if ambiente is None:
+        ambiente = os.environ
+    if perfil not in CONN_MAX_AGE_PERFIS:
+        raise ImproperlyConfigured(
+            f"Perfil de implantação desconhecido: {perfil!r}. Use um destes: {', '.join(CONN_MAX_AGE_PERFIS)}."
+        )
+    conn_max_age = int(ambiente.get('ELDER_CONN_MAX_AGE', CONN_MAX_AGE_PERFIS[perfil]))
+
+    banco = ambiente.get('ELDER_BANCO', 'sqlite')
+    if banco == 'postgres':
+        return configuracao_postgres(ambiente, conn_max_age)
+    if banco != 'sqlite':
+        raise ImproperlyConfigured(f"ELDER_BANCO inválido: {banco!r}. Use 'sqlite' ou 'postgres'.")
+
+    configuracao = configuracao_sqlite(
+        ambiente.get('ELDER_SQLITE_CAMINHO', caminho_sqlite), PRAGMAS_SQLITE_PERFIS[perfil],
+    )
+    configuracao['CONN_MAX_AGE'] = conn_max_age
+    configuracao['CONN_HEALTH_CHECKS'] = True
+    return configuracao
@@ -0,0 +1,273 @@
+"""
+Busca textual de clientes e produtos.
+
+No SQLite a busca usa os índices FTS5 'cliente_busca' e 'produto_busca',
+criados pelas migrações (clientes 0010 e produtos 0008) e mantidos em
+sincronia por triggers no próprio banco (valem também para bulk_create/
+update). Como o SQLite apaga os triggers quando uma migração recria a
+tabela, eles são reinstalados após cada 'migrate' (ver ClientesConfig.ready). O tokenizador ignora acentos
+e cada palavra digitada é buscada como prefixo, com os resultados ordenados
+pela relevância (bm25).
+
+Em outros bancos, ou se o SQLite não tiver FTS5, a busca volta a ser feita
+com '__icontains' nos mesmos campos.
+"""
+import re
+
+from django.db import connection, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+
+# Índice FTS -> (tabela do modelo, campos usados quando não há FTS)
+INDICES_BUSCA = {
+    'cliente_busca': ('clientes_cliente', ['nome_completo', 'cpf_cnpj', 'telefone_whatsapp']),
+    'produto_busca': ('produtos_produto', ['nome', 'codigo_barras']),
+}
+
+# Coluna do índice -> campo do modelo, para buscas restritas a um campo.
+COLUNAS_BUSCA = {
+    'cliente_busca': {'nome': 'nome_completo', 'documento': 'cpf_cnpj', 'telefone': 'telefone_whatsapp'},
+    'produto_busca': {'nome': 'nome', 'codigo': 'codigo_barras'},
+}
+
+# Coluna do índice -> campo do modelo só com dígitos. Termos numéricos
+# nessas colunas são buscados por prefixo nesses campos indexados.
+CAMPOS_DIGITOS = {
+    'cliente_busca': {'documento': 'cpf_cnpj_digitos', 'telefone': 'telefone_digitos'},
+}
+
+# CPF/CNPJ e telefone entram no índice só com os dígitos.
+_DOCUMENTO = "replace(replace(replace({0}.cpf_cnpj, '.', ''), '-', ''), '/', '')"
+_TELEFONE = "replace(replace(replace(replace({0}.telefone_whatsapp, '(', ''), ')', ''), '-', ''), ' ', '')"
+
+# Triggers que mantêm cada índice FTS5 em sincronia com a tabela do modelo.
+# As migrações têm sua própria cópia (congelada) deste SQL; esta é usada só
+# para reinstalá-los depois de um 'migrate' (ver reinstalar_triggers_busca).
+TRIGGERS_BUSCA = {
+    'cliente_busca': {
+        'cliente_busca_ai': f"""
+            CREATE TRIGGER IF NOT EXISTS cliente_busca_ai AFTER INSERT ON clientes_cliente BEGIN
+                INSERT INTO cliente_busca(rowid, nome, documento, telefone)
+                VALUES (new.id, new.nome_completo, {_DOCUMENTO.format('new')}, {_TELEFONE.format('new')});
+            END
+        """,
+        'cliente_busca_au': f"""
+            CREATE TRIGGER IF NOT EXISTS cliente_busca_au
+            AFTER UPDATE OF nome_completo, cpf_cnpj, telefone_whatsapp ON clientes_cliente BEGIN
+                UPDATE cliente_busca
+                SET nome = new.nome_completo, documento = {_DOCUMENTO.format('new')}, telefone = {_TELEFONE.format('new')}
+                WHERE rowid = new.id;
+            END
+        """,
+        'cliente_busca_ad': """
+            CREATE TRIGGER IF NOT EXISTS cliente_busca_ad AFTER DELETE ON clientes_cliente BEGIN
+                DELETE FROM cliente_busca WHERE rowid = old.id;
+            END
+        """,
+    },
+    'produto_busca': {
+        'produto_busca_ai': """
+            CREATE TRIGGER IF NOT EXISTS produto_busca_ai AFTER INSERT ON produtos_produto BEGIN
+                INSERT INTO produto_busca(rowid, nome, codigo) VALUES (new.id, new.nome, new.codigo_barras);
+            END
+        """,
+        'produto_busca_au': """
+            CREATE TRIGGER IF NOT EXISTS produto_busca_au AFTER UPDATE OF nome, codigo_barras ON produtos_produto BEGIN
+                UPDATE produto_busca SET nome = new.nome, codigo = new.codigo_barras WHERE rowid = new.id;
+            END
+        """,
+        'produto_busca_ad': """
+            CREATE TRIGGER IF NOT EXISTS produto_busca_ad AFTER DELETE ON produtos_produto BEGIN
+                DELETE FROM produto_busca WHERE rowid = old.id;
+            END
+        """,
+    },
+}
+
+# Acima desta quantidade de resultados a ordenação por relevância é
+# ignorada: o bm25 é calculado para cada resultado, e um prefixo curto
+# ("jo") pode casar com dezenas de milhares de cadastros.
+LIMITE_RANQUEAMENTO = 1000
+
+_tabelas_fts = None
+
+
+def fts_disponivel(indice):
+    """
+    Indica se o índice FTS informado existe no banco atual.
+    A consulta ao catálogo do SQLite é feita uma vez por processo.
+    """
+    global _tabelas_fts
+    if connection.vendor != 'sqlite':
+        return False
+    if _tabelas_fts is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE '%fts5%'")
+            _tabelas_fts = {linha[0] for linha in cursor.fetchall()}
+    return indice in _tabelas_fts
+
+
+def _tabelas_existentes(conexao):
+    with conexao.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        return {linha[0] for linha in cursor.fetchall()}
+
+
+def reinstalar_triggers_busca(sender, using, **kwargs):
+    """
+    Receptor do post_migrate. No SQLite, muitas alterações de campo recriam
+    a tabela inteira, e os triggers dela somem junto. Aqui eles são criados
+    de novo para todo índice FTS que existir, caso uma migração futura
+    recrie a tabela sem reinstalá-los.
+    """
+    global _tabelas_fts
+    conexao = connections[using]
+    if conexao.vendor != 'sqlite':
+        return
+    _tabelas_fts = None
+    existentes = _tabelas_existentes(conexao)
+    with conexao.cursor() as cursor:
+        for indice, triggers in TRIGGERS_BUSCA.items():
+            if indice in existentes:
+                for sql in triggers.values():
+                    cursor.execute(sql)
+
+
+def termo_numerico(texto):
+    """
+    Indica se o texto é um número, com ou sem a pontuação de CPF/CNPJ/telefone.
+    """
+    return bool(re.fullmatch(r'[\d\s.\-/()]+', texto)) and any(c.isdigit() for c in texto)
+
+
+def filtro_digitos(indice, texto, relacao=None, coluna=None):
+    """
+    Retorna o Q da busca de um termo numérico por prefixo nos campos só com
+    dígitos (todos, ou só o da coluna informada). Retorna None se o termo
+    não é numérico ou se não há campo de dígitos para a busca.
+    """
+    campos = CAMPOS_DIGITOS.get(indice, {})
+    if coluna:
+        campos = {coluna: campos[coluna]} if coluna in campos else {}
+    if not campos or not termo_numerico(texto):
+        return None
+
+    digitos = re.sub(r'\D', '', texto)
+    prefixo = f'{relacao}__' if relacao else ''
+    filtro = Q()
+    for campo in campos.values():
+        # O intervalo [digitos, digitos + ':') é uma busca por prefixo que usa
+        # o índice em qualquer banco (':' vem logo depois de '9' na tabela ASCII).
+        filtro |= Q(**{f'{prefixo}{campo}__gte': digitos, f'{prefixo}{campo}__lt': digitos + ':'})
+    return filtro
+
+
+def _termos(texto):
+    """
+    Quebra o texto digitado nos termos da busca. CPF, CNPJ e telefone são
+    indexados só com os dígitos, então um texto numérico com pontuação
+    vira um único termo.
+    """
+    if termo_numerico(texto):
+        digitos = re.sub(r'\D', '', texto)
+        return [digitos] if digitos else []
+    return re.findall(r'\w+', texto)
+
+
+def expressao_fts(texto, coluna=None):
+    """
+    Monta a expressão MATCH do FTS5: todos os termos, cada um como prefixo.
+    Retorna None se o texto não tiver nenhum termo pesquisável.
+    """
+    termos = _termos(texto)
+    if not termos:
+        return None
+    expressao = ' '.join(f'"{termo}"*' for termo in termos)
+    if coluna:
+        return f'{coluna} : ({expressao})'
+    return expressao
+
+
+def filtrar_busca(queryset, indice, texto='', relacao=None, colunas=None, ranquear=False):
+    """
+    Filtra o queryset pela busca textual no índice informado.
+
+    Parâmetros:
+    - indice: 'cliente_busca' ou 'produto_busca'
+    - texto: busca em todas as colunas do índice
+    - relacao: nome do ForeignKey quando o queryset não é do próprio modelo
+      indexado (ex.: 'cliente' para buscar remessas pelo cliente)
+    - colunas: dicionário {coluna_do_indice: texto} para buscas por campo
+    - ranquear: ordena pela relevância, mantendo a ordenação atual do
+      queryset como critério de desempate (se a busca tiver até
+      LIMITE_RANQUEAMENTO resultados)
+
+    Termos numéricos em documento/telefone não passam pelo FTS: usam os
+    campos só com dígitos (ver filtro_digitos).
+    """
+    criterios = [(None, texto)] if texto else []
+    criterios += [(coluna, valor) for coluna, valor in (colunas or {}).items() if valor]
+
+    restantes = []
+    for coluna, valor in criterios:
+        filtro = filtro_digitos(indice, valor, relacao, coluna)
+        if filtro is None:
+            restantes.append((coluna, valor))
+        else:
+            queryset = queryset.filter(filtro)
+    criterios = restantes
+    if not criterios:
+        return queryset
+
+    tabela_modelo, campos = INDICES_BUSCA[indice]
+    prefixo = f'{relacao}__' if relacao else ''
+
+    if not fts_disponivel(indice):
+        for coluna, valor in criterios:
+            campos_busca = [COLUNAS_BUSCA[indice][coluna]] if coluna else campos
+            filtro = Q()
+            for campo in campos_busca:
+                filtro |= Q(**{f'{prefixo}{campo}__icontains': valor})
+            queryset = queryset.filter(filtro)
+        return queryset
+
+    expressoes = [expressao_fts(valor, coluna) for coluna, valor in criterios]
+    if None in expressoes:
+        return queryset.none()
+
+    if relacao:
+        campo_relacao = queryset.model._meta.get_field(relacao)
+        coluna_id = f'{queryset.model._meta.db_table}.{campo_relacao.column}'
+    else:
+        coluna_id = f'{tabela_modelo}.id'
+
+    expressao = ' AND '.join(f'({expressao})' for expressao in expressoes)
+    queryset = queryset.filter(**{
+        f'{relacao or "pk"}__in': RawSQL(f'SELECT rowid FROM {indice} WHERE {indice} MATCH %s', [expressao]),
+    })
+    if ranquear and _quantidade_resultados(indice, expressao) <= LIMITE_RANQUEAMENTO:
+        # A relevância vem de uma subconsulta por linha. Com a CTE
+        # MATERIALIZED (SQLite 3.35+), a busca no índice e o bm25 são
+        # calculados uma vez só, e não a cada linha do resultado.
+        materializada = 'MATERIALIZED ' if connection.Database.sqlite_version_info >= (3, 35) else ''
+        relevancia = RawSQL(
+            f'WITH busca AS {materializada}(SELECT rowid, rank FROM {indice} WHERE {indice} MATCH %s) '
+            f'SELECT busca.rank FROM busca WHERE busca.rowid = {coluna_id}',
+            [expressao],
+        )
+        queryset = queryset.annotate(relevancia_busca=relevancia)
+        queryset = queryset.order_by('relevancia_busca', *queryset.query.order_by)
+    return queryset
+
+
+def _quantidade_resultados(indice, expressao):
+    """
+    Conta os resultados da busca no índice, parando em LIMITE_RANQUEAMENTO + 1.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT count(*) FROM (SELECT 1 FROM {indice} WHERE {indice} MATCH %s LIMIT %s)',
+            [expressao, LIMITE_RANQUEAMENTO + 1],
+        )
+        return cursor.fetchone()[0]
@@ -0,0 +1,115 @@
+"""
+Exportação em lote dos recibos de remessas para um único arquivo ZIP.
+
+Os recibos são desenhados em paralelo por um pool de processos ('spawn',
+como no worker de tarefas), porque a geração do PDF usa a CPU e não
+libera o GIL. O processo principal grava cada PDF no ZIP assim que ele
+fica pronto, direto no disco, então a memória usada não cresce com a
+quantidade de remessas.
+
+Usada pelo comando 'exportar_recibos' e pelas tarefas do tipo EXPORTACAO
+(enfileiradas pelo histórico de remessas).
+"""
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+
+def filtrar_remessas_exportacao(inicio=None, fim=None, status='', cliente_id=None):
+    """
+    Retorna os IDs das remessas a exportar, em ordem de data de saída.
+
+    Parâmetros:
+    - inicio, fim: datas (date) da saída, inclusive; None para não limitar
+    - status: 'ABERTO', 'FINALIZADO' ou '' para todos
+    - cliente_id: ID do cliente, ou None para todos
+    """
+    from clientes.models import Remessa
+
+    remessas = Remessa.objects.order_by('data_saida', 'id')
+    if inicio:
+        remessas = remessas.filter(data_saida__date__gte=inicio)
+    if fim:
+        remessas = remessas.filter(data_saida__date__lte=fim)
+    if status:
+        remessas = remessas.filter(status=status)
+    if cliente_id:
+        remessas = remessas.filter(cliente_id=cliente_id)
+    return list(remessas.values_list('id', flat=True))
+
+
+def _gerar_recibo(remessa_id):
+    """
+    Gera o PDF de uma remessa. Executada nos processos do pool.
+    """
+    from .gerarRecibo import gerar_recibo_remessa
+
+    return remessa_id, gerar_recibo_remessa(remessa_id)['pdf_bytes']
+
+
+def exportar_recibos(remessa_ids, destino, processos=1, progresso=None):
+    """
+    Gera os recibos das remessas informadas e grava todos em um ZIP.
+
+    Parâmetros:
+    - remessa_ids: lista de IDs (veja filtrar_remessas_exportacao)
+    - destino: caminho do arquivo ZIP
+    - processos: quantidade de processos geradores; com 1 (ou só uma
+      remessa) os recibos são gerados no próprio processo
+    - progresso: função opcional chamada com (concluidos, total) a cada recibo
+
+    Retorna um dicionário com 'recibos', 'segundos' e 'recibos_por_segundo'.
+    """
+    from django.db import connections
+
+    from tarefas.processos import inicializar_processo
+
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    total = len(remessa_ids)
+    inicio = time.perf_counter()
+
+    # O ZIP é montado em um arquivo temporário e renomeado no final, para
+    # que ninguém baixe uma exportação pela metade.
+    descritor, temporario = tempfile.mkstemp(dir=destino.parent, suffix='.tmp')
+    os.close(descritor)
+    try:
+        with zipfile.ZipFile(temporario, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo_zip:
+            if processos <= 1 or total <= 1:
+                recibos = map(_gerar_recibo, remessa_ids)
+                _gravar_recibos(arquivo_zip, recibos, total, progresso)
+            else:
+                # Os processos filhos abrem suas próprias conexões com o banco.
+                connections.close_all()
+                # Blocos de IDs por envio, para não pagar a comunicação entre
+                # processos a cada recibo.
+                bloco = max(1, min(16, total // (processos * 4)))
+                with ProcessPoolExecutor(
+                    max_workers=processos,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=inicializar_processo,
+                ) as pool:
+                    recibos = pool.map(_gerar_recibo, remessa_ids, chunksize=bloco)
+                    _gravar_recibos(arquivo_zip, recibos, total, progresso)
+        os.replace(temporario, destino)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'recibos': total,
+        'segundos': segundos,
+        'recibos_por_segundo': total / segundos if segundos else 0.0,
+    }
+
+
+def _gravar_recibos(arquivo_zip, recibos, total, progresso):
+    for concluidos, (remessa_id, pdf_bytes) in enumerate(recibos, start=1):
+        arquivo_zip.writestr(f"recibo_remessa_{remessa_id}.pdf", pdf_bytes)
+        if progresso is not None:
+            progresso(concluidos, total)
@@ -1,18 +1,47 @@
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import inch
 from reportlab.lib.pagesizes import letter
+from decimal import ROUND_HALF_UP, Decimal
 from io import BytesIO
 import base64
 import datetime
 
-def gerar_recibo_pdf(my_prod: dict, my_sale: dict, codigo_barras: str, nome_cliente: str, situacao: str, data_nota=datetime.datetime.now().strftime("%d-%b-%Y"), cnpj="12345678910", discount_rate=0, tax_rate=0, nome_arquivo='Recibo.pdf', remessa_id="-", retornar_bytes=False):
+# Código exibido quando o produto não existe mais ou não tem código de barras.
+CODIGO_BARRAS_PADRAO = "0000000000000"
+
+CENTAVOS = Decimal('0.01')
+
+class LinhaRecibo:
+    """
+    Uma linha do recibo. Valores em Decimal; linhas 'removidas' (devolvidas
+    por completo no acerto) saem riscadas e não entram nos totais.
+    """
+    __slots__ = ('nome', 'preco_unitario', 'quantidade', 'codigo_barras', 'removido')
+
+    def __init__(self, nome, preco_unitario, quantidade, codigo_barras=None, removido=False):
+        self.nome = str(nome)
+        self.preco_unitario = preco_unitario if isinstance(preco_unitario, Decimal) else Decimal(str(preco_unitario or 0))
+        self.quantidade = int(quantidade)
+        self.codigo_barras = codigo_barras or CODIGO_BARRAS_PADRAO
+        self.removido = removido
+
+    @property
+    def subtotal(self):
+        if self.removido:
+            return Decimal('0.00')
+        return (self.preco_unitario * self.quantidade).quantize(CENTAVOS)
+
+    def __repr__(self):
+        riscado = ' (removido)' if self.removido else ''
+        return f"<LinhaRecibo {self.nome} {self.quantidade} x {self.preco_unitario}{riscado}>"
+
+def gerar_recibo_pdf(linhas, nome_cliente: str, situacao: str, data_nota=datetime.datetime.now().strftime("%d-%b-%Y"), cnpj="12345678910", discount_rate=0, tax_rate=0, nome_arquivo='Recibo.pdf', remessa_id="-", retornar_bytes=False, incluir_base64=False):
     """
     Gera um recibo em PDF com os dados fornecidos
     
     Parâmetros:
-    - my_prod: dicionário com produtos {id: [nome, preço]}
-    - my_sale: dicionário com vendas {id_produto: quantidade}
-    - codigo_barras: lista com códigos de barras de 13 dígitos na ordem dos produtos
+    - linhas: iterável (lista ou gerador) de LinhaRecibo, percorrido uma
+      única vez; os totais são calculados enquanto as linhas são desenhadas
     - discount_rate: taxa de desconto em % (padrão é 0)
     - tax_rate: taxa de imposto em % (padrão é 0)
     - cnpj: CNPJ da empresa
@@ -21,19 +50,30 @@ def gerar_recibo_pdf(my_prod: dict, my_sale: dict, codigo_barras: str, nome_clie
     - nome_arquivo: nome do arquivo PDF a ser gerado (padrão é 'Recibo.pdf')
     - remessa_id: ID da remessa (opcional, padrão é "-")
     - retornar_bytes: se True, retorna o PDF como bytes em memória; se False, salva em arquivo (Colocar True no Django)
+    - incluir_base64: se True (e retornar_bytes=True), inclui também uma cópia do PDF em base64
     - situacao: situação da remessa em string (pode ser 'EM ABERTO' ou 'VENDA')
     
     Retorna:
-    - Se retornar_bytes=True: dicionário com 'pdf_bytes' e 'pdf_base64'
+    - Se retornar_bytes=True: dicionário com 'pdf_bytes' e 'nome_arquivo' (e 'pdf_base64', se pedido)
     - Se retornar_bytes=False: None (salva arquivo em disco)
     """
     
-    # ==================== INÍCIO DA FUNÇÃO DE CABEÇALHO ====================
-    def criar_cabecalho(c):
+    # ==================== INÍCIO DO FUNDO DAS PÁGINAS ====================
+    def criar_fundo_pagina(c):
         """
-        Cria o cabeçalho da nota fiscal com logo, endereço, data, etc.
+        Define uma única vez as partes fixas das páginas como forms (XObjects)
+        do PDF, que cada página apenas referencia em vez de desenhar de novo:
+        - 'fundo_recibo': endereço, CNPJ, linha separadora, marca d'água e
+          cabeçalhos das colunas (desenhado antes dos itens)
+        - 'grade_recibo': linhas separadoras das colunas (desenhado depois
+          dos itens, por cima das faixas cinzas)
         """
-        c.translate(inch, inch)
+        # Os forms usam o mesmo sistema de coordenadas das páginas (deslocado
+        # em 1 polegada por criar_cabecalho) e cobrem a página inteira.
+        largura, altura = letter
+        area = {'lowerx': -inch, 'lowery': -inch, 'upperx': largura - inch, 'uppery': altura - inch}
+
+        c.beginForm('fundo_recibo', **area)
         c.setFont("Helvetica", 14)
         c.setStrokeColorRGB(0, 0, 0)
         c.setFillColorRGB(0, 0, 0)
@@ -46,25 +86,11 @@ def gerar_recibo_pdf(my_prod: dict, my_sale: dict, codigo_barras: str, nome_clie
         c.drawString(0, 8.7*inch, "Cidade: Minha Cidade, CEP : 12345")
 
         # LINHA SEPARADORA
-        c.setFillColorRGB(0, 0, 0)
         c.line(0, 8.6*inch, 7*inch, 8.6*inch)
 
-        # INFORMAÇÕES DA NOTA (lado direito)
-        c.drawString(5.6*inch, 9.5*inch, f'Remessa ID :{remessa_id}')
-        c.drawString(5.6*inch, 9.3*inch, data_nota)
-        
-        # NOME DO CLIENTE (destacado abaixo da data)
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(4.3*inch, 8.7*inch, f'Cliente: {nome_cliente}')
-        
         c.setFont("Helvetica", 8)
         c.drawString(3*inch, 9.6*inch, f'CNPJ Nº :{cnpj}')
 
-        # TÍTULO (vazio no momento)
-        c.setFillColorRGB(0, 0, 0)
-        c.setFont("Helvetica-Bold", 15)
-        c.drawString(5.6*inch, 9*inch, situacao) # Onde ficava escrito "NOTA FISCAL"
-
         # MARCA D'ÁGUA
         c.rotate(45)
         c.setFillColorCMYK(0, 0, 0, 0.05)  # Transparência
@@ -80,6 +106,41 @@ def gerar_recibo_pdf(my_prod: dict, my_sale: dict, codigo_barras: str, nome_clie
         c.drawString(4.65*inch, 8.3*inch, 'Preço')
         c.drawString(5.43*inch, 8.3*inch, 'Qtd')
         c.drawString(6.22*inch, 8.3*inch, 'Total')
+        c.endForm()
+
+        # LINHAS VERTICAIS SEPARADORAS
+        c.beginForm('grade_recibo', **area)
+        c.setStrokeColorCMYK(0, 0, 0, 1)
+        c.line(1.4*inch, 8.3*inch, 1.4*inch, 1*inch)  # Separador Código/Produtos
+        c.line(4.5*inch, 8.3*inch, 4.5*inch, 1*inch)  # Separador Produtos/Preço (movido para direita)
+        c.line(5.3*inch, 8.3*inch, 5.3*inch, 1*inch)  # Separador Preço/Quantidade (mantido)
+        c.line(5.9*inch, 8.3*inch, 5.9*inch, 1*inch)  # Separador Quantidade/Total (mantido)
+        c.line(0.01*inch, 1*inch, 7*inch, 1*inch)   # Linha horizontal mais baixa
+        c.endForm()
+    # ==================== FIM DO FUNDO DAS PÁGINAS ====================
+
+    # ==================== INÍCIO DA FUNÇÃO DE CABEÇALHO ====================
+    def criar_cabecalho(c):
+        """
+        Cria o cabeçalho da página: o fundo fixo (form 'fundo_recibo') e os
+        dados da remessa (ID, data, cliente e situação).
+        """
+        c.translate(inch, inch)
+        c.doForm('fundo_recibo')
+        c.setFillColorRGB(0, 0, 0)
+
+        # INFORMAÇÕES DA NOTA (lado direito)
+        c.setFont("Helvetica", 14)
+        c.drawString(5.6*inch, 9.5*inch, f'Remessa ID :{remessa_id}')
+        c.drawString(5.6*inch, 9.3*inch, data_nota)
+        
+        # NOME DO CLIENTE (destacado abaixo da data)
+        c.setFont("Helvetica-Bold", 12)
+        c.drawString(4.3*inch, 8.7*inch, f'Cliente: {nome_cliente}')
+
+        # SITUAÇÃO DA REMESSA
+        c.setFont("Helvetica-Bold", 15)
+        c.drawString(5.6*inch, 9*inch, situacao) # Onde ficava escrito "NOTA FISCAL"
 
         return c
     # ==================== FIM DA FUNÇÃO DE CABEÇALHO ====================
@@ -92,6 +153,7 @@ def gerar_recibo_pdf(my_prod: dict, my_sale: dict, codigo_barras: str, nome_clie
     else:
         c = canvas.Canvas(nome_arquivo, pagesize=letter)
     
+    criar_fundo_pagina(c)
     c = criar_cabecalho(c)
 
     # ==================== INÍCIO DO PROCESSAMENTO DOS PRODUTOS ====================
@@ -99,21 +161,20 @@ def gerar_recibo_pdf(my_prod: dict, my_sale: dict, codigo_barras: str, nome_clie
     c.setFont("Helvetica", 10)  # Fonte menor: de 20 para 10
     row_gap = 0.14  # Espaçamento menor: de 0.3 para 0.14
     line_y = 7.9   # Posição Y inicial
-    total = 0      # Total geral
+    total = Decimal('0.00')  # Total geral (sem os itens removidos)
+    total_quantity = 0       # Total de itens (sem os itens removidos)
     row_counter = 0      # Contador para faixas alternadas
     items_per_page = 50  # Aumentado: de 20 para 46 produtos por página
     current_item = 0     # Contador de itens na página atual
 
-    # Converter my_sale para lista para paginação
-    sale_items = list(my_sale.items())
-
-    # LOOP PRINCIPAL - PROCESSAR CADA PRODUTO
-    for i, (item_id, quantity) in enumerate(sale_items):
-        if quantity == 0:
+    # LOOP PRINCIPAL - PROCESSAR CADA LINHA (uma única passagem)
+    for linha in linhas:
+        if linha.quantidade == 0:
             continue
             
         # VERIFICAR SE PRECISA CRIAR NOVA PÁGINA
-        if current_item >= items_per_page and i < len(sale_items):
+        if current_item >= items_per_page:
+            c.doForm('grade_recibo')  # Separadores das colunas por cima das faixas
             c.showPage()  # Finalizar página atual
             c = criar_cabecalho(c)  # Criar nova página com cabeçalho
             c.setFillColorRGB(0, 0, 0)
@@ -131,56 +192,39 @@ def gerar_recibo_pdf(my_prod: dict, my_sale: dict, codigo_barras: str, nome_clie
         c.setFont("Helvetica", 10)  # Garantir fonte pequena
         
         # Código de barras (13 dígitos)
-        codigo = codigo_barras[i] if i < len(codigo_barras) else "0000000000000"
-        c.drawString(0.1*inch, line_y*inch, str(codigo))
-        
-        # Nome do produto - verificar se começa com "~" para riscar
-        nome_produto = str(my_prod[item_id][0])
-        produto_riscado = nome_produto.startswith("~")
+        c.drawString(0.1*inch, line_y*inch, linha.codigo_barras)
         
-        if produto_riscado:
-            # Remove o "~" do nome para exibição
-            nome_produto_display = nome_produto[1:]
-        else:
-            nome_produto_display = nome_produto
-            
-        c.drawString(1.5*inch, line_y*inch, nome_produto_display)
+        # Nome do produto
+        c.drawString(1.5*inch, line_y*inch, linha.nome)
         
-        # Se o produto está riscado, desenhar linha sobre o texto
-        if produto_riscado:
+        # Se o produto foi removido, desenhar linha sobre o texto
+        if linha.removido:
             # Calcular largura aproximada do texto para desenhar a linha
-            texto_largura = c.stringWidth(nome_produto_display, "Helvetica", 10)
+            texto_largura = c.stringWidth(linha.nome, "Helvetica", 10)
             c.setStrokeColorRGB(0, 0, 0)  # Cor preta para a linha
             c.line(1.5*inch, (line_y + 0.05)*inch, (1.5*inch + texto_largura), (line_y + 0.05)*inch)
         
-        # Preço (campo 20% menor) - Se produto riscado, preço = 0
-        preco_exibicao = 0.0 if produto_riscado else my_prod[item_id][1]
+        # Preço (campo 20% menor) - Se produto removido, preço = 0
+        preco_exibicao = Decimal('0.00') if linha.removido else linha.preco_unitario
         c.drawRightString(5.25*inch, line_y*inch, f"{preco_exibicao:.2f}")
         
         # Quantidade (campo metade do tamanho)
-        c.drawRightString(5.65*inch, line_y*inch, str(quantity))
+        c.drawRightString(5.65*inch, line_y*inch, str(linha.quantidade))
         
-        # CALCULAR E DESENHAR SUBTOTAL - Se produto riscado, subtotal = 0
-        if produto_riscado:
-            sub_total = 0.0
-        else:
-            sub_total = my_prod[item_id][1] * quantity
-            
+        # SUBTOTAL - Se produto removido, subtotal = 0
+        sub_total = linha.subtotal
         c.drawRightString(6.85*inch, line_y*inch, f"{sub_total:.2f}")  # Campo total reduzido pela metade
-        total = round(total + sub_total, 2)
+        total += sub_total
+        if not linha.removido:
+            total_quantity += linha.quantidade
         
         # AVANÇAR PARA PRÓXIMA LINHA
         line_y = line_y - row_gap
         row_counter += 1
         current_item += 1
     # ==================== FIM DO PROCESSAMENTO DOS PRODUTOS ====================
-    # LINHAS VERTICAIS SEPARADORAS
-        c.setStrokeColorCMYK(0, 0, 0, 1)
-        c.line(1.4*inch, 8.3*inch, 1.4*inch, 1*inch)  # Separador Código/Produtos
-        c.line(4.5*inch, 8.3*inch, 4.5*inch, 1*inch)  # Separador Produtos/Preço (movido para direita)
-        c.line(5.3*inch, 8.3*inch, 5.3*inch, 1*inch)  # Separador Preço/Quantidade (mantido)
-        c.line(5.9*inch, 8.3*inch, 5.9*inch, 1*inch)  # Separador Quantidade/Total (mantido)
-        c.line(0.01*inch, 1*inch, 7*inch, 1*inch)   # Linha horizontal mais baixa
+    # LINHAS VERTICAIS SEPARADORAS DA ÚLTIMA PÁGINA
+    c.doForm('grade_recibo')
     # ==================== INÍCIO DA SEÇÃO DE TOTAIS ====================
     c.setFillColorRGB(0, 0, 0)
     c.setFont("Helvetica", 18)  # Fonte menor para totais
@@ -198,29 +242,23 @@ def gerar_recibo_pdf(my_prod: dict, my_sale: dict, codigo_barras: str, nome_clie
     c.setFont("Helvetica-Bold", 18)
     c.drawString(1*inch, -0.5*inch, 'Total')
 
-    # TOTAL DE ITENS E SUBTOTAL (posição mais baixa) - Excluir produtos riscados
-    total_quantity = 0
-    for item_id, quantity in my_sale.items():
-        # Verificar se o produto não está riscado (não começa com "~")
-        nome_produto = str(my_prod[item_id][0])
-        if not nome_produto.startswith("~"):
-            total_quantity += quantity
-    
+    # TOTAL DE ITENS E SUBTOTAL (posição mais baixa) - já calculados no laço,
+    # sem os produtos removidos
     c.setFont("Helvetica", 14)
     c.drawString(0.1*inch, 0.75*inch, f'Total de Itens: {total_quantity}')
     c.drawString(5*inch, 0.75*inch, 'Subtotal:')
 
     # CÁLCULOS E VALORES DOS TOTAIS
     c.setFont("Helvetica", 18)
-    c.drawRightString(6.85*inch, 0.75*inch, f"{float(total):.2f}")  # Subtotal
+    c.drawRightString(6.85*inch, 0.75*inch, f"{total:.2f}")  # Subtotal
     
     # DESCONTO
-    discount = round((discount_rate / 100) * total, 2)
+    discount = (Decimal(str(discount_rate)) / 100 * total).quantize(CENTAVOS, ROUND_HALF_UP)
     c.drawRightString(4*inch, 0.1*inch, str(discount_rate) + '%')
     c.drawRightString(6.85*inch, 0.1*inch, f"-{discount:.2f}")
     
     # IMPOSTO
-    tax = round((tax_rate / 100) * (total - discount), 2)
+    tax = (Decimal(str(tax_rate)) / 100 * (total - discount)).quantize(CENTAVOS, ROUND_HALF_UP)
     c.drawRightString(4*inch, -0.2*inch, str(tax_rate) + '%')
     c.drawRightString(6.85*inch, -0.2*inch, f"{tax:.2f}")
     
@@ -236,99 +274,92 @@ def gerar_recibo_pdf(my_prod: dict, my_sale: dict, codigo_barras: str, nome_clie
     c.save()
     
     if retornar_bytes:
-        # Retornar PDF como bytes e base64 para uso no Django
+        # Retornar PDF como bytes para uso no Django. As views enviam o PDF
+        # binário; o base64 só é gerado quando alguém pede.
         pdf_bytes = buffer.getvalue()
         buffer.close()
-        pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
         
-        return {
+        resultado = {
             'pdf_bytes': pdf_bytes,
-            'pdf_base64': pdf_base64,
             'nome_arquivo': nome_arquivo
         }
+        if incluir_base64:
+            resultado['pdf_base64'] = base64.b64encode(pdf_bytes).decode('utf-8')
+        return resultado
     else:
         print(f"Nota fiscal gerada com sucesso: {nome_arquivo}")
         return None
     # ==================== FIM DA FINALIZAÇÃO ====================
 
+def montar_linhas_recibo(itens):
+    """
+    Gera as linhas de um recibo (LinhaRecibo) buscando o nome e o código de
+    barras de todos os produtos em uma única consulta, pelo ID do produto.
+    
+    Parâmetros:
+    - itens: lista de dicionários {produto_id, quantidade, preco_unitario,
+      nome (opcional), removido (opcional)}. O nome só é usado se o produto
+      não existir mais; itens removidos saem riscados.
+    
+    Retorna:
+    - Gerador de LinhaRecibo, na ordem dos itens
+    """
+    from produtos.models import Produto
+
+    def produto_id(item):
+        try:
+            return int(item.get('produto_id'))
+        except (TypeError, ValueError):
+            return None
+
+    ids = {produto_id(item) for item in itens} - {None}
+    produtos = Produto.objects.only('nome', 'codigo_barras').in_bulk(ids)
+
+    for item in itens:
+        produto = produtos.get(produto_id(item))
+        yield LinhaRecibo(
+            nome=produto.nome if produto else item.get('nome', 'Produto Desconhecido'),
+            preco_unitario=item.get('preco_unitario'),
+            quantidade=item['quantidade'],
+            codigo_barras=produto.codigo_barras if produto else None,
+            removido=bool(item.get('removido')),
+        )
+
 def indexar_acerto(itensContinuam, itensRemovidos, acaoFinal, remessaID):
     """
     Gera um recibo de acerto de contas combinando itens que continuam com o cliente
     e itens que foram removidos (marcados com "~").
     
     Parâmetros:
-    - itensContinuam: lista de dicionários com itens que continuam {nome, quantidade, preco_unitario}
-    - itensRemovidos: dicionário com produtos removidos {nome_produto: quantidade}
+    - itensContinuam: lista de dicionários com itens que continuam {produto_id, nome, quantidade, preco_unitario}
+    - itensRemovidos: dicionário com produtos removidos {produto_id: quantidade}
     - acaoFinal: string indicando a ação final ('FECHAR' ou 'ABERTO')
     - remessaID: ID da remessa para buscar dados no banco
     
     Retorna:
-    - Dicionário com dados do PDF gerado (pdf_base64, nome_arquivo)
+    - Dicionário com dados do PDF gerado (pdf_bytes, nome_arquivo)
     """
-    from produtos.models import Produto
     from clientes.models import Remessa
     
     try:
         # Buscar dados da remessa no banco de dados
-        remessa = Remessa.objects.get(id=remessaID) if remessaID else None
+        remessa = Remessa.objects.select_related('cliente').get(id=remessaID) if remessaID else None
         nome_cliente = remessa.cliente.nome_completo if remessa else 'Cliente Desconhecido'
         data_saida = remessa.data_saida.strftime('%d/%m/%Y') if remessa and remessa.data_saida else 'N/A'
         
         # Definir tipo da remessa baseado na ação final
         tipoRemessa = 'FINALIZADO' if acaoFinal == 'FECHAR' else 'EM ABERTO'
         
-        # Inicializar contadores e dicionários para a função gerar_recibo_pdf
-        count = 1
-        my_prod = {}  # {id: [nome_produto, preco]}
-        my_sale = {}  # {id: quantidade}
-        codigo_barras = []
-        
-        # PROCESSAR ITENS QUE CONTINUAM COM O CLIENTE
-        for item in itensContinuam:
-            nome_produto = item['nome']
-            quantidade = int(item['quantidade'])
-            preco_unitario = float(item['preco_unitario'])
-            
-            # Buscar código de barras do produto
-            try:
-                produto = Produto.objects.get(nome=nome_produto)
-                codigo_produto = produto.codigo_barras
-            except Produto.DoesNotExist:
-                codigo_produto = "0000000000000"  # Código padrão se não encontrar
-            
-            # Adicionar aos dicionários
-            temp_list = [nome_produto, preco_unitario]
-            my_prod[count] = temp_list
-            my_sale[count] = quantidade
-            codigo_barras.append(codigo_produto)
-            count += 1
-        
-        # PROCESSAR ITENS REMOVIDOS (COM "~" NO NOME)
-        for nome_produto, quantidade in itensRemovidos.items():
-            # Adicionar "~" no início do nome para marcar como removido
-            nome_produto_riscado = f"~{nome_produto}"
-            
-            # Buscar dados do produto no banco para pegar preço e código de barras
-            try:
-                produto = Produto.objects.get(nome=nome_produto)
-                preco_unitario = float(produto.preco_venda)
-                codigo_produto = produto.codigo_barras
-            except Produto.DoesNotExist:
-                preco_unitario = 0.0
-                codigo_produto = "0000000000000"
-            
-            # Adicionar aos dicionários com nome riscado
-            temp_list = [nome_produto_riscado, preco_unitario]
-            my_prod[count] = temp_list
-            my_sale[count] = int(quantidade)
-            codigo_barras.append(codigo_produto)
-            count += 1
+        # Itens que continuam com o cliente, seguidos dos removidos (riscados).
+        # Os códigos de barras de todos vêm de uma única consulta.
+        itens = list(itensContinuam) + [
+            {'produto_id': produto_id, 'quantidade': quantidade, 'removido': True}
+            for produto_id, quantidade in itensRemovidos.items()
+        ]
         
         # GERAR O PDF USANDO A FUNÇÃO PRINCIPAL
         resultado = gerar_recibo_pdf(
-            my_prod=my_prod,
-            my_sale=my_sale,
-            codigo_barras=codigo_barras,
+            linhas=montar_linhas_recibo(itens),
             nome_cliente=nome_cliente,
             data_nota=data_saida,
             remessa_id=remessaID,
@@ -345,3 +376,48 @@ def indexar_acerto(itensContinuam, itensRemovidos, acaoFinal, remessaID):
             'success': False,
             'error': f'Erro ao gerar recibo de acerto: {str(e)}'
         }
+
+def gerar_recibo_remessa(remessaID):
+    """
+    Gera novamente o recibo de uma remessa já registrada, a partir dos itens
+    gravados no banco de dados.
+    
+    Parâmetros:
+    - remessaID: ID da remessa
+    
+    Retorna:
+    - Dicionário com dados do PDF gerado (pdf_bytes, nome_arquivo)
+    """
+    from clientes.models import Remessa
+
+    remessa = Remessa.objects.select_related('cliente').get(id=remessaID)
+    # Os produtos vêm na mesma consulta dos itens (sem uma consulta por item).
+    itensRemessa = remessa.itens.select_related('produto').only(
+        'remessa_id', 'quantidade', 'preco_venda_unitario_na_saida', 'produto__nome', 'produto__codigo_barras'
+    ).order_by('id')
+
+    # Preparar dados para a função gerar_recibo_pdf
+    nome_cliente = remessa.cliente.nome_completo
+    data_saida = remessa.data_saida.strftime('%d/%m/%Y') if remessa.data_saida else 'N/A'
+    tipoRemessa = 'EM ABERTO' if remessa.status == 'ABERTO' else 'FINALIZADO'
+
+    # As linhas são lidas do banco em blocos enquanto o PDF é desenhado,
+    # sem carregar todos os itens na memória.
+    linhas = (
+        LinhaRecibo(
+            nome=item.produto.nome,
+            preco_unitario=item.preco_venda_unitario_na_saida,
+            quantidade=item.quantidade,
+            codigo_barras=item.produto.codigo_barras,
+        )
+        for item in itensRemessa.iterator(chunk_size=2000)
+    )
+
+    return gerar_recibo_pdf(
+        linhas=linhas,
+        nome_cliente=nome_cliente,
+        data_nota=data_saida,
+        remessa_id=remessaID,
+        situacao=tipoRemessa,
+        retornar_bytes=True
+    )
@@ -0,0 +1,72 @@
+"""
+Métricas simples de desempenho, mantidas em memória em cada processo.
+
+Servem para acompanhar contadores (ex.: acertos do cache) e tempos
+(ex.: quanto tempo uma transação segurou o banco de dados), sem depender
+de nenhum serviço externo.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_trava = threading.Lock()
+_contadores = defaultdict(int)
+_tempos = {}
+
+
+def incrementar(nome, valor=1):
+    """
+    Soma 'valor' ao contador 'nome'.
+    """
+    with _trava:
+        _contadores[nome] += valor
+
+
+def registrar_tempo(nome, milissegundos):
+    """
+    Registra uma medição de tempo (em ms) para a métrica 'nome'.
+    """
+    with _trava:
+        tempo = _tempos.setdefault(nome, {'quantidade': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'ultimo_ms': 0.0})
+        tempo['quantidade'] += 1
+        tempo['total_ms'] += milissegundos
+        tempo['max_ms'] = max(tempo['max_ms'], milissegundos)
+        tempo['ultimo_ms'] = milissegundos
+    logger.debug("%s: %.2f ms", nome, milissegundos)
+
+
+@contextmanager
+def medir_tempo(nome):
+    """
+    Mede o tempo gasto dentro do bloco 'with' e o registra em 'nome'.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar_tempo(nome, (time.perf_counter() - inicio) * 1000)
+
+
+def obter_metricas():
+    """
+    Retorna uma cópia de todas as métricas, com a média calculada para os tempos.
+    """
+    with _trava:
+        tempos = {
+            nome: dict(valores, media_ms=valores['total_ms'] / valores['quantidade'])
+            for nome, valores in _tempos.items()
+        }
+        return {'contadores': dict(_contadores), 'tempos': tempos}
+
+
+def zerar_metricas():
+    """
+    Apaga todas as métricas registradas.
+    """
+    with _trava:
+        _contadores.clear()
+        _tempos.clear()
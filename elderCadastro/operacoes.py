@@ -0,0 +1,144 @@
+"""
+Operações de saída e acerto de remessas feitas em lote.
+
+Cada operação executa um número fixo de consultas, independente da
+quantidade de itens, e deve ser chamada dentro de transacao_escrita() (ver banco.py).
+"""
+from collections import defaultdict
+
+from clientes.models import ItemRemessa
+from monitoramento.models import ItemVenda
+from produtos.estoque import baixar_estoque_em_lote, devolver_estoque_em_lote
+from produtos.models import Produto
+
+from .painel import invalidar_painel
+
+
+def registrar_saida_em_lote(remessa, produtos, venda=None):
+    """
+    Registra os itens de uma nova remessa (venda ou consignado) com consultas em lote.
+
+    Mantém as regras de ItemRemessa.save: o preço de venda é "congelado" no
+    item e a saída só acontece se houver estoque suficiente (conferido pelo
+    UPDATE condicional de baixar_estoque_em_lote).
+
+    Parâmetros:
+    - remessa: a Remessa recém-criada
+    - produtos: lista de dicionários {id, quantidade} enviada pelo frontend
+    - venda: Venda correspondente, ou None se for consignado
+
+    Lança Produto.DoesNotExist se algum produto não existir e ValueError
+    se faltar estoque.
+    """
+    quantidades = defaultdict(int)
+    for item_data in produtos:
+        quantidades[int(item_data['id'])] += int(item_data['quantidade'])
+
+    produtos_bd = Produto.objects.only('nome', 'preco_venda').in_bulk(quantidades)
+    if len(produtos_bd) != len(quantidades):
+        raise Produto.DoesNotExist("Um dos produtos não foi encontrado.")
+
+    # Não conferimos o estoque lido acima: outro terminal pode vender o mesmo
+    # produto antes da baixa. A conferência é feita pelo UPDATE condicional.
+    baixar_estoque_em_lote(quantidades)
+
+    status_item = 'VENDIDO' if venda is not None else 'CONSIGNADO'
+    itens_remessa = []
+    itens_venda = []
+    for produto_id, quantidade in quantidades.items():
+        produto = produtos_bd[produto_id]
+        itens_remessa.append(ItemRemessa(
+            remessa=remessa,
+            produto=produto,
+            quantidade=quantidade,
+            preco_venda_unitario_na_saida=produto.preco_venda,
+            status_item=status_item
+        ))
+        if venda is not None:
+            # Cria o item de venda para monitoramento
+            itens_venda.append(ItemVenda(
+                venda=venda,
+                produto=produto,
+                quantidade=quantidade,
+                preco_unitario_venda=produto.preco_venda
+            ))
+
+    ItemRemessa.objects.bulk_create(itens_remessa)
+    if itens_venda:
+        ItemVenda.objects.bulk_create(itens_venda)
+    remessa.atualizar_totais()
+    invalidar_painel()
+    return itens_remessa
+
+
+def processar_acerto_em_lote(remessa, itens, venda=None):
+    """
+    Aplica o acerto de contas de uma remessa com consultas em lote.
+
+    Parâmetros:
+    - remessa: a Remessa sendo acertada
+    - itens: lista de dicionários {id, quantidade} enviada pelo frontend, onde
+      'quantidade' é o que fica com o cliente (0 = devolvido por completo)
+    - venda: Venda criada para o fechamento, ou None se a remessa continua aberta
+
+    Retorna uma tupla (itens_continuam, produtos_removidos) no formato
+    esperado por indexar_acerto: os produtos são identificados pelo ID.
+    """
+    quantidades_depois = {int(item_['id']): int(item_['quantidade']) for item_ in itens}
+    itens_bd = ItemRemessa.objects.filter(
+        remessa=remessa, pk__in=quantidades_depois
+    ).select_related('produto').in_bulk()
+
+    faltando = set(quantidades_depois) - set(itens_bd)
+    if faltando:
+        raise ItemRemessa.DoesNotExist(f"Itens não encontrados na remessa: {sorted(faltando)}")
+
+    itens_continuam = []
+    produtos_removidos = {}
+    itens_venda = []
+    devolucoes = defaultdict(int)
+    itens_alterados = []
+
+    for item_id, quantidade_depois in quantidades_depois.items():
+        item = itens_bd[item_id]
+        quantidade_antes = item.quantidade
+        quantidade_a_ser_devolvida = quantidade_antes - quantidade_depois
+
+        # Se a quantidade depois é 0, o produto foi completamente removido
+        if quantidade_depois == 0:
+            produtos_removidos[item.produto_id] = produtos_removidos.get(item.produto_id, 0) + quantidade_antes
+        # Se a quantidade depois > 0, o produto continua (parcialmente)
+        elif quantidade_depois > 0:
+            itens_continuam.append({
+                'produto_id': item.produto_id,
+                'nome': item.produto.nome,
+                'quantidade': quantidade_depois,
+                'preco_unitario': item.preco_venda_unitario_na_saida
+            })
+
+        # Cadastrar os itens que ficaram na remessa no ItemVenda
+        if venda is not None and quantidade_depois > 0:
+            itens_venda.append(ItemVenda(
+                venda=venda,
+                produto=item.produto,
+                quantidade=quantidade_depois,
+                preco_unitario_venda=item.preco_venda_unitario_na_saida
+            ))
+
+        # Mesmas regras de ItemRemessa.devolver_ao_estoque
+        if item.status_item == 'CONSIGNADO' and 0 < quantidade_a_ser_devolvida <= item.quantidade:
+            item.quantidade -= quantidade_a_ser_devolvida
+            if item.quantidade == 0:
+                item.status_item = 'DEVOLVIDO'
+            devolucoes[item.produto_id] += quantidade_a_ser_devolvida
+            itens_alterados.append(item)
+
+    if itens_venda:
+        ItemVenda.objects.bulk_create(itens_venda)
+    devolver_estoque_em_lote(devolucoes)
+    if itens_alterados:
+        ItemRemessa.objects.bulk_update(itens_alterados, ['quantidade', 'status_item'])
+    remessa.atualizar_totais()
+    invalidar_painel()
+
+    return itens_continuam, produtos_removidos
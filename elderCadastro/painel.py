@@ -0,0 +1,86 @@
+"""
+Números do painel inicial (home).
+
+Os quatro valores são calculados no banco com duas agregações: uma sobre
+Produto (estoque) e outra sobre os itens consignados. A segunda usa o índice
+de ItemRemessa (status_item, quantidade, preco_venda_unitario_na_saida), que
+cobre a consulta inteira, então o banco nem lê a tabela de itens.
+
+O resultado fica no cache do Django por até PAINEL_CACHE_TIMEOUT segundos.
+Toda alteração de estoque ou de itens de remessa chama invalidar_painel(),
+e os acertos/falhas do cache aparecem em /metricas/. Em produção o cache é
+compartilhado entre os processos (ver CACHES em settings.py), então a
+invalidação vale para todos.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DecimalField, F, Sum
+
+from .metricas import incrementar
+
+CHAVE_CACHE_PAINEL = 'painel:estatisticas'
+
+
+def calcular_estatisticas_painel():
+    """
+    Retorna um dicionário com os números do painel, sem formatação:
+    valor_estoque, quantidade_estoque, pecas_consignadas e valor_consignado.
+    """
+    # Importados aqui porque os models chamam invalidar_painel().
+    from clientes.models import ItemRemessa
+    from produtos.models import Produto
+
+    estoque = Produto.objects.aggregate(
+        valor=Sum(F('preco_venda') * F('estoque'), output_field=DecimalField()),
+        quantidade=Sum('estoque'),
+    )
+    consignado = ItemRemessa.objects.filter(status_item=ItemRemessa.StatusItem.CONSIGNADO).aggregate(
+        pecas=Sum('quantidade'),
+        valor=Sum(F('preco_venda_unitario_na_saida') * F('quantidade'), output_field=DecimalField()),
+    )
+
+    return {
+        'valor_estoque': estoque['valor'] or Decimal('0.00'),
+        'quantidade_estoque': estoque['quantidade'] or 0,
+        'pecas_consignadas': consignado['pecas'] or 0,
+        'valor_consignado': consignado['valor'] or Decimal('0.00'),
+    }
+
+
+def obter_estatisticas_painel():
+    """
+    Versão com cache de calcular_estatisticas_painel.
+    """
+    estatisticas = cache.get(CHAVE_CACHE_PAINEL)
+    if estatisticas is None:
+        incrementar('painel.cache.falhas')
+        estatisticas = calcular_estatisticas_painel()
+        cache.set(CHAVE_CACHE_PAINEL, estatisticas, settings.PAINEL_CACHE_TIMEOUT)
+    else:
+        incrementar('painel.cache.acertos')
+    return estatisticas
+
+
+def invalidar_painel():
+    """
+    Descarta os números do painel em cache. Dentro de uma transação isso só
+    acontece no commit, para que ninguém guarde no cache dados ainda não
+    confirmados (ou desfeitos depois).
+    """
+    transaction.on_commit(lambda: cache.delete(CHAVE_CACHE_PAINEL))
+
+
+def formatar_estatisticas_painel(estatisticas):
+    """
+    Formata os números do painel do jeito que o template home.html exibe.
+    """
+    valor_estoque = f"{estatisticas['valor_estoque']:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    return {
+        'valor_estoque': valor_estoque,
+        'quantidade_estoque': str(estatisticas['quantidade_estoque']),
+        'total_pecas_consignadas': estatisticas['pecas_consignadas'],
+        'total_valor_consignadas': f"R$ {estatisticas['valor_consignado']:.2f}".replace('.', ','),
+    }
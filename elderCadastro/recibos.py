@@ -0,0 +1,120 @@
+"""
+Arquivo de recibos de remessas já gerados, gravados em disco.
+
+Cada PDF fica em RECIBOS_DIR com o nome 'remessa_<id>_<versao>.pdf'. A versão
+é um hash do conteúdo que aparece no recibo (status, data, cliente, totais
+da remessa e as linhas dos itens, com nome, código de barras e preço), então
+qualquer alteração na remessa, nos itens ou nos produtos impressos gera uma
+versão nova e o PDF antigo deixa de ser usado. Reimprimir uma remessa que
+não mudou apenas lê as colunas dos itens e o arquivo, sem desenhar o PDF.
+
+A mesma versão é usada como ETag na view do recibo, para que o navegador
+não baixe de novo um PDF que já tem.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+# Aumente quando o layout do recibo mudar, para descartar os PDFs antigos.
+VERSAO_LAYOUT_RECIBO = 1
+
+# Colunas da remessa necessárias para calcular a versão do recibo.
+# As linhas dos itens entram por CAMPOS_VERSAO_ITENS (uma consulta à parte).
+CAMPOS_VERSAO_RECIBO = [
+    'status', 'data_saida', 'cliente__nome_completo',
+    'total_pecas', 'valor_total', 'valor_vendido', 'valor_devolvido', 'valor_consignado',
+]
+
+# Colunas de cada item que aparecem no recibo (ou que o identificam).
+CAMPOS_VERSAO_ITENS = [
+    'id', 'quantidade', 'preco_venda_unitario_na_saida',
+    'produto__nome', 'produto__codigo_barras', 'produto__preco_venda',
+]
+
+
+def _gravar_arquivo(caminho, conteudo):
+    """
+    Grava em um arquivo temporário e renomeia, para que uma leitura
+    simultânea nunca encontre um PDF pela metade.
+    """
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=caminho.parent, suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as arquivo:
+            arquivo.write(conteudo)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+
+def remessas_para_recibo():
+    """
+    Queryset de remessas com apenas as colunas usadas por versao_recibo().
+    """
+    from clientes.models import Remessa
+
+    return Remessa.objects.select_related('cliente').only(*CAMPOS_VERSAO_RECIBO)
+
+
+def versao_recibo(remessa):
+    """
+    Retorna a versão do conteúdo do recibo de uma remessa (16 caracteres hex).
+    Além da remessa, entram no hash a quantidade de itens e cada linha de
+    item com os dados do produto, lidos em uma única consulta.
+    """
+    itens = remessa.itens.order_by('id').values_list(*CAMPOS_VERSAO_ITENS)
+    hash_itens = hashlib.sha256()
+    quantidade_itens = 0
+    for linha in itens.iterator(chunk_size=2000):
+        hash_itens.update('|'.join(str(campo) for campo in linha).encode('utf-8') + b'\n')
+        quantidade_itens += 1
+
+    partes = [
+        VERSAO_LAYOUT_RECIBO,
+        remessa.pk,
+        remessa.status,
+        remessa.data_saida.isoformat() if remessa.data_saida else '',
+        remessa.cliente.nome_completo,
+        remessa.total_pecas,
+        remessa.valor_total,
+        remessa.valor_vendido,
+        remessa.valor_devolvido,
+        remessa.valor_consignado,
+        quantidade_itens,
+        hash_itens.hexdigest(),
+    ]
+    conteudo = '|'.join(str(parte) for parte in partes)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()[:16]
+
+
+def caminho_recibo(remessa_id, versao):
+    """
+    Caminho no disco do recibo de uma remessa em uma versão.
+    """
+    return Path(settings.RECIBOS_DIR) / f"remessa_{remessa_id}_{versao}.pdf"
+
+
+def obter_recibo_remessa(remessa):
+    """
+    Retorna o caminho do PDF do recibo da remessa, gerando e gravando o
+    arquivo apenas se a versão atual ainda não estiver no disco.
+    """
+    from .gerarRecibo import gerar_recibo_remessa
+
+    versao = versao_recibo(remessa)
+    caminho = caminho_recibo(remessa.pk, versao)
+    if caminho.exists():
+        return caminho
+
+    _gravar_arquivo(caminho, gerar_recibo_remessa(remessa.pk)['pdf_bytes'])
+
+    # As versões anteriores desta remessa não serão mais usadas.
+    for antigo in caminho.parent.glob(f"remessa_{remessa.pk}_*.pdf"):
+        if antigo != caminho:
+            antigo.unlink(missing_ok=True)
+
+    return caminho
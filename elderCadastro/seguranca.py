@@ -0,0 +1,32 @@
+"""
+Chave secreta e hosts permitidos, lidos das variáveis de ambiente.
+
+No perfil 'producao', ELDER_SECRET_KEY e ELDER_ALLOWED_HOSTS são
+obrigatórias: sem elas o Django não inicia, em vez de subir com a chave de
+desenvolvimento (que está no repositório) ou sem nenhum host aceito.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+# Usada só no desenvolvimento, quando ELDER_SECRET_KEY não está definida.
+CHAVE_DESENVOLVIMENTO = 'django-insecure-qzutg+6nb5yg@$@8f8r)t%!9q2+i58gp)ro3w)sk3qq#su3(o^'
+
+
+def configuracao_seguranca(perfil, ambiente=None):
+    """
+    Retorna (SECRET_KEY, ALLOWED_HOSTS) para o perfil informado.
+    Lança ImproperlyConfigured se faltar alguma variável obrigatória em produção.
+    """
+    if ambiente is None:
+        ambiente = os.environ
+    chave = ambiente.get('ELDER_SECRET_KEY', '')
+    hosts = [host.strip() for host in ambiente.get('ELDER_ALLOWED_HOSTS', '').split(',') if host.strip()]
+
+    if perfil == 'producao':
+        faltando = [nome for nome, valor in (('ELDER_SECRET_KEY', chave), ('ELDER_ALLOWED_HOSTS', hosts)) if not valor]
+        if faltando:
+            raise ImproperlyConfigured(
+                f"No perfil 'producao' é obrigatório definir: {', '.join(faltando)}."
+            )
+    return chave or CHAVE_DESENVOLVIMENTO, hosts
@@ -13,21 +13,27 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from .banco import configuracao_banco
+from .seguranca import configuracao_seguranca
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 LOGIN_URL = '/acesso-negado/'
 
+# Perfil de implantação: 'desenvolvimento' (padrão) ou 'producao'.
+# O perfil e as variáveis ELDER_* escolhem o banco e as conexões (ver elderCadastro/banco.py).
+PERFIL = os.environ.get('ELDER_PERFIL', 'desenvolvimento')
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-qzutg+6nb5yg@$@8f8r)t%!9q2+i58gp)ro3w)sk3qq#su3(o^'
+# Em produção, ELDER_SECRET_KEY e ELDER_ALLOWED_HOSTS são obrigatórias (ver elderCadastro/seguranca.py).
+SECRET_KEY, ALLOWED_HOSTS = configuracao_seguranca(PERFIL)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
-
-ALLOWED_HOSTS = []
+DEBUG = PERFIL == 'desenvolvimento'
 
 
 # Application definition
@@ -42,6 +48,7 @@ INSTALLED_APPS = [
     'produtos',
     'clientes',
     'monitoramento',
+    'tarefas',
 ]
 
 MIDDLEWARE = [
@@ -80,14 +87,45 @@ WSGI_APPLICATION = 'elderCadastro.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite com WAL, busy_timeout e BEGIN IMMEDIATE para vários terminais, ou
+# PostgreSQL (com pool opcional), conforme o perfil e as variáveis ELDER_*
+# (ver elderCadastro/banco.py).
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': configuracao_banco(PERFIL, BASE_DIR / 'db.sqlite3'),
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# No desenvolvimento, cache em memória do processo. Em produção há vários
+# processos (workers do servidor web, processar_tarefas, comandos do
+# manage.py), e o cache precisa ser compartilhado entre eles para que uma
+# invalidação feita em um valha para todos: cache em arquivos, que também
+# não depende de nenhum serviço externo.
+
+if PERFIL == 'producao':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'arquivos' / 'cache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'elder-cadastro',
+        }
+    }
+
+# Tempo máximo (em segundos) que os números do painel inicial ficam em cache.
+# As alterações de estoque e remessas invalidam o cache na hora; com o cache
+# em memória do desenvolvimento, só o do próprio processo, e este limite vale
+# para as feitas por outros processos.
+PAINEL_CACHE_TIMEOUT = 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -132,3 +170,10 @@ STATICFILES_DIRS = [
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Arquivos gerados pelo sistema (PDFs das tarefas em segundo plano, etc.)
+# As tarefas só são processadas com o worker rodando ao lado do servidor web:
+# `python manage.py processar_tarefas` (ver README, "Background Tasks").
+ARQUIVOS_DIR = BASE_DIR / 'arquivos'
+TAREFAS_PDF_DIR = ARQUIVOS_DIR / 'tarefas'
+RECIBOS_DIR = ARQUIVOS_DIR / 'recibos'
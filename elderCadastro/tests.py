@@ -0,0 +1,552 @@
+from decimal import Decimal
+import json
+import os
+import runpy
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from clientes.models import Cliente, ItemRemessa, Remessa
+from monitoramento.models import ItemVenda
+from produtos.models import Produto
+from tarefas.geradores import executar_tarefa
+from tarefas.models import TarefaPDF
+
+from . import banco, metricas, painel, seguranca, views
+from .gerarRecibo import LinhaRecibo, gerar_recibo_pdf, indexar_acerto, montar_linhas_recibo
+
+
+def criar_cliente(**kwargs):
+    dados = {
+        'nome_completo': 'Maria da Silva',
+        'cpf_cnpj': '123.456.789-00',
+        'telefone_whatsapp': '(11) 98765-4321',
+        'cep': '01000-000',
+        'cidade': 'São Paulo',
+        'estado': 'SP',
+        'bairro': 'Centro',
+        'rua': 'Rua A',
+        'numero': '10',
+    }
+    dados.update(kwargs)
+    return Cliente.objects.create(**dados)
+
+
+def criar_produto(nome, estoque=10, custo='10.00'):
+    return Produto.objects.create(
+        nome=nome, custo=Decimal(custo), margem_lucro=Decimal('100'), estoque=estoque
+    )
+
+
+def usar_diretorio_de_recibos_temporario(teste):
+    diretorio = tempfile.TemporaryDirectory()
+    teste.addCleanup(diretorio.cleanup)
+    configuracao = override_settings(RECIBOS_DIR=diretorio.name)
+    configuracao.enable()
+    teste.addCleanup(configuracao.disable)
+
+
+class FinalizarAcertoTests(TransactionTestCase):
+    def setUp(self):
+        usar_diretorio_de_recibos_temporario(self)
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        configuracao = override_settings(TAREFAS_PDF_DIR=diretorio.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        usuario = get_user_model().objects.create_user('balcao', password='senha')
+        self.client.force_login(usuario)
+        self.cliente = criar_cliente()
+        self.remessa = Remessa.objects.create(cliente=self.cliente, status='ABERTO')
+        self.anel = criar_produto('Anel')
+        self.brinco = criar_produto('Brinco')
+        self.item_anel = ItemRemessa.objects.create(remessa=self.remessa, produto=self.anel, quantidade=4)
+        self.item_brinco = ItemRemessa.objects.create(remessa=self.remessa, produto=self.brinco, quantidade=2)
+
+    def _finalizar(self, itens, acao_final='FECHAR'):
+        return self.client.post(
+            reverse('finalizar_acerto_api'),
+            data=json.dumps({
+                'remessa_id': self.remessa.id,
+                'itens': itens,
+                'acao_final': acao_final,
+                'forma_pagamento': 'PIX',
+            }),
+            content_type='application/json',
+        )
+
+    def test_fechar_acerto_devolve_estoque_e_registra_venda(self):
+        response = self._finalizar([
+            {'id': str(self.item_anel.id), 'quantidade': 1},
+            {'id': str(self.item_brinco.id), 'quantidade': 0},
+        ])
+
+        self.assertEqual(response.json()['status'], 'success')
+        self.anel.refresh_from_db()
+        self.brinco.refresh_from_db()
+        self.assertEqual(self.anel.estoque, 6 + 3)
+        self.assertEqual(self.brinco.estoque, 8 + 2)
+        self.assertEqual(ItemVenda.objects.get().quantidade, 1)
+        self.item_brinco.refresh_from_db()
+        self.assertEqual(self.item_brinco.status_item, 'DEVOLVIDO')
+        self.remessa.refresh_from_db()
+        self.assertEqual(self.remessa.status, 'FINALIZADO')
+
+    def test_recibo_enfileirado_junto_com_o_acerto(self):
+        metricas.zerar_metricas()
+
+        resultado = self._finalizar([{'id': self.item_anel.id, 'quantidade': 4}], acao_final='ABERTO').json()
+
+        # Nenhum PDF é desenhado na requisição: só a tarefa é registrada.
+        tarefa = TarefaPDF.objects.get(pk=resultado['tarefa']['id'])
+        self.assertEqual(tarefa.tipo, TarefaPDF.TipoTarefa.ACERTO)
+        self.assertEqual(tarefa.status, TarefaPDF.StatusTarefa.PENDENTE)
+        self.assertEqual(tarefa.parametros['remessaID'], self.remessa.id)
+        self.assertEqual(len(tarefa.parametros['itensContinuam']), 1)
+        self.assertEqual(metricas.obter_metricas()['tempos']['acerto.transacao_ms']['quantidade'], 1)
+
+    def test_acerto_desfeito_nao_deixa_tarefa(self):
+        with mock.patch.object(views, 'processar_acerto_em_lote', side_effect=ValueError('falha')):
+            response = self._finalizar([{'id': self.item_anel.id, 'quantidade': 4}])
+
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(TarefaPDF.objects.exists())
+
+    def test_recibo_do_acerto_baixado_pela_tarefa(self):
+        resultado = self._finalizar([{'id': self.item_anel.id, 'quantidade': 4}], acao_final='ABERTO').json()
+
+        TarefaPDF.reservar_proxima()
+        self.assertEqual(executar_tarefa(resultado['tarefa']['id']), TarefaPDF.StatusTarefa.CONCLUIDA)
+        status = self.client.get(resultado['tarefa']['status_url']).json()['tarefa']
+        response = self.client.get(status['download_url'])
+        pdf = b''.join(response.streaming_content)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(int(response['Content-Length']), len(pdf))
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertEqual(status['nome_arquivo'], f'acerto_remessa_{self.remessa.id}.pdf')
+
+
+class ReciboSaidaTests(TestCase):
+    def setUp(self):
+        usuario = get_user_model().objects.create_user('balcao', password='senha')
+        self.client.force_login(usuario)
+
+    def _gerar_recibo(self, dados):
+        return self.client.post(reverse('gerar_recibo_pdf'), data=json.dumps(dados), content_type='application/json')
+
+    def test_recibo_da_saida_e_enfileirado(self):
+        remessa = Remessa.objects.create(cliente=criar_cliente(), status='FINALIZADO')
+
+        response = self._gerar_recibo({'remessaID': remessa.id})
+
+        self.assertEqual(response.status_code, 202)
+        tarefa = TarefaPDF.objects.get(pk=response.json()['tarefa']['id'])
+        self.assertEqual((tarefa.tipo, tarefa.parametros), (TarefaPDF.TipoTarefa.RECIBO, {'remessaID': remessa.id}))
+
+    def test_remessa_invalida(self):
+        self.assertEqual(self._gerar_recibo({}).status_code, 400)
+        self.assertEqual(self._gerar_recibo({'remessaID': 999}).status_code, 404)
+        self.assertFalse(TarefaPDF.objects.exists())
+
+
+class ReciboPdfTests(SimpleTestCase):
+    def test_fundo_das_paginas_e_definido_uma_unica_vez(self):
+        linhas = 120  # três páginas
+        resultado = gerar_recibo_pdf(
+            linhas=(LinhaRecibo(f'Produto {i}', Decimal('10.00'), 1, '7890000000000') for i in range(linhas)),
+            nome_cliente='Maria',
+            situacao='EM ABERTO',
+            retornar_bytes=True,
+        )
+
+        pdf = resultado['pdf_bytes']
+        self.assertEqual(pdf.count(b'/Type /Page\n'), 3)
+        self.assertEqual(pdf.count(b'/Subtype /Form'), 2)
+
+    def test_linha_usa_decimal_e_nao_guarda_atributos_extras(self):
+        linha = LinhaRecibo('Anel', 0.1, 3)
+
+        self.assertEqual(linha.subtotal, Decimal('0.30'))
+        self.assertEqual(linha.codigo_barras, '0000000000000')
+        with self.assertRaises(AttributeError):
+            linha.desconto = 1
+
+
+class MontarReciboTests(TestCase):
+    def setUp(self):
+        self.remessa = Remessa.objects.create(cliente=criar_cliente(), status='ABERTO')
+
+    def test_linhas_resolvidas_pelo_id_em_uma_consulta(self):
+        anel = criar_produto('Anel')
+        with self.assertNumQueries(1):
+            linhas = list(montar_linhas_recibo([
+                {'produto_id': anel.id, 'quantidade': 2, 'preco_unitario': '20.00'},
+                {'produto_id': anel.id, 'quantidade': 1, 'removido': True},
+                {'produto_id': anel.id + 1, 'nome': 'Apagado', 'quantidade': 1, 'preco_unitario': 5.1},
+            ]))
+
+        self.assertEqual(
+            [(l.nome, l.quantidade, l.codigo_barras, l.removido, l.subtotal) for l in linhas],
+            [
+                ('Anel', 2, anel.codigo_barras, False, Decimal('40.00')),
+                ('Anel', 1, anel.codigo_barras, True, Decimal('0.00')),
+                ('Apagado', 1, '0000000000000', False, Decimal('5.10')),
+            ],
+        )
+
+    def _consultas_do_recibo_de_acerto(self, quantidade_itens):
+        produtos = [criar_produto(f'Produto {self.remessa.id}-{i}-{quantidade_itens}') for i in range(quantidade_itens)]
+        continuam = [
+            {'produto_id': p.id, 'nome': p.nome, 'quantidade': 1, 'preco_unitario': 20.0}
+            for p in produtos[::2]
+        ]
+        removidos = {p.id: 1 for p in produtos[1::2]}
+
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = indexar_acerto(continuam, removidos, 'ABERTO', self.remessa.id)
+        self.assertIn('pdf_bytes', resultado)
+        return len(consultas)
+
+    def test_recibo_de_acerto_nao_consulta_por_item(self):
+        self.assertEqual(self._consultas_do_recibo_de_acerto(2), self._consultas_do_recibo_de_acerto(20))
+
+
+class AcertoEmLoteTests(TransactionTestCase):
+    def setUp(self):
+        usuario = get_user_model().objects.create_user('balcao', password='senha')
+        self.client.force_login(usuario)
+        self.cliente = criar_cliente()
+
+    def _consultas_do_acerto(self, quantidade_itens):
+        remessa = Remessa.objects.create(cliente=self.cliente, status='ABERTO')
+        itens = []
+        for i in range(quantidade_itens):
+            produto = criar_produto(f'Produto {remessa.id}-{i}')
+            item = ItemRemessa.objects.create(remessa=remessa, produto=produto, quantidade=3)
+            itens.append({'id': item.id, 'quantidade': i % 3})
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(
+                reverse('finalizar_acerto_api'),
+                data=json.dumps({
+                    'remessa_id': remessa.id, 'itens': itens,
+                    'acao_final': 'FECHAR', 'forma_pagamento': 'DIN',
+                }),
+                content_type='application/json',
+            )
+        self.assertEqual(response.json()['status'], 'success')
+        return len(consultas)
+
+    def test_quantidade_de_consultas_nao_depende_dos_itens(self):
+        self.assertEqual(self._consultas_do_acerto(3), self._consultas_do_acerto(30))
+
+
+class SalvarRemessaTests(TestCase):
+    def setUp(self):
+        usuario = get_user_model().objects.create_user('balcao', password='senha')
+        self.client.force_login(usuario)
+        self.cliente = criar_cliente()
+        self.produtos = [criar_produto(f'Produto {i}', estoque=5) for i in range(10)]
+
+    def _salvar(self, produtos, tipo_remessa='VENDA'):
+        return self.client.post(
+            reverse('salvar_remessa_api'),
+            data=json.dumps({
+                'cliente_id': self.cliente.id,
+                'tipo_remessa': tipo_remessa,
+                'forma_pagamento': 'PIX',
+                'produtos': produtos,
+            }),
+            content_type='application/json',
+        )
+
+    def test_venda_baixa_estoque_e_congela_preco(self):
+        response = self._salvar([{'id': p.id, 'quantidade': 2} for p in self.produtos[:3]])
+
+        self.assertEqual(response.json()['status'], 'success')
+        remessa = Remessa.objects.get(pk=response.json()['id'])
+        self.assertEqual(remessa.itens.count(), 3)
+        for item in remessa.itens.select_related('produto'):
+            self.assertEqual(item.status_item, 'VENDIDO')
+            self.assertEqual(item.preco_venda_unitario_na_saida, Decimal('20.00'))
+            self.assertEqual(item.produto.estoque, 3)
+        self.assertEqual(ItemVenda.objects.count(), 3)
+
+    def test_estoque_insuficiente_desfaz_toda_a_saida(self):
+        response = self._salvar([
+            {'id': self.produtos[0].id, 'quantidade': 1},
+            {'id': self.produtos[1].id, 'quantidade': 6},
+        ], tipo_remessa='CONSIGNADO')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Produto 1', response.json()['message'])
+        self.assertFalse(Remessa.objects.exists())
+        self.produtos[0].refresh_from_db()
+        self.assertEqual(self.produtos[0].estoque, 5)
+
+    def test_quantidade_de_consultas_nao_depende_dos_itens(self):
+        contagens = []
+        for quantidade_itens in (2, 10):
+            with CaptureQueriesContext(connection) as consultas:
+                self._salvar([{'id': p.id, 'quantidade': 1} for p in self.produtos[:quantidade_itens]])
+            contagens.append(len(consultas))
+
+        self.assertEqual(contagens[0], contagens[1])
+
+
+class BuscaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user('busca', password='senha')
+        cls.joao = criar_cliente(nome_completo='João Gonçalves', cpf_cnpj='111.222.333-44', telefone_whatsapp='(21) 91234-5678')
+        cls.joana = criar_cliente(nome_completo='Joana Prado', cpf_cnpj='555.666.777-88', telefone_whatsapp='(31) 99999-0000')
+        cls.fornecedor = criar_cliente(nome_completo='Joalheria Fornece', cpf_cnpj='99.888.777/0001-66', fornecedor=True)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _buscar_clientes(self, termo):
+        response = self.client.get(reverse('buscar_clientes_api'), {'q': termo})
+        return [cliente['id'] for cliente in response.json()['clientes']]
+
+    def test_busca_ignora_acentos_e_usa_prefixo(self):
+        self.assertEqual(self._buscar_clientes('goncal'), [self.joao.id])
+        self.assertEqual(self._buscar_clientes('JOAO'), [self.joao.id])
+        self.assertCountEqual(self._buscar_clientes('jo'), [self.joao.id, self.joana.id])
+
+    def test_busca_documento_e_telefone_com_ou_sem_pontuacao(self):
+        self.assertEqual(self._buscar_clientes('111.222'), [self.joao.id])
+        self.assertEqual(self._buscar_clientes('5556667'), [self.joana.id])
+        self.assertEqual(self._buscar_clientes('(21) 91234'), [self.joao.id])
+
+    def test_indice_acompanha_alteracoes_e_exclusoes(self):
+        Cliente.objects.filter(pk=self.joana.pk).update(nome_completo='Joana Teixeira')
+        self.assertEqual(self._buscar_clientes('teixeira'), [self.joana.id])
+        self.assertEqual(self._buscar_clientes('prado'), [])
+
+        self.joao.delete()
+        self.assertEqual(self._buscar_clientes('goncalves'), [])
+
+    def test_busca_de_remessas_pelo_cliente(self):
+        remessa = Remessa.objects.create(cliente=self.joana, status='ABERTO')
+        Remessa.objects.create(cliente=self.joao, status='ABERTO')
+
+        response = self.client.get(reverse('buscar_remessas_api'), {'q': 'prado'})
+
+        self.assertEqual([r['id'] for r in response.json()['remessas']], [remessa.id])
+
+    def test_sem_fts_usa_icontains(self):
+        with mock.patch('elderCadastro.busca.fts_disponivel', return_value=False):
+            self.assertEqual(self._buscar_clientes('Gonç'), [self.joao.id])
+
+    def test_catalogo_de_produtos_usa_indice(self):
+        brinco = criar_produto('Brinco Coração')
+        criar_produto('Anel Solitário')
+
+        data = self.client.get(reverse('produto_catalogo_api'), {'buscar': 'coracao'}).json()
+
+        self.assertEqual([p['id'] for p in data['produtos']], [brinco.id])
+
+
+class PainelTests(TestCase):
+    def test_estatisticas_em_duas_consultas(self):
+        cliente = criar_cliente()
+        remessa = Remessa.objects.create(cliente=cliente)
+        anel = criar_produto('Anel', estoque=10)
+        brinco = criar_produto('Brinco', estoque=5)
+        ItemRemessa.objects.create(remessa=remessa, produto=anel, quantidade=3)
+        ItemRemessa.objects.create(remessa=remessa, produto=brinco, quantidade=2, status_item='VENDIDO')
+
+        with self.assertNumQueries(2):
+            estatisticas = painel.calcular_estatisticas_painel()
+
+        self.assertEqual(estatisticas['quantidade_estoque'], 7 + 3)
+        self.assertEqual(estatisticas['valor_estoque'], Decimal('20.00') * 10)
+        self.assertEqual(estatisticas['pecas_consignadas'], 3)
+        self.assertEqual(estatisticas['valor_consignado'], Decimal('60.00'))
+
+    def test_painel_vazio(self):
+        formatado = painel.formatar_estatisticas_painel(painel.calcular_estatisticas_painel())
+
+        self.assertEqual(formatado, {
+            'valor_estoque': '0,00',
+            'quantidade_estoque': '0',
+            'total_pecas_consignadas': 0,
+            'total_valor_consignadas': 'R$ 0,00',
+        })
+
+
+class CachePainelTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metricas.zerar_metricas()
+        self.produto = criar_produto('Anel', estoque=10)
+        usuario = get_user_model().objects.create_user('painel', password='senha')
+        self.client.force_login(usuario)
+
+    def test_segunda_leitura_vem_do_cache(self):
+        painel.obter_estatisticas_painel()
+        with self.assertNumQueries(0):
+            painel.obter_estatisticas_painel()
+
+        contadores = metricas.obter_metricas()['contadores']
+        self.assertEqual(contadores['painel.cache.falhas'], 1)
+        self.assertEqual(contadores['painel.cache.acertos'], 1)
+
+    def test_salvar_produto_invalida_no_commit(self):
+        painel.obter_estatisticas_painel()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.produto.estoque = 4
+            self.produto.save()
+
+        self.assertEqual(painel.obter_estatisticas_painel()['quantidade_estoque'], 4)
+
+    def test_salvar_estoque_api_invalida(self):
+        painel.obter_estatisticas_painel()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('salvar_estoque_api'),
+                data=json.dumps({'produtos': [{'id': self.produto.id, 'nova_quantidade': 25}]}),
+                content_type='application/json',
+            )
+
+        self.assertEqual(painel.obter_estatisticas_painel()['quantidade_estoque'], 25)
+
+    def test_transacao_desfeita_nao_invalida(self):
+        painel.obter_estatisticas_painel()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.produto.save()
+                    raise RuntimeError()
+            except RuntimeError:
+                pass
+
+        self.assertEqual(callbacks, [])
+
+    def test_invalidacao_vale_para_outros_processos(self):
+        # Em produção o cache fica em arquivos: outra instância do backend no
+        # mesmo diretório faz o papel de outro processo.
+        with tempfile.TemporaryDirectory() as diretorio:
+            with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': diretorio,
+            }}):
+                outro_processo = FileBasedCache(diretorio, {})
+                painel.obter_estatisticas_painel()
+                self.assertIsNotNone(outro_processo.get(painel.CHAVE_CACHE_PAINEL))
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.produto.save()
+
+                self.assertIsNone(outro_processo.get(painel.CHAVE_CACHE_PAINEL))
+
+    def test_producao_usa_cache_compartilhado(self):
+        ambiente = {'ELDER_PERFIL': 'producao', 'ELDER_SECRET_KEY': 'segredo', 'ELDER_ALLOWED_HOSTS': 'loja.local'}
+        with mock.patch.dict(os.environ, ambiente):
+            configuracao = runpy.run_module('elderCadastro.settings')
+
+        self.assertEqual(
+            configuracao['CACHES']['default']['BACKEND'], 'django.core.cache.backends.filebased.FileBasedCache',
+        )
+
+
+class ConfiguracaoBancoTests(SimpleTestCase):
+    def test_configuracao_sqlite(self):
+        configuracao = banco.configuracao_sqlite('/tmp/teste.sqlite3')
+
+        # BEGIN IMMEDIATE só nas transações de escrita (transacao_escrita).
+        self.assertNotIn('transaction_mode', configuracao['OPTIONS'])
+        comandos = configuracao['OPTIONS']['init_command'].split(';')
+        self.assertIn('PRAGMA synchronous=NORMAL', comandos)
+        self.assertIn(f'PRAGMA busy_timeout={banco.TEMPO_ESPERA_BLOQUEIO_MS}', comandos)
+
+    def test_wal_so_no_perfil_de_producao(self):
+        # O WAL fica gravado no arquivo: no desenvolvimento o db.sqlite3 do
+        # repositório não pode ser alterado por um simples manage.py.
+        desenvolvimento = banco.configuracao_banco('desenvolvimento', 'db.sqlite3', ambiente={})
+        producao = banco.configuracao_banco('producao', 'db.sqlite3', ambiente={})
+
+        self.assertNotIn('journal_mode', desenvolvimento['OPTIONS']['init_command'])
+        self.assertIn('PRAGMA journal_mode=WAL', producao['OPTIONS']['init_command'].split(';'))
+
+    def test_perfis_de_implantacao(self):
+        desenvolvimento = banco.configuracao_banco('desenvolvimento', 'db.sqlite3', ambiente={})
+        producao = banco.configuracao_banco('producao', 'db.sqlite3', ambiente={})
+
+        self.assertEqual(desenvolvimento['CONN_MAX_AGE'], 0)
+        self.assertEqual(producao['CONN_MAX_AGE'], 600)
+        self.assertTrue(producao['CONN_HEALTH_CHECKS'])
+
+    def test_postgres_com_pool_desliga_conexoes_persistentes(self):
+        configuracao = banco.configuracao_banco('producao', 'db.sqlite3', ambiente={
+            'ELDER_BANCO': 'postgres', 'ELDER_PG_NOME': 'loja', 'ELDER_PG_POOL': '1', 'ELDER_PG_POOL_MAX': '20',
+        })
+
+        self.assertEqual(configuracao['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(configuracao['NAME'], 'loja')
+        self.assertEqual(configuracao['OPTIONS']['pool'], {'min_size': 2, 'max_size': 20})
+        self.assertEqual(configuracao['CONN_MAX_AGE'], 0)
+
+    def test_banco_invalido(self):
+        with self.assertRaises(ImproperlyConfigured):
+            banco.configuracao_banco('producao', 'db.sqlite3', ambiente={'ELDER_BANCO': 'mysql'})
+
+
+class TransacaoEscritaTests(TransactionTestCase):
+    def inicios_de_transacao(self, bloco):
+        with CaptureQueriesContext(connection) as consultas:
+            with bloco():
+                Cliente.objects.exists()
+        return [c['sql'] for c in consultas.captured_queries if c['sql'].startswith('BEGIN')]
+
+    def test_escrita_comeca_com_begin_immediate(self):
+        self.assertEqual(self.inicios_de_transacao(banco.transacao_escrita), ['BEGIN IMMEDIATE'])
+
+    def test_outras_transacoes_continuam_deferred(self):
+        with banco.transacao_escrita():
+            pass
+
+        self.assertEqual(self.inicios_de_transacao(transaction.atomic), ['BEGIN'])
+
+    def test_dentro_de_outra_transacao_vira_savepoint(self):
+        with transaction.atomic():
+            self.assertEqual(self.inicios_de_transacao(banco.transacao_escrita), [])
+
+    def test_erro_desfaz_a_transacao(self):
+        with self.assertRaises(ValueError):
+            with banco.transacao_escrita():
+                criar_cliente()
+                raise ValueError
+
+        self.assertFalse(Cliente.objects.exists())
+
+
+class ConfiguracaoSegurancaTests(SimpleTestCase):
+    def test_producao_exige_chave_e_hosts(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'ELDER_SECRET_KEY, ELDER_ALLOWED_HOSTS'):
+            seguranca.configuracao_seguranca('producao', ambiente={})
+        with self.assertRaisesMessage(ImproperlyConfigured, 'ELDER_ALLOWED_HOSTS'):
+            seguranca.configuracao_seguranca('producao', ambiente={'ELDER_SECRET_KEY': 'segredo'})
+
+    def test_producao_com_variaveis(self):
+        chave, hosts = seguranca.configuracao_seguranca('producao', ambiente={
+            'ELDER_SECRET_KEY': 'segredo', 'ELDER_ALLOWED_HOSTS': 'loja.local, 10.0.0.5',
+        })
+
+        self.assertEqual((chave, hosts), ('segredo', ['loja.local', '10.0.0.5']))
+
+    def test_desenvolvimento_usa_chave_padrao(self):
+        chave, hosts = seguranca.configuracao_seguranca('desenvolvimento', ambiente={})
+
+        self.assertEqual((chave, hosts), (seguranca.CHAVE_DESENVOLVIMENTO, []))
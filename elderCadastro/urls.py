@@ -26,9 +26,11 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('acesso-negado/', views.acesso_negado, name='acesso_negado'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    path('metricas/', views.metricas_api, name='metricas_api'),
 
     path('produtos/', include('produtos.urls')),
     path('clientes/', include('clientes.urls')),
+    path('tarefas/', include('tarefas.urls')),
 
     path('registrar_saida/', views.registrar_saida, name='registrar_saida'),
     path('buscar_clientes_api/', views.buscar_clientes_api, name='buscar_clientes_api'),
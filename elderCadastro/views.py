@@ -4,59 +4,33 @@ from produtos.models import Produto
 from clientes.models import Cliente, Remessa, ItemRemessa
 from monitoramento.models import Venda, ItemVenda
 from django.http import JsonResponse
-from django.db import transaction
-from django.db.models import Q
 from django.views.decorators.http import require_GET, require_POST
 import json
 from django.utils import timezone
-from django.views.decorators.csrf import csrf_exempt
-from .gerarRecibo import indexar_acerto, gerar_recibo_pdf as gerar_recibo_pdf_func
-
-def total_geral_pecas_consignado():
-    """
-    Retorna o total geral de peças consignadas.
-    """
-    valor = 0
-    
-    pecas = ItemRemessa.objects.filter(status_item='CONSIGNADO')
-    for peca in pecas:
-        valor += peca.quantidade
-    return valor
-
-def total_geral_valor_consignadas():
-    """
-    Retorna o valor total de peças consignadas.
-    """
-    valor = 0
-
-    itens_consignados = ItemRemessa.objects.filter(status_item='CONSIGNADO')
-    for item in itens_consignados:
-        valor += item.preco_venda_unitario_na_saida * item.quantidade
-
-    valor_formatado = f"R$ {valor:.2f}".replace('.', ',')
-    return valor_formatado
-
+from .banco import transacao_escrita
+from .busca import filtrar_busca
+from .metricas import medir_tempo, obter_metricas
+from .operacoes import processar_acerto_em_lote, registrar_saida_em_lote
+from .painel import formatar_estatisticas_painel, obter_estatisticas_painel
+from tarefas.models import TarefaPDF
+from tarefas.views import dados_tarefa, resposta_tarefa
 
 @login_required
 def home(request):
-
-    valor_estoque = Produto.get_valor_total_estoque()
-    quantidade_estoque = Produto.get_quantidade_total_estoque()
-    total_pecas_consignadas = total_geral_pecas_consignado()
-    total_valor_consignadas = total_geral_valor_consignadas()
-
-    context = {
-        'valor_estoque': valor_estoque,
-        'quantidade_estoque': quantidade_estoque,
-        'total_pecas_consignadas': total_pecas_consignadas,
-        'total_valor_consignadas': total_valor_consignadas,
-    }
-
+    context = formatar_estatisticas_painel(obter_estatisticas_painel())
     return render(request, 'home.html', context)
 
 def acesso_negado(request):
     return render(request, 'negado.html')
 
+@login_required
+@require_GET
+def metricas_api(request):
+    """
+    API que expõe as métricas de desempenho deste processo (contadores e tempos).
+    """
+    return JsonResponse({'status': 'success', 'metricas': obter_metricas()})
+
 # --- A PARTIR DAQUI É SOBRE A PÁGINA DE SAÍDA ---
 @login_required
 def registrar_saida(request):
@@ -73,14 +47,8 @@ def buscar_clientes_api(request):
     API para a busca dinâmica de clientes no modal.
     """
     termo_busca = request.GET.get('q', '')
-    clientes = Cliente.objects.filter(fornecedor=False)
-
-    if termo_busca:
-        clientes = clientes.filter(
-            Q(nome_completo__icontains=termo_busca) |
-            Q(cpf_cnpj__icontains=termo_busca) |
-            Q(telefone_whatsapp__icontains=termo_busca)
-        )
+    clientes = Cliente.objects.filter(fornecedor=False).only('nome_completo', 'cpf_cnpj')
+    clientes = filtrar_busca(clientes, 'cliente_busca', termo_busca, ranquear=True)
     
     clientes = clientes[:10] 
     
@@ -107,7 +75,7 @@ def salvar_remessa_api(request):
         if not all([cliente_id, tipo_remessa, produtos]):
             return JsonResponse({'status': 'error', 'message': 'Dados incompletos.'}, status=400)
 
-        with transaction.atomic():
+        with transacao_escrita():
             cliente = Cliente.objects.get(pk=cliente_id)
 
             # Cria a remessa principal
@@ -129,31 +97,10 @@ def salvar_remessa_api(request):
                     forma_pagamento=formaPagamento,
                 )
 
-            for item_data in produtos:
-                produto_id = item_data['id']
-                quantidade = int(item_data['quantidade'])
-
-                produto = Produto.objects.get(pk=produto_id)
-
-                if produto.estoque < quantidade:
-                    raise ValueError(f"Estoque insuficiente para o produto: {produto.nome}")
-
-                ItemRemessa.objects.create(
-                    remessa=nova_remessa,
-                    produto=produto,
-                    quantidade=quantidade,
-                    preco_venda_unitario_na_saida=produto.preco_venda,
-                    status_item='VENDIDO' if tipo_remessa == 'VENDA' else 'CONSIGNADO'
-                )
-
-                if tipo_remessa == 'VENDA':
-                    # Cria o item de venda para monitoramento
-                    ItemVenda.objects.create(
-                        venda=nova_venda,
-                        produto=produto,
-                        quantidade=quantidade,
-                        preco_unitario_venda=produto.preco_venda
-                    )
+            # Registrar todos os itens de uma vez (estoque, remessa e venda)
+            registrar_saida_em_lote(
+                nova_remessa, produtos, venda=nova_venda if tipo_remessa == 'VENDA' else None
+            )
 
         return JsonResponse({'status': 'success', 'message': 'Remessa registrada com sucesso!', 'id': nova_remessa.id})
 
@@ -212,15 +159,10 @@ def buscar_remessas_api(request):
     API para buscar remessas com status 'ABERTO' para o modal de seleção.
     """
     termo_busca = request.GET.get('q', '')
-    remessas = Remessa.objects.filter(status='ABERTO').select_related('cliente')
-
-    if termo_busca:
-        remessas = remessas.filter(
-            Q(cliente__nome_completo__icontains=termo_busca) |
-            Q(cliente__cpf_cnpj__icontains=termo_busca)
-        )
+    remessas = Remessa.objects.filter(status='ABERTO').select_related('cliente').order_by('-data_saida')
+    remessas = filtrar_busca(remessas, 'cliente_busca', termo_busca, relacao='cliente', ranquear=True)
     
-    remessas = remessas.order_by('-data_saida')[:10]
+    remessas = remessas[:10]
     
     dados_remessas = [{
         'id': r.id,
@@ -277,7 +219,8 @@ def finalizar_acerto_api(request):
         if acao_final == 'FECHAR':
             formaPagamento = data.get('forma_pagamento')
 
-        with transaction.atomic():
+        # O tempo dentro da transação é o tempo em que o banco fica travado para escrita.
+        with medir_tempo('acerto.transacao_ms'), transacao_escrita():
             remessa = Remessa.objects.get(pk=remessa_id)
 
             if acao_final == 'FECHAR':
@@ -287,52 +230,10 @@ def finalizar_acerto_api(request):
                     forma_pagamento=formaPagamento
                 )
 
-            # Buscar todos os itens CONSIGNADOS que estão atualmente na remessa
-            itens_atuais_na_remessa = ItemRemessa.objects.filter(
-                remessa=remessa, 
-                status_item='CONSIGNADO'
-            ).select_related('produto')
-            
-            # Criar um conjunto com os IDs dos itens que vieram do frontend
-            ids_itens_recebidos = {item_['id'] for item_ in itens}
-            
-            # Preparar lista de itens que continuam e identificar produtos removidos
-            itens_continuam = []
-            produtos_removidos = {}
-            
-            for item_ in itens:
-                item_id = item_['id']
-                item = ItemRemessa.objects.get(pk=item_id, remessa=remessa)
-                quantidade_antes = item.quantidade
-                quantidade_depois = item_['quantidade']
-                quantidade_a_ser_devolvida = quantidade_antes - quantidade_depois
-                
-                print(f"Produto: {item.produto.nome} Quantidade antes: {quantidade_antes}, Quantidade depois: {quantidade_depois}, Devolvida: {quantidade_a_ser_devolvida}")
-                
-                # Se a quantidade depois é 0, o produto foi completamente removido
-                if quantidade_depois == 0:
-                    produtos_removidos[item.produto.nome] = quantidade_antes
-                # Se a quantidade depois > 0, o produto continua (parcialmente)
-                elif quantidade_depois > 0:
-                    itens_continuam.append({
-                        'nome': item.produto.nome,
-                        'quantidade': quantidade_depois,
-                        'preco_unitario': float(item.preco_venda_unitario_na_saida)
-                    })
-                
-                if acao_final == 'FECHAR':
-                    # Cadastrar os itens que ficaram na remessa no ItemVenda
-                    if quantidade_depois > 0:
-                        ItemVenda.objects.create(
-                            venda=venda_nova,
-                            produto=item.produto,
-                            quantidade=quantidade_depois,
-                            preco_unitario_venda=item.preco_venda_unitario_na_saida
-                        )
-
-                # Devolver ao estoque a quantidade calculada
-                item.devolver_ao_estoque(quantidade_a_ser_devolvida)
-                item.save()
+            # Aplicar devoluções, vendas e estoque de todos os itens de uma vez
+            itens_continuam, produtos_removidos = processar_acerto_em_lote(
+                remessa, itens, venda=venda_nova if acao_final == 'FECHAR' else None
+            )
             
             # Log dos produtos removidos para debug
             if produtos_removidos:
@@ -347,99 +248,47 @@ def finalizar_acerto_api(request):
                 remessa.status = 'ABERTO'
                 remessa.data_saida = timezone.now()
                 remessa.save()
-            
-            # GERAR PDF DE ACERTO DE CONTAS
-            try:
-                resultado_pdf = indexar_acerto(
-                    itensContinuam=itens_continuam,
-                    itensRemovidos=produtos_removidos,
-                    acaoFinal=acao_final,
-                    remessaID=remessa_id
-                )
-                
-                # Verificar se o PDF foi gerado com sucesso
-                if 'pdf_base64' in resultado_pdf:
-                    return JsonResponse({
-                        'status': 'success', 
-                        'message': 'Acerto de contas realizado com sucesso!',
-                        'pdf_base64': resultado_pdf['pdf_base64'],
-                        'nome_arquivo': resultado_pdf['nome_arquivo']
-                    })
-                else:
-                    # Se houve erro na geração do PDF, retornar apenas sucesso da operação
-                    return JsonResponse({
-                        'status': 'success', 
-                        'message': 'Acerto realizado, mas houve erro na geração do recibo.',
-                        'pdf_error': resultado_pdf.get('error', 'Erro desconhecido')
-                    })
-                    
-            except Exception as pdf_error:
-                # Se a geração do PDF falhar, ainda retornar sucesso da operação principal
-                return JsonResponse({
-                    'status': 'success', 
-                    'message': 'Acerto realizado, mas houve erro na geração do recibo.',
-                    'pdf_error': str(pdf_error)
-                })
+
+            # O recibo é só enfileirado aqui (um INSERT): o PDF é desenhado
+            # pelo worker, fora da trava de escrita. Como a tarefa entra na
+            # mesma transação, ela só existe se o acerto for gravado.
+            tarefa_recibo = TarefaPDF.enfileirar(
+                TarefaPDF.TipoTarefa.ACERTO,
+                {
+                    'itensContinuam': [
+                        dict(item, preco_unitario=str(item['preco_unitario'])) for item in itens_continuam
+                    ],
+                    'itensRemovidos': produtos_removidos,
+                    'acaoFinal': acao_final,
+                    'remessaID': remessa.id,
+                },
+                responsavel=request.user,
+            )
+
+        return JsonResponse({
+            'status': 'success',
+            'message': 'Acerto de contas realizado com sucesso!',
+            'tarefa': dados_tarefa(tarefa_recibo),
+        })
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': f'Ocorreu um erro: {e}'}, status=500)
     
-@csrf_exempt
+@login_required
+@require_POST
 def gerar_recibo_pdf_view(request):
-    if request.method == 'POST':
-        try:
-            data = json.loads(request.body)
-            produtos = data.get('produtos', [])
-            nome_cliente = data.get('nome_cliente', 'Cliente Desconhecido')
-            remessaID = data.get('remessaID', None)
-            tipoRemessa = str(data.get('tipoRemessa', 'NAO RECEBIDO'))  # 'VENDA' ou 'CONSIGNADO'
-            if tipoRemessa == 'CONSIGNADO':
-                tipoRemessa = 'EM ABERTO'
-
-            remessa = Remessa.objects.get(id=remessaID) if remessaID else None
-            data_saida = remessa.data_saida.strftime('%d/%m/%Y') if remessa and remessa.data_saida else 'N/A'
-
-            count = 1
-            my_prod = {}
-            my_sale = {}
-            codigo_barras = []
-            for i in produtos:
-                nome_produto = i['nome']
-                produto = Produto.objects.get(nome=i['nome'])
-                quantidade = i['quantidade']
-                preco_unitario = i['preco_unitario']
-
-                temp_list = [nome_produto, float(preco_unitario)]
-
-                my_prod[count] = temp_list
-                my_sale[count] = int(quantidade)
-                codigo_barras.append(produto.codigo_barras)
-                count += 1
-            
-            resultado = gerar_recibo_pdf_func(
-                my_prod=my_prod,
-                my_sale=my_sale,
-                codigo_barras=codigo_barras,
-                nome_cliente=nome_cliente,
-                data_nota=data_saida,
-                remessa_id=remessaID,
-                situacao= tipoRemessa,
-                retornar_bytes=True
-            )
+    """
+    API que enfileira o recibo de uma remessa recém-registrada e responde na
+    hora com a tarefa. O recibo é montado pelo worker a partir dos itens
+    gravados no banco (gerar_recibo_remessa).
+    """
+    try:
+        data = json.loads(request.body)
+        remessa_id = int(data['remessaID'])
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return JsonResponse({'status': 'error', 'message': 'Remessa não informada.'}, status=400)
 
-            # Retornar PDF como base64 para o JavaScript
-            return JsonResponse({
-                'success': True,
-                'pdf_base64': resultado['pdf_base64'],
-                'nome_arquivo': resultado['nome_arquivo']
-            })
-            
+    if not Remessa.objects.filter(pk=remessa_id).exists():
+        return JsonResponse({'status': 'error', 'message': 'Remessa não encontrada.'}, status=404)
 
-        except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e)
-            })
-        
-    return JsonResponse({'success': False, 'error': 'Método não permitido'})
-        
-            
\ No newline at end of file
+    tarefa = TarefaPDF.enfileirar(TarefaPDF.TipoTarefa.RECIBO, {'remessaID': remessa_id}, responsavel=request.user)
+    return resposta_tarefa(tarefa)
@@ -0,0 +1,64 @@
+"""
+Dígito verificador e validação de códigos de barras EAN13.
+
+Usado na geração dos códigos internos (Produto), na validação do campo
+codigo_barras e no desenho das etiquetas, para que os três concordem
+sobre qual é o dígito verificador de um código.
+"""
+from barcode.ean import EuropeanArticleNumber13
+from barcode.writer import SVGWriter
+from django.core.exceptions import ValidationError
+
+
+# Contribuição de cada dígito para a soma do EAN13: peso 1 nas posições
+# pares (contando do zero) e peso 3 nas ímpares. As tabelas evitam o int()
+# e a multiplicação por dígito.
+_PESO_1 = {str(d): d for d in range(10)}
+_PESO_3 = {str(d): d * 3 for d in range(10)}
+
+
+def digito_verificador_ean13(base):
+    """
+    Retorna o dígito verificador (str) dos 12 primeiros dígitos do código.
+    Lança KeyError se 'base' tiver algum caractere que não seja dígito.
+    """
+    base = base[:12]
+    soma = sum(map(_PESO_1.__getitem__, base[0::2])) + sum(map(_PESO_3.__getitem__, base[1::2]))
+    return str(-soma % 10)
+
+
+def codigo_ean13_valido(codigo):
+    """
+    Indica se o código tem 13 dígitos e o último é o verificador correto.
+    """
+    return (
+        len(codigo) == 13
+        and codigo.isascii()
+        and codigo.isdigit()
+        and codigo[12] == digito_verificador_ean13(codigo)
+    )
+
+
+def validar_codigo_barras(codigo):
+    """
+    Validador do campo codigo_barras: só números, e códigos de 13 dígitos
+    precisam ter o dígito verificador EAN13 correto.
+    """
+    if not (codigo.isascii() and codigo.isdigit()):
+        raise ValidationError('O código de barras deve conter apenas números.')
+    if len(codigo) == 13 and not codigo_ean13_valido(codigo):
+        raise ValidationError(
+            'Dígito verificador inválido: o último número deveria ser %(digito)s.',
+            params={'digito': digito_verificador_ean13(codigo)},
+        )
+
+
+class CustomEAN13(EuropeanArticleNumber13):
+    """
+    EAN13 do python-barcode usando o cálculo de dígito verificador acima.
+    """
+    def __init__(self, code, writer=None):
+        super().__init__(code, writer=writer or SVGWriter())
+
+    def calculate_checksum(self, value=None):
+        return int(digito_verificador_ean13(value or self.ean))
@@ -0,0 +1,120 @@
+"""
+Operações de estoque feitas diretamente no banco.
+
+Em vez de carregar e salvar cada Produto, as quantidades são aplicadas com
+UPDATEs baseados em F(), o que evita perder atualizações de outros terminais
+e mantém o número de consultas constante.
+
+Toda saída de estoque passa por reservar_estoque (um produto) ou
+baixar_estoque_em_lote (vários): a conferência do estoque é feita pelo
+próprio UPDATE (WHERE estoque >= quantidade), e não em Python com um valor
+lido antes, que outro terminal pode já ter alterado. Assim dois terminais
+nunca vendem a mesma última peça.
+"""
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from elderCadastro.banco import transacao_escrita
+from elderCadastro.painel import invalidar_painel
+
+from .models import Produto
+
+
+def reservar_estoque(produto_id, quantidade):
+    """
+    Subtrai 'quantidade' do estoque do produto com um único UPDATE
+    condicional, somente se houver estoque suficiente.
+
+    Lança ValueError se não houver estoque (ou se o produto não existir).
+    """
+    atualizados = Produto.objects.filter(pk=produto_id, estoque__gte=quantidade).update(
+        estoque=F('estoque') - quantidade
+    )
+    if atualizados != 1:
+        nome = Produto.objects.filter(pk=produto_id).values_list('nome', flat=True).first()
+        raise ValueError(f"Estoque insuficiente para o produto: {nome or 'desconhecido'}")
+    invalidar_painel()
+
+
+def devolver_estoque(produto_id, quantidade):
+    """
+    Soma 'quantidade' ao estoque do produto, em um único UPDATE.
+    """
+    Produto.objects.filter(pk=produto_id).update(estoque=F('estoque') + quantidade)
+    invalidar_painel()
+
+
+def devolver_estoque_em_lote(quantidades):
+    """
+    Soma ao estoque as quantidades informadas, em um único UPDATE.
+
+    Parâmetros:
+    - quantidades: dicionário {produto_id: quantidade_a_devolver}
+
+    Retorna o número de produtos atualizados.
+    """
+    quantidades = {pk: qtd for pk, qtd in quantidades.items() if qtd > 0}
+    if not quantidades:
+        return 0
+
+    incremento = Case(
+        *[When(pk=pk, then=Value(qtd)) for pk, qtd in quantidades.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    atualizados = Produto.objects.filter(pk__in=quantidades).update(estoque=F('estoque') + incremento)
+    invalidar_painel()
+    return atualizados
+
+
+# Produtos por UPDATE na baixa em lote. Cada produto vira um termo OR na
+# cláusula WHERE, e o SQLite limita a profundidade das expressões.
+TAMANHO_LOTE_BAIXA = 200
+
+
+def baixar_estoque_em_lote(quantidades):
+    """
+    Subtrai do estoque as quantidades informadas, somente se houver estoque
+    suficiente para todas. Cada lote é um único UPDATE condicional
+    (WHERE estoque >= quantidade); o número de linhas afetadas é conferido.
+
+    Parâmetros:
+    - quantidades: dicionário {produto_id: quantidade_a_baixar}
+
+    Lança ValueError se algum produto não tiver estoque suficiente. Deve ser
+    chamada dentro de transacao_escrita() para que os lotes já aplicados
+    sejam desfeitos nesse caso.
+    """
+    quantidades = {pk: qtd for pk, qtd in quantidades.items() if qtd > 0}
+    itens = list(quantidades.items())
+
+    for inicio in range(0, len(itens), TAMANHO_LOTE_BAIXA):
+        lote = itens[inicio:inicio + TAMANHO_LOTE_BAIXA]
+
+        condicao = Q()
+        for pk, qtd in lote:
+            condicao |= Q(pk=pk, estoque__gte=qtd)
+        decremento = Case(
+            *[When(pk=pk, then=Value(qtd)) for pk, qtd in lote],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        with transacao_escrita():
+            atualizados = Produto.objects.filter(condicao).update(estoque=F('estoque') - decremento)
+            if atualizados != len(lote):
+                # Desfaz este lote antes de procurar o produto sem estoque: com
+                # a baixa parcial aplicada, um produto que tinha estoque poderia
+                # ficar abaixo da quantidade pedida e ser apontado no lugar dele.
+                transaction.set_rollback(True)
+
+        if atualizados != len(lote):
+            # Descobre qual produto ficou sem estoque, apenas para a mensagem de erro.
+            sem_estoque = Q()
+            for pk, qtd in lote:
+                sem_estoque |= Q(pk=pk, estoque__lt=qtd)
+            produto = Produto.objects.filter(sem_estoque).only('nome').first()
+            nome = produto.nome if produto else 'desconhecido'
+            raise ValueError(f"Estoque insuficiente para o produto: {nome}")
+
+    if itens:
+        invalidar_painel()
@@ -0,0 +1,247 @@
+"""
+Motor de renderização das etiquetas de produtos.
+
+O desenho do código de barras (SVG -> ReportLab) é a parte mais cara da
+etiqueta. Ele é gerado uma única vez por código e guardado em um cache LRU
+limitado, que sobrevive entre requisições.
+
+O PDF é escrito em streaming: o ReportLab desenha cada etiqueta distinta uma
+vez, e cada cópia impressa é uma página mínima que aponta para esse mesmo
+conteúdo, gravada no destino assim que é gerada. O canvas do ReportLab
+guardaria todas as páginas em memória até o save(); aqui a memória usada não
+cresce com a quantidade de cópias.
+"""
+from decimal import Decimal
+from functools import lru_cache
+import io
+import re
+import tempfile
+import zlib
+
+from barcode.writer import SVGWriter
+from reportlab.graphics import renderPDF
+from reportlab.lib.units import inch, mm
+from reportlab.pdfbase.pdfmetrics import standardFonts
+from reportlab.pdfgen import canvas
+from svglib.svglib import svg2rlg
+
+from .codigos import CustomEAN13
+
+
+LARGURA_PAGINA = 2.3 * inch
+ALTURA_PAGINA = 0.47 * inch
+
+# Quantidade máxima de desenhos de código de barras mantidos em memória.
+TAMANHO_CACHE_CODIGOS = 1024
+
+OPCOES_CODIGO_BARRAS = {
+    'module_width': 0.25, 'module_height': 7.5,
+    'font_size': 5.5, 'text_distance': 2,
+}
+
+# Reduzir tamanho da fonte para 1/3 do original (mínimo 6)
+TAMANHO_FONTE_PRODUTO = max(6, 11 // 3)
+
+
+@lru_cache(maxsize=TAMANHO_CACHE_CODIGOS)
+def desenho_codigo_barras(codigo_barras):
+    """
+    Retorna o desenho ReportLab do código de barras EAN13 informado.
+    O resultado fica no cache LRU e não deve ser modificado por quem o recebe.
+    """
+    ean_barcode = CustomEAN13(codigo_barras, writer=SVGWriter())
+    buffer_svg = io.BytesIO()
+    ean_barcode.write(buffer_svg, options=OPCOES_CODIGO_BARRAS)
+    buffer_svg.seek(0)
+    return svg2rlg(buffer_svg)
+
+
+def _linhas_nome(nome_produto):
+    """
+    Quebra o nome do produto em até três linhas de 16 caracteres,
+    ignorando o espaço inicial de cada linha.
+    """
+    nome_cortado = nome_produto[:48]
+    linhas = [nome_cortado[:16], nome_cortado[16:32], nome_cortado[32:48]]
+    return [linha[1:] if linha and linha[0] == " " else linha for linha in linhas]
+
+
+def desenhar_etiqueta(c, nome_produto, codigo_barras, valor_base):
+    """
+    Desenha uma etiqueta completa (código de barras, nome e valor oculto)
+    no canvas ou form atualmente aberto.
+    """
+    primeira_linha, segunda_linha, terceira_linha = _linhas_nome(nome_produto)
+    tamanho_fonte_produto = TAMANHO_FONTE_PRODUTO
+
+    desenho_barcode = desenho_codigo_barras(codigo_barras)
+    largura_real_barcode = desenho_barcode.width
+    altura_real_barcode = desenho_barcode.height
+    largura_estimada_texto = 18 * (tamanho_fonte_produto * 0.4)
+    largura_total_conteudo = largura_real_barcode + (2 * mm) + largura_estimada_texto
+
+    x_inicial = (LARGURA_PAGINA - largura_total_conteudo) / 2 + 6
+    y_inicial = (ALTURA_PAGINA - altura_real_barcode) / 2 - 2
+
+    renderPDF.draw(desenho_barcode, c, x_inicial, y_inicial)
+
+    posicao_x_texto = x_inicial + largura_real_barcode - (2 * mm) - 0
+    posicao_y_texto = 8 + y_inicial + (altura_real_barcode / 2) - (tamanho_fonte_produto / 2) + 3
+    c.setFont("Helvetica", tamanho_fonte_produto)
+    c.drawString(posicao_x_texto, posicao_y_texto, primeira_linha)
+    if segunda_linha:
+        c.drawString(posicao_x_texto, posicao_y_texto - (tamanho_fonte_produto - 1), segunda_linha)
+    if terceira_linha:
+        c.drawString(posicao_x_texto, posicao_y_texto - 2 * (tamanho_fonte_produto - 1), terceira_linha)
+
+    if valor_base is not None:
+        valor_em_centavos = int(Decimal(valor_base) * 100)
+        valor_formatado_str = f"{valor_em_centavos:04d}"
+        valor_oculto_str = f"0300{valor_formatado_str}"
+        posicao_y_inferior = posicao_y_texto - 15  # <-- posição Y dos números embaixo do nome do produto
+        c.drawString(posicao_x_texto, posicao_y_inferior, valor_oculto_str)
+
+
+def conteudo_etiqueta(nome_produto, codigo_barras, valor_base):
+    """
+    Desenha a etiqueta em um canvas descartável e retorna os operadores PDF
+    da página (bytes) e as fontes usadas ({nome no conteúdo: fonte padrão}).
+    """
+    c = canvas.Canvas(io.BytesIO(), pagesize=(LARGURA_PAGINA, ALTURA_PAGINA))
+    # Seleciona as 14 fontes padrão numa ordem conhecida: o nome que o
+    # ReportLab dá a cada uma (/F1, /F2...) aparece no próprio conteúdo.
+    for fonte in standardFonts:
+        c.setFont(fonte, 1)
+    sondagem = c.getCurrentPageContent()
+    fontes = dict(zip(re.findall(r'BT /(\S+) 1 Tf', sondagem), standardFonts))
+
+    desenhar_etiqueta(c, nome_produto, codigo_barras, valor_base)
+    conteudo = c.getCurrentPageContent()[len(sondagem):]
+    usadas = {nome: fontes[nome] for nome in re.findall(r'BT /(\S+) [\d.]+ Tf', conteudo) if nome in fontes}
+    # Textos fora do ASCII já vêm escapados (\ooo) pelo ReportLab.
+    return conteudo.encode('latin-1'), usadas
+
+
+class EscritorPDF:
+    """
+    Escreve um PDF objeto a objeto, sem guardar os objetos já gravados.
+    As posições da tabela xref vão para um arquivo temporário, exceto as dos
+    objetos 1 e 2 (catálogo e árvore de páginas), que são escritos por último.
+    """
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.posicao = 0
+        self.xref = tempfile.TemporaryFile()
+        self.raiz = {}
+        self.quantidade = 2
+        self._escrever(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def _escrever(self, dados):
+        self.arquivo.write(dados)
+        self.posicao += len(dados)
+
+    def objeto(self, corpo, numero=None):
+        """
+        Grava um objeto e retorna seu número. 'corpo' são os bytes do objeto,
+        ou um iterável de blocos de bytes gravados um a um. Sem 'numero', usa o
+        próximo (os números 1 e 2 são reservados para o catálogo e as páginas).
+        """
+        if numero is None:
+            self.quantidade += 1
+            numero = self.quantidade
+            self.xref.write(b'%010d 00000 n \n' % self.posicao)
+        else:
+            self.raiz[numero] = self.posicao
+        self._escrever(b'%d 0 obj\n' % numero)
+        for bloco in [corpo] if isinstance(corpo, bytes) else corpo:
+            self._escrever(bloco)
+        self._escrever(b'\nendobj\n')
+        return numero
+
+    def stream(self, dados):
+        compactado = zlib.compress(dados)
+        return self.objeto(
+            (b'<< /Filter /FlateDecode /Length %d >>\nstream\n' % len(compactado), compactado, b'\nendstream')
+        )
+
+    def finalizar(self):
+        posicao_xref = self.posicao
+        self._escrever(b'xref\n0 %d\n0000000000 65535 f \n' % (self.quantidade + 1))
+        for numero in (1, 2):
+            self._escrever(b'%010d 00000 n \n' % self.raiz[numero])
+        self.xref.seek(0)
+        while bloco := self.xref.read(64 * 1024):
+            self._escrever(bloco)
+        self.xref.close()
+        self._escrever(
+            b'trailer\n<< /Root 1 0 R /Size %d >>\nstartxref\n%d\n%%%%EOF\n' % (self.quantidade + 1, posicao_xref)
+        )
+
+
+def _arvore_paginas(primeira, total, bloco=1000):
+    """
+    Corpo do objeto /Pages, em blocos, para as páginas primeira..primeira+total-1.
+    """
+    yield b'<< /Type /Pages /Count %d /MediaBox [0 0 %s %s] /Kids [' % (
+        total, f'{LARGURA_PAGINA:.4f}'.encode(), f'{ALTURA_PAGINA:.4f}'.encode(),
+    )
+    for inicio in range(primeira, primeira + total, bloco):
+        yield b''.join(b'%d 0 R ' % numero for numero in range(inicio, min(inicio + bloco, primeira + total)))
+    yield b'] >>'
+
+
+def gerar_pdf_etiquetas(etiquetas, destino):
+    """
+    Gera o PDF de etiquetas no arquivo ou buffer 'destino', uma página por
+    etiqueta, gravando as páginas à medida que são geradas.
+
+    Parâmetros:
+    - etiquetas: iterável de tuplas (nome_produto, codigo_barras, valor_base, quantidade)
+    - destino: caminho ou objeto de arquivo aberto para escrita binária
+
+    Retorna o total de etiquetas (páginas) geradas.
+    """
+    if isinstance(destino, (str, bytes)) or hasattr(destino, '__fspath__'):
+        with open(destino, 'wb') as arquivo:
+            return gerar_pdf_etiquetas(etiquetas, arquivo)
+
+    etiquetas = [etiqueta for etiqueta in etiquetas if etiqueta[3] > 0]
+
+    # Cada etiqueta distinta é desenhada uma vez só; as cópias reutilizam
+    # o mesmo conteúdo e os mesmos recursos.
+    conteudos = {}
+    for nome_produto, codigo_barras, valor_base, _ in etiquetas:
+        chave = (nome_produto, codigo_barras, valor_base)
+        if chave not in conteudos:
+            conteudos[chave] = conteudo_etiqueta(nome_produto, codigo_barras, valor_base)
+
+    pdf = EscritorPDF(destino)
+    objetos_fontes = {}
+    for _, fontes in conteudos.values():
+        for fonte in fontes.values():
+            if fonte not in objetos_fontes:
+                codificacao = b'' if fonte in ('Symbol', 'ZapfDingbats') else b' /Encoding /WinAnsiEncoding'
+                objetos_fontes[fonte] = pdf.objeto(
+                    b'<< /Type /Font /Subtype /Type1 /BaseFont /%s%s >>' % (fonte.encode(), codificacao)
+                )
+
+    paginas = {}
+    for chave, (conteudo, fontes) in conteudos.items():
+        recursos = b' '.join(b'/%s %d 0 R' % (nome.encode(), objetos_fontes[fonte]) for nome, fonte in fontes.items())
+        paginas[chave] = b'<< /Type /Page /Parent 2 0 R /Contents %d 0 R /Resources %d 0 R >>' % (
+            pdf.stream(conteudo), pdf.objeto(b'<< /Font << %s >> >>' % recursos),
+        )
+
+    primeira = pdf.quantidade + 1
+    total = 0
+    for nome_produto, codigo_barras, valor_base, quantidade in etiquetas:
+        pagina = paginas[(nome_produto, codigo_barras, valor_base)]
+        for _ in range(quantidade):
+            pdf.objeto(pagina)
+        total += quantidade
+
+    # As páginas têm números consecutivos, então a lista é gerada aos poucos.
+    pdf.objeto(_arvore_paginas(primeira, total), numero=2)
+    pdf.objeto(b'<< /Type /Catalog /Pages 2 0 R >>', numero=1)
+    pdf.finalizar()
+    return total
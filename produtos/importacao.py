@@ -0,0 +1,325 @@
+"""
+Importação de produtos em lote a partir de planilhas (CSV ou XLSX).
+
+A planilha é lida linha a linha (sem carregar o arquivo inteiro), cada
+linha é validada com as mesmas regras dos formulários de cadastro
+(ProdutoFolheadoPrataForm / ProdutoOuroForm) e os produtos válidos são
+gravados com bulk_create, em lotes. Cada lote é uma transação: o preço é
+calculado como em Produto.save e os códigos internos são reservados de
+uma vez por lote (Produto.atribuir_codigos_internos).
+
+Depois de cada lote gravado, a última linha importada é anotada em um
+arquivo de progresso ao lado da planilha. Se a importação for
+interrompida, ela pode ser retomada a partir dali (retomar=True).
+
+Usada pelo comando 'importar_produtos'.
+"""
+import csv
+import json
+import os
+import time
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+
+from clientes.models import Cliente
+from elderCadastro.banco import transacao_escrita
+from elderCadastro.painel import invalidar_painel
+
+from .codigos import validar_codigo_barras
+from .forms import ProdutoFolheadoPrataForm, ProdutoOuroForm
+from .models import Produto, TipoPeca
+
+
+TAMANHO_LOTE_IMPORTACAO = 500
+
+# Valores aceitos na coluna 'tipo'.
+TIPOS_IMPORTACAO = {
+    'fo': Produto.TipoProduto.FOLHEADO, 'folheado': Produto.TipoProduto.FOLHEADO,
+    'pr': Produto.TipoProduto.PRATA, 'prata': Produto.TipoProduto.PRATA,
+    'ou': Produto.TipoProduto.OURO, 'ouro': Produto.TipoProduto.OURO,
+}
+
+# Outros nomes de coluna aceitos para cada campo.
+APELIDOS_COLUNAS = {
+    'produto': 'nome',
+    'quantidade': 'estoque',
+    'preco_de_custo': 'custo',
+    'margem': 'margem_lucro',
+    'margem_de_lucro': 'margem_lucro',
+    'peso': 'gramas',
+    'codigo': 'codigo_barras',
+    'codigo_de_barras': 'codigo_barras',
+    'tipo_de_peca': 'tipo_peca',
+    'peca': 'tipo_peca',
+}
+
+CAMPOS_DECIMAIS = ('custo', 'margem_lucro', 'gramas')
+
+
+def _normalizar_coluna(nome):
+    nome = unicodedata.normalize('NFKD', str(nome or '')).encode('ascii', 'ignore').decode()
+    nome = '_'.join(nome.strip().lower().split())
+    return APELIDOS_COLUNAS.get(nome, nome)
+
+
+def _linhas_csv(caminho):
+    with open(caminho, newline='', encoding='utf-8-sig') as arquivo:
+        amostra = arquivo.read(4096)
+        arquivo.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=',;\t')
+        except csv.Error:
+            dialeto = csv.excel
+        yield from csv.reader(arquivo, dialeto)
+
+
+def _linhas_xlsx(caminho):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Para importar planilhas .xlsx é preciso instalar o pacote 'openpyxl'.")
+
+    planilha = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        yield from planilha.active.iter_rows(values_only=True)
+    finally:
+        planilha.close()
+
+
+def ler_planilha(caminho):
+    """
+    Percorre a planilha sem carregá-la inteira, gerando (numero_linha, dados)
+    para cada linha não vazia. 'numero_linha' é o da planilha (o cabeçalho é
+    a linha 1) e 'dados' é um dicionário {campo: valor} com os nomes de
+    coluna normalizados (minúsculas, sem acentos, apelidos resolvidos).
+
+    Lança ValueError para formatos não suportados.
+    """
+    extensao = Path(caminho).suffix.lower()
+    if extensao == '.csv':
+        linhas = _linhas_csv(caminho)
+    elif extensao == '.xlsx':
+        linhas = _linhas_xlsx(caminho)
+    else:
+        raise ValueError(f"Formato de planilha não suportado: '{extensao}'. Use .csv ou .xlsx.")
+
+    colunas = None
+    for numero_linha, valores in enumerate(linhas, start=1):
+        if colunas is None:
+            colunas = [_normalizar_coluna(valor) for valor in valores]
+            continue
+        dados = {}
+        for coluna, valor in zip(colunas, valores):
+            if isinstance(valor, str):
+                valor = valor.strip()
+            if coluna and valor not in (None, ''):
+                dados[coluna] = valor
+        if dados:
+            yield numero_linha, dados
+
+
+def _texto_decimal(valor):
+    """
+    Aceita números no formato brasileiro ('1.234,50') além do '1234.50'.
+    """
+    if not isinstance(valor, str):
+        return str(valor)
+    valor = valor.replace('R$', '').strip()
+    if ',' in valor:
+        valor = valor.replace('.', '').replace(',', '.')
+    return valor
+
+
+class ValidadorProdutos:
+    """
+    Valida as linhas da planilha com as regras dos formulários de cadastro,
+    sem consultas por linha: tipos de peça e fornecedores são carregados uma
+    vez, e nomes e códigos repetidos são conferidos por lote (conferir_lote).
+    """
+    def __init__(self):
+        self.tipos_peca = {nome.lower(): pk for pk, nome in TipoPeca.objects.values_list('pk', 'nome')}
+        self.fornecedores = {
+            nome.lower(): pk
+            for pk, nome in Cliente.objects.filter(fornecedor=True).values_list('pk', 'nome_completo')
+        }
+        self.nomes_vistos = set()
+        self.codigos_vistos = set()
+
+    def validar(self, dados):
+        """
+        Retorna um Produto (ainda não salvo, com o preço calculado) ou lança
+        ValidationError com as mensagens de erro da linha.
+        """
+        tipo = TIPOS_IMPORTACAO.get(str(dados.get('tipo', 'folheado')).strip().lower())
+        if tipo is None:
+            raise ValidationError("Tipo inválido (use Folheado, Prata ou Ouro).")
+        form = ProdutoOuroForm if tipo == Produto.TipoProduto.OURO else ProdutoFolheadoPrataForm
+
+        produto = Produto(tipo=tipo)
+        erros = []
+        for campo, campo_form in form.base_fields.items():
+            valor = dados.get(campo)
+            try:
+                if campo in ('tipo_peca', 'fornecedor'):
+                    setattr(produto, f'{campo}_id', self._relacionado(campo, valor))
+                    continue
+                if valor is None and campo_form.initial is not None:
+                    # Célula vazia: mesmo valor que o formulário traz preenchido.
+                    valor = campo_form.initial
+                if campo in CAMPOS_DECIMAIS and valor is not None:
+                    valor = _texto_decimal(valor)
+                valor = campo_form.clean(valor)
+                if campo == 'codigo_barras' and valor:
+                    validar_codigo_barras(valor)
+                setattr(produto, campo, valor)
+            except ValidationError as erro:
+                erros.extend(f"{campo}: {mensagem}" for mensagem in erro.messages)
+
+        if not erros and tipo == Produto.TipoProduto.OURO and not (produto.gramas and produto.gramas > 0):
+            erros.append("gramas: A quantidade de gramas deve ser maior que zero.")
+        if erros:
+            raise ValidationError(erros)
+
+        if produto.nome in self.nomes_vistos:
+            raise ValidationError(f"nome: '{produto.nome}' aparece mais de uma vez na planilha.")
+        if produto.codigo_barras and produto.codigo_barras in self.codigos_vistos:
+            raise ValidationError(f"codigo_barras: '{produto.codigo_barras}' aparece mais de uma vez na planilha.")
+
+        produto.calcular_preco_venda()
+        if not produto.codigo_barras:
+            # Confere se o código interno poderá ser gerado, sem reservar número.
+            produto._conteudo_codigo_interno()
+
+        self.nomes_vistos.add(produto.nome)
+        if produto.codigo_barras:
+            self.codigos_vistos.add(produto.codigo_barras)
+        return produto
+
+    def _relacionado(self, campo, valor):
+        if valor is None:
+            return None
+        opcoes = self.tipos_peca if campo == 'tipo_peca' else self.fornecedores
+        pk = opcoes.get(str(valor).strip().lower())
+        if pk is None:
+            raise ValidationError(f"'{valor}' não está cadastrado.")
+        return pk
+
+    def conferir_lote(self, lote):
+        """
+        Separa do lote [(numero_linha, produto)] os produtos cujo nome ou código
+        de barras já existe no banco (duas consultas por lote).
+
+        Retorna (validos, erros), com erros no formato [(numero_linha, mensagem)].
+        """
+        nomes = Produto.objects.filter(nome__in=[p.nome for _, p in lote]).values_list('nome', flat=True)
+        codigos = Produto.objects.filter(
+            codigo_barras__in=[p.codigo_barras for _, p in lote if p.codigo_barras]
+        ).values_list('codigo_barras', flat=True)
+        nomes, codigos = set(nomes), set(codigos)
+
+        validos, erros = [], []
+        for numero_linha, produto in lote:
+            if produto.nome in nomes:
+                erros.append((numero_linha, f"nome: já existe um produto chamado '{produto.nome}'."))
+            elif produto.codigo_barras in codigos:
+                erros.append((numero_linha, f"codigo_barras: '{produto.codigo_barras}' já pertence a outro produto."))
+            else:
+                validos.append((numero_linha, produto))
+        return validos, erros
+
+
+def caminho_progresso(caminho):
+    """
+    Arquivo de progresso da importação, ao lado da planilha.
+    """
+    caminho = Path(caminho)
+    return caminho.with_name(f"{caminho.name}.importacao.json")
+
+
+def _assinatura(caminho):
+    # Tamanho e data de modificação: se a planilha mudar, o progresso anotado não vale mais.
+    info = os.stat(caminho)
+    return {'tamanho': info.st_size, 'modificado': info.st_mtime_ns}
+
+
+def _ler_progresso(caminho):
+    try:
+        progresso = json.loads(caminho_progresso(caminho).read_text())
+    except (FileNotFoundError, ValueError):
+        return 0
+    if progresso.get('planilha') != _assinatura(caminho):
+        raise ValueError("A planilha mudou desde a importação interrompida; não é possível retomar.")
+    return progresso['ultima_linha']
+
+
+def _gravar_progresso(caminho, ultima_linha):
+    caminho_progresso(caminho).write_text(
+        json.dumps({'planilha': _assinatura(caminho), 'ultima_linha': ultima_linha})
+    )
+
+
+def importar_produtos(caminho, simular=False, retomar=False, tamanho_lote=TAMANHO_LOTE_IMPORTACAO, progresso=None):
+    """
+    Importa os produtos da planilha.
+
+    Parâmetros:
+    - caminho: arquivo .csv ou .xlsx. Colunas: nome, tipo (Folheado, Prata
+      ou Ouro; padrão Folheado), estoque, custo, margem_lucro, gramas,
+      codigo_barras, tipo_peca e fornecedor (pelos nomes cadastrados)
+    - simular: só valida e monta o relatório, sem gravar nada
+    - retomar: continua uma importação interrompida, pulando as linhas já
+      gravadas (veja caminho_progresso)
+    - tamanho_lote: linhas gravadas por transação
+    - progresso: função opcional chamada com o número de linhas lidas a cada lote
+
+    Linhas inválidas não são importadas e aparecem em 'erros'. Retorna um
+    dicionário com 'linhas', 'importados', 'puladas', 'erros'
+    ([(numero_linha, mensagem)]), 'por_tipo' e 'segundos'.
+    """
+    inicio = time.perf_counter()
+    ultima_gravada = _ler_progresso(caminho) if retomar else 0
+    validador = ValidadorProdutos()
+    relatorio = {'linhas': 0, 'importados': 0, 'puladas': 0, 'erros': [], 'por_tipo': Counter()}
+
+    def gravar(lote):
+        validos, erros = validador.conferir_lote(lote)
+        relatorio['erros'].extend(erros)
+        if not simular:
+            produtos = [produto for _, produto in validos]
+            with transacao_escrita():
+                Produto.atribuir_codigos_internos(produtos)
+                Produto.objects.bulk_create(produtos, batch_size=tamanho_lote)
+            _gravar_progresso(caminho, lote[-1][0])
+        relatorio['importados'] += len(validos)
+        relatorio['por_tipo'].update(produto.get_tipo_display() for _, produto in validos)
+        if progresso is not None:
+            progresso(relatorio['linhas'])
+
+    lote = []
+    for numero_linha, dados in ler_planilha(caminho):
+        relatorio['linhas'] += 1
+        if numero_linha <= ultima_gravada:
+            relatorio['puladas'] += 1
+            continue
+        try:
+            lote.append((numero_linha, validador.validar(dados)))
+        except ValidationError as erro:
+            relatorio['erros'].extend((numero_linha, mensagem) for mensagem in erro.messages)
+        if len(lote) >= tamanho_lote:
+            gravar(lote)
+            lote = []
+    if lote:
+        gravar(lote)
+
+    if not simular:
+        caminho_progresso(caminho).unlink(missing_ok=True)
+        if relatorio['importados']:
+            invalidar_painel()
+
+    # Erros de nome/código já cadastrados só aparecem quando o lote é conferido.
+    relatorio['erros'].sort(key=lambda erro: erro[0])
+    relatorio['segundos'] = time.perf_counter() - inicio
+    return relatorio
@@ -0,0 +1,45 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from reportlab.pdfgen import canvas
+
+from produtos import etiquetas as motor
+
+
+class Command(BaseCommand):
+    help = "Mede quantas etiquetas por segundo são geradas antes e depois do cache de códigos de barras."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--produtos', type=int, default=5, help="Quantidade de produtos distintos.")
+        parser.add_argument('--copias', type=int, default=200, help="Cópias impressas de cada produto.")
+
+    def handle(self, *args, **options):
+        etiquetas = []
+        for i in range(options['produtos']):
+            codigo = f"0{i + 1:05d}000050"
+            etiquetas.append((f"Produto de Teste Número {i + 1}", codigo, '50.00', options['copias']))
+        total = sum(e[3] for e in etiquetas)
+
+        inicio = time.perf_counter()
+        self._renderizar_por_copia(etiquetas)
+        tempo_antes = time.perf_counter() - inicio
+
+        motor.desenho_codigo_barras.cache_clear()
+        inicio = time.perf_counter()
+        motor.gerar_pdf_etiquetas(etiquetas, io.BytesIO())
+        tempo_depois = time.perf_counter() - inicio
+
+        self.stdout.write(f"Etiquetas geradas: {total}")
+        self.stdout.write(f"Antes (código de barras por cópia):       {total / tempo_antes:.1f} etiquetas/s")
+        self.stdout.write(f"Depois (cache + conteúdo compartilhado): {total / tempo_depois:.1f} etiquetas/s")
+
+    def _renderizar_por_copia(self, etiquetas):
+        """Reproduz o comportamento antigo: o código de barras é refeito em cada cópia."""
+        c = canvas.Canvas(io.BytesIO(), pagesize=(motor.LARGURA_PAGINA, motor.ALTURA_PAGINA))
+        for nome_produto, codigo_barras, valor_base, quantidade in etiquetas:
+            for _ in range(quantidade):
+                motor.desenho_codigo_barras.cache_clear()
+                motor.desenhar_etiqueta(c, nome_produto, codigo_barras, valor_base)
+                c.showPage()
+        c.save()
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from produtos.importacao import TAMANHO_LOTE_IMPORTACAO, caminho_progresso, importar_produtos
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa produtos de uma planilha .csv ou .xlsx (colunas: nome, tipo, estoque, "
+        "custo, margem_lucro, gramas, codigo_barras, tipo_peca, fornecedor), com as "
+        "mesmas regras do cadastro. Use --simular para só conferir a planilha."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('planilha', help="Arquivo .csv ou .xlsx.")
+        parser.add_argument('--simular', action='store_true', help="Só valida e mostra o relatório, sem gravar.")
+        parser.add_argument(
+            '--retomar', action='store_true',
+            help="Continua uma importação interrompida, a partir da última linha gravada."
+        )
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE_IMPORTACAO, help="Linhas gravadas por transação.")
+        parser.add_argument('--max-erros', type=int, default=50, help="Quantidade máxima de erros listados.")
+
+    def handle(self, *args, **options):
+        planilha = options['planilha']
+        if options['simular'] and options['retomar']:
+            raise CommandError("Use --simular ou --retomar, não os dois.")
+        if not options['retomar'] and not options['simular'] and caminho_progresso(planilha).exists():
+            raise CommandError(
+                "Há uma importação interrompida desta planilha. Use --retomar para continuar "
+                f"ou apague '{caminho_progresso(planilha)}' para começar do zero."
+            )
+
+        def progresso(linhas):
+            self.stdout.write(f"  {linhas} linhas processadas...")
+
+        try:
+            relatorio = importar_produtos(
+                planilha,
+                simular=options['simular'],
+                retomar=options['retomar'],
+                tamanho_lote=max(1, options['lote']),
+                progresso=progresso,
+            )
+        except (OSError, ValueError) as erro:
+            raise CommandError(str(erro))
+        except Exception as erro:
+            raise CommandError(
+                f"Importação interrompida: {erro}. Os lotes já gravados foram mantidos; "
+                "corrija o problema e rode novamente com --retomar."
+            )
+
+        titulo = "Simulação" if options['simular'] else "Importação"
+        self.stdout.write(
+            f"{titulo} de {relatorio['linhas']} linha(s) em {relatorio['segundos']:.1f} s: "
+            f"{relatorio['importados']} produto(s) {'válidos' if options['simular'] else 'importados'}, "
+            f"{len(relatorio['erros'])} erro(s)."
+        )
+        if relatorio['puladas']:
+            self.stdout.write(f"  {relatorio['puladas']} linha(s) já importadas foram puladas.")
+        for tipo, quantidade in sorted(relatorio['por_tipo'].items()):
+            self.stdout.write(f"  {tipo}: {quantidade}")
+
+        for numero_linha, mensagem in relatorio['erros'][:options['max_erros']]:
+            self.stdout.write(self.style.WARNING(f"  linha {numero_linha}: {mensagem}"))
+        if len(relatorio['erros']) > options['max_erros']:
+            self.stdout.write(f"  ... e mais {len(relatorio['erros']) - options['max_erros']} erro(s).")
+
+        if not relatorio['erros']:
+            self.stdout.write(self.style.SUCCESS("Nenhum erro encontrado."))
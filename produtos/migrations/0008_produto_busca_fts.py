@@ -0,0 +1,70 @@
+from django.db import migrations
+
+SQL_CRIAR = [
+    """
+    CREATE VIRTUAL TABLE produto_busca USING fts5(
+        nome, codigo,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER produto_busca_ai AFTER INSERT ON produtos_produto BEGIN
+        INSERT INTO produto_busca(rowid, nome, codigo) VALUES (new.id, new.nome, new.codigo_barras);
+    END
+    """,
+    """
+    CREATE TRIGGER produto_busca_au AFTER UPDATE OF nome, codigo_barras ON produtos_produto BEGIN
+        UPDATE produto_busca SET nome = new.nome, codigo = new.codigo_barras WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER produto_busca_ad AFTER DELETE ON produtos_produto BEGIN
+        DELETE FROM produto_busca WHERE rowid = old.id;
+    END
+    """,
+    """
+    INSERT INTO produto_busca(rowid, nome, codigo)
+    SELECT id, nome, codigo_barras FROM produtos_produto
+    """,
+]
+
+SQL_REMOVER = [
+    "DROP TRIGGER IF EXISTS produto_busca_ai",
+    "DROP TRIGGER IF EXISTS produto_busca_au",
+    "DROP TRIGGER IF EXISTS produto_busca_ad",
+    "DROP TABLE IF EXISTS produto_busca",
+]
+
+
+def fts5_disponivel(conexao):
+    if conexao.vendor != 'sqlite':
+        return False
+    with conexao.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+class RunSQLComFTS5(migrations.RunSQL):
+    """
+    RunSQL aplicado só no SQLite com FTS5. Nos outros casos a busca usa
+    '__icontains' (ver elderCadastro/busca.py).
+    """
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if fts5_disponivel(schema_editor.connection):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0007_produto_indice_tipo'),
+    ]
+
+    operations = [
+        RunSQLComFTS5(SQL_CRIAR, SQL_REMOVER),
+    ]
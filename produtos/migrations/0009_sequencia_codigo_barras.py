@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:28
+
+import produtos.codigos
+from django.db import migrations, models
+
+
+# Prefixo dos códigos internos de cada tipo (Produto._prefixo_codigo_interno
+# na época desta migração): Folheado 0, Prata 1, Ouro 2.
+PREFIXOS_TIPO = {'FO': '0', 'PR': '1', 'OU': '2'}
+
+
+def iniciar_sequencias(apps, schema_editor):
+    # Os códigos internos antigos usavam o ID do produto como número: prefixo
+    # do tipo + PPPPP (ID) + 6 dígitos + verificador. Cada sequência começa
+    # depois do maior número já usado no seu prefixo. Só entram os códigos
+    # nesse formato: um EAN de fornecedor que começa com 0, 1 ou 2 não é
+    # interno, e levaria a sequência para perto do limite de 99999 à toa.
+    Produto = apps.get_model('produtos', 'Produto')
+    SequenciaCodigoBarras = apps.get_model('produtos', 'SequenciaCodigoBarras')
+    maiores = dict.fromkeys(PREFIXOS_TIPO.values(), 0)
+    codigos = Produto.objects.filter(codigo_barras__regex=r'^[012][0-9]{12}$').values_list('pk', 'tipo', 'codigo_barras')
+    for pk, tipo, codigo in codigos.iterator():
+        prefixo = PREFIXOS_TIPO.get(tipo)
+        if codigo[0] == prefixo and codigo[1:6] == f'{pk:05d}':
+            maiores[prefixo] = max(maiores[prefixo], pk)
+    SequenciaCodigoBarras.objects.bulk_create(
+        SequenciaCodigoBarras(prefixo=prefixo, proximo=maior + 1) for prefixo, maior in maiores.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0008_produto_busca_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenciaCodigoBarras',
+            fields=[
+                ('prefixo', models.CharField(max_length=1, primary_key=True, serialize=False)),
+                ('proximo', models.PositiveIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(iniciar_sequencias, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='produto',
+            name='codigo_barras',
+            field=models.CharField(blank=True, help_text='Digite um código de até 13 números ou deixe em branco para gerar um código interno.', max_length=13, null=True, unique=True, validators=[produtos.codigos.validar_codigo_barras], verbose_name='Código de Barras'),
+        ),
+    ]
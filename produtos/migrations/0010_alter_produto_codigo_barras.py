@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0009_sequencia_codigo_barras'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='produto',
+            name='codigo_barras',
+            field=models.CharField(blank=True, help_text='Digite um código de até 13 números ou deixe em branco para gerar um código interno.', max_length=13, null=True, unique=True, verbose_name='Código de Barras'),
+        ),
+    ]
@@ -1,18 +1,13 @@
 from decimal import Decimal
-import io
-import json
 
-import barcode
-from barcode.ean import EuropeanArticleNumber13
-from barcode.writer import SVGWriter
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.db.models import Q, Sum
-from django.http import HttpResponse
-from reportlab.graphics import renderPDF
-from reportlab.lib.units import inch, mm
-from reportlab.pdfgen import canvas
-from svglib.svglib import svg2rlg
+from django.db.models import F, Q, Sum
+
+from elderCadastro.banco import transacao_escrita
+from elderCadastro.painel import invalidar_painel
+
+from .codigos import CustomEAN13, digito_verificador_ean13, validar_codigo_barras
 
 
 class TipoPeca(models.Model):
@@ -25,11 +20,44 @@ class TipoPeca(models.Model):
     def __str__(self):
         return self.nome
     
-class CustomEAN13(EuropeanArticleNumber13):
-    def __init__(self, code, writer=None):
-        self._validate(code)
-        self.code = code
-        self.writer = writer or SVGWriter()
+
+
+class SequenciaCodigoBarras(models.Model):
+    """
+    Próximo número livre dos códigos internos de cada prefixo (tipo de
+    produto). Os números são reservados antes do INSERT do produto, em
+    blocos quando vários produtos são criados de uma vez.
+    """
+    # Números de 5 dígitos (PPPPP) no código interno.
+    MAXIMO = 99999
+
+    prefixo = models.CharField(max_length=1, primary_key=True)
+    proximo = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.prefixo}: {self.proximo}"
+
+    @classmethod
+    def reservar(cls, prefixo, quantidade=1):
+        """
+        Reserva 'quantidade' números consecutivos do prefixo e retorna o
+        range deles. O incremento é feito por um UPDATE com F(), então dois
+        terminais nunca recebem o mesmo número.
+
+        Lança ValidationError se os números do prefixo acabarem.
+        """
+        with transacao_escrita():
+            if not cls.objects.filter(prefixo=prefixo).update(proximo=F('proximo') + quantidade):
+                # As sequências são criadas pela migração; isto só cobre um prefixo novo.
+                cls.objects.create(prefixo=prefixo, proximo=1 + quantidade)
+            fim = cls.objects.values_list('proximo', flat=True).get(prefixo=prefixo)
+            if fim - 1 > cls.MAXIMO:
+                # Sai do bloco atomic com exceção: o incremento é desfeito.
+                raise ValidationError(
+                    {'codigo_barras': f'Os códigos internos do prefixo {prefixo} se esgotaram.'}
+                )
+        return range(fim - quantidade, fim)
+
 
 class Produto(models.Model):
 
@@ -110,117 +138,77 @@ class Produto(models.Model):
         unique=True,
         blank=True,
         null=True,
-        help_text="Digite um código de até 13 números ou deixe em branco para gerar um código interno."
+        help_text="Digite um código de até 13 números ou deixe em branco para gerar um código interno.",
     )
 
+    class Meta:
+        indexes = [
+            # Filtro por tipo nas listagens, que são ordenadas por '-id'.
+            models.Index(fields=['tipo', '-id'], name='produto_tipo_id_idx'),
+        ]
+
     def __str__(self):
         return self.nome
 
+    def clean(self):
+        super().clean()
+        # Só códigos novos ou alterados são validados: produtos cadastrados
+        # antes da validação podem ter um dígito verificador errado, e
+        # precisam continuar editáveis sem trocar a etiqueta já impressa.
+        if self.codigo_barras and self._codigo_barras_alterado():
+            try:
+                validar_codigo_barras(self.codigo_barras)
+            except ValidationError as erro:
+                raise ValidationError({'codigo_barras': erro.messages})
+
+    def _codigo_barras_alterado(self):
+        if self._state.adding:
+            return True
+        return not Produto.objects.filter(pk=self.pk, codigo_barras=self.codigo_barras).exists()
+
     @classmethod
-    def imprimir_etiquetas(cls, request):
+    def montar_etiquetas(cls, produtos_solicitados):
         """
-        Método de classe que gera um arquivo PDF com etiquetas para os produtos
-        solicitados na requisição.
+        Converte a lista de produtos solicitados ({id, quantidade}) na lista de
+        etiquetas (nome, código de barras, valor, quantidade) usada pelo motor
+        de renderização. IDs inexistentes viram 'Produto Desconhecido'.
         """
-        if request.method != 'POST':
-            return HttpResponse(status=405)
-
-        try:
-            data = json.loads(request.body)
-            produtos_solicitados = data.get('produtos', [])
-            
-            buffer_pdf = io.BytesIO()
-            largura_pagina = 2.3 * inch
-            altura_pagina = 0.47 * inch
-            c = canvas.Canvas(buffer_pdf, pagesize=(largura_pagina, altura_pagina))
-
-            for produto_info in produtos_solicitados:
-                id_produto = produto_info.get('id')
-                quantidade = int(produto_info.get('quantidade', 1))
-
-                try:
-                    produto_bd = cls.objects.get(id=id_produto)
-                    nome_produto = produto_bd.nome
-                    codigo_barras = produto_bd.codigo_barras
-                    
-                    if produto_bd.preco_venda is not None and produto_bd.preco_venda > 0:
-                        valor_base = produto_bd.preco_venda
-                    else:
-                        valor_base = produto_bd.gramas
-
-                except cls.DoesNotExist:
-                    nome_produto = 'Produto Desconhecido'
-                    codigo_barras = '0000000000000'
-                    valor_base = None
-
-                for _ in range(quantidade):
-                    # NOVA FORMATAÇÃO DO NOME DO PRODUTO
-                    nome_cortado = nome_produto[:48]
-                    primeira_linha = nome_cortado[:16]
-                    segunda_linha = nome_cortado[16:32]
-                    terceira_linha = nome_cortado[32:48]
-
-                    # Ignora espaço inicial de cada linha
-                    if primeira_linha and primeira_linha[0] == " ":
-                        primeira_linha = primeira_linha[1:]
-                    if segunda_linha and segunda_linha[0] == " ":
-                        segunda_linha = segunda_linha[1:]
-                    if terceira_linha and terceira_linha[0] == " ":
-                        terceira_linha = terceira_linha[1:]
-
-                    # Reduzir tamanho da fonte para 1/3 do original (mínimo 6)
-                    tamanho_fonte_produto = max(6, 11 // 3)
-
-                    EAN = barcode.get_barcode_class('ean13')
-                    ean_barcode = EAN(codigo_barras, writer=SVGWriter())
-                    writer_options = {
-                        'module_width': 0.25, 'module_height': 7.5,
-                        'font_size': 5.5, 'text_distance': 2,
-                    }
-                    buffer_svg = io.BytesIO()
-                    ean_barcode.write(buffer_svg, options=writer_options)
-                    buffer_svg.seek(0)
-
-                    desenho_barcode = svg2rlg(buffer_svg)
-                    largura_real_barcode = desenho_barcode.width
-                    altura_real_barcode = desenho_barcode.height
-                    largura_estimada_texto = 18 * (tamanho_fonte_produto * 0.4)
-                    largura_total_conteudo = largura_real_barcode + (2 * mm) + largura_estimada_texto
-
-                    x_inicial = (largura_pagina - largura_total_conteudo) / 2 + 6
-                    y_inicial = (altura_pagina - altura_real_barcode) / 2 - 2
-
-                    renderPDF.draw(desenho_barcode, c, x_inicial, y_inicial)
-
-                    posicao_x_texto = x_inicial + largura_real_barcode - (2 * mm) - 0
-                    posicao_y_texto = 8 + y_inicial + (altura_real_barcode / 2) - (tamanho_fonte_produto / 2) + 3
-                    c.setFont("Helvetica", tamanho_fonte_produto)
-                    c.drawString(posicao_x_texto, posicao_y_texto, primeira_linha)
-                    if segunda_linha:
-                        c.drawString(posicao_x_texto, posicao_y_texto - (tamanho_fonte_produto - 1), segunda_linha)
-                    if terceira_linha:
-                        c.drawString(posicao_x_texto, posicao_y_texto - 2 * (tamanho_fonte_produto - 1), terceira_linha)
-
-                    if valor_base is not None:
-                        valor_em_centavos = int(Decimal(valor_base) * 100)
-                        valor_formatado_str = f"{valor_em_centavos:04d}"
-                        valor_oculto_str = f"0300{valor_formatado_str}"
-                        posicao_y_inferior = posicao_y_texto - 15  # <-- posição Y dos números embaixo do nome do produto
-                        c.drawString(posicao_x_texto, posicao_y_inferior, valor_oculto_str)
-
-                    c.showPage()
-
-            c.save()
-            pdf_content = buffer_pdf.getvalue()
-            buffer_pdf.close()
-
-            response = HttpResponse(pdf_content, content_type='application/pdf')
-            response['Content-Disposition'] = 'attachment; filename=\"etiquetas.pdf\"'
-            
-            return response
-
-        except Exception as e:
-            return HttpResponse(f"Erro ao gerar PDF de etiquetas: {str(e)}", status=400)
+        # Busca todos os produtos da requisição em uma única consulta,
+        # trazendo apenas as colunas usadas na etiqueta.
+        ids_solicitados = set()
+        for produto_info in produtos_solicitados:
+            try:
+                ids_solicitados.add(int(produto_info.get('id')))
+            except (TypeError, ValueError):
+                pass
+        produtos_bd = cls.objects.only(
+            'nome', 'codigo_barras', 'preco_venda', 'gramas'
+        ).in_bulk(ids_solicitados)
+
+        etiquetas = []
+        for produto_info in produtos_solicitados:
+            quantidade = int(produto_info.get('quantidade', 1))
+
+            try:
+                produto_bd = produtos_bd.get(int(produto_info.get('id')))
+            except (TypeError, ValueError):
+                produto_bd = None
+
+            if produto_bd is not None:
+                nome_produto = produto_bd.nome
+                codigo_barras = produto_bd.codigo_barras
+                
+                if produto_bd.preco_venda is not None and produto_bd.preco_venda > 0:
+                    valor_base = produto_bd.preco_venda
+                else:
+                    valor_base = produto_bd.gramas
+            else:
+                nome_produto = 'Produto Desconhecido'
+                codigo_barras = '0000000000000'
+                valor_base = None
+
+            etiquetas.append((nome_produto, codigo_barras, valor_base, quantidade))
+        return etiquetas
 
     @classmethod
     def get_valor_total_estoque(cls):
@@ -247,58 +235,69 @@ class Produto(models.Model):
         )['total'] or 0
         return str(quantidade_total)
     
-    def _gerar_codigo_interno(self) -> str:
+    def _prefixo_codigo_interno(self) -> str:
+        if self.tipo == self.TipoProduto.OURO:
+            return "2"
+        return "0" if self.tipo == self.TipoProduto.FOLHEADO else "1"
+
+    def _conteudo_codigo_interno(self) -> str:
         """
-        Gera um código de barras interno de 13 dígitos com base no tipo do produto.
-        - Folheado (0): 0 PPPPP VVVVVV V
-        - Prata (1):    1 PPPPP VVVVVV V
-        - Ouro (2):     2 PPPPP GGGGGG V
-        (PPPPP: número do produto com 5 dígitos, V: dígito verificador EAN13)
+        Retorna os 6 dígitos finais do código interno: o peso em centigramas
+        (Ouro) ou o preço de venda em reais (Folheado e Prata).
         """
-        if self.pk is None or self.pk > 99999:
-            raise ValidationError(
-                {'codigo_barras': 'Geração automática não suportada para IDs > 99999.'}
-            )
-        
-        identificador_produto = f"{self.pk:05d}"
-        
         if self.tipo == self.TipoProduto.OURO:
-            # Lógica para Ouro
-            prefixo = "2"
-            
             if self.gramas is None or self.gramas <= 0 or self.gramas >= 10000:
                 raise ValidationError(
                     {'codigo_barras': 'Para Ouro, o peso deve ser informado (maior que 0 e menor que 10.000g) para geração automática.'}
                 )
-            
             gramas_em_centigramas = int(self.gramas * 100)
-            conteudo_codificado = f"{gramas_em_centigramas:06d}"
+            return f"{gramas_em_centigramas:06d}"
 
-        else:
-            prefixo = "0" if self.tipo == self.TipoProduto.FOLHEADO else "1"
+        if self.preco_venda is None or self.preco_venda >= 1000000:
+            raise ValidationError(
+                {'codigo_barras': 'Geração automática não suportada para preços >= R$ 1.000.000,00.'}
+            )
+        preco_inteiro = int(self.preco_venda)
+        return f"{preco_inteiro:06d}"
 
-            if self.preco_venda is None or self.preco_venda >= 1000000:
-                raise ValidationError(
-                    {'codigo_barras': 'Geração automática não suportada para preços >= R$ 1.000.000,00.'}
-                )
-            preco_inteiro = int(self.preco_venda)
-            conteudo_codificado = f"{preco_inteiro:06d}"
+    def _gerar_codigo_interno(self, numero) -> str:
+        """
+        Gera um código de barras interno de 13 dígitos com base no tipo do produto.
+        - Folheado (0): 0 PPPPP VVVVVV V
+        - Prata (1):    1 PPPPP VVVVVV V
+        - Ouro (2):     2 PPPPP GGGGGG V
+        (PPPPP: número reservado em SequenciaCodigoBarras, V: dígito verificador EAN13)
+        """
+        base_code = f"{self._prefixo_codigo_interno()}{numero:05d}{self._conteudo_codigo_interno()}"
+        return f"{base_code}{digito_verificador_ean13(base_code)}"
 
-        base_code = f"{prefixo}{identificador_produto}{conteudo_codificado}"
-        
-        # Calcula o dígito verificador EAN13
-        soma = 0
-        for i, digito in enumerate(base_code):
-            if i % 2 == 0:
-                soma += int(digito)
-            else:
-                soma += int(digito) * 3
-        
-        digito_verificador = (10 - (soma % 10)) % 10
-        
-        return f"{base_code}{digito_verificador}"
+    @classmethod
+    def atribuir_codigos_internos(cls, produtos):
+        """
+        Preenche o código interno dos produtos sem código de barras, antes
+        de serem inseridos (save ou bulk_create). Reserva um bloco de
+        números por prefixo, então o custo não cresce com a quantidade.
 
-    def save(self, *args, **kwargs):
+        O preço de venda (ou o peso, para Ouro) já deve estar definido.
+        Lança ValidationError antes de reservar qualquer número se algum
+        produto não permitir a geração automática.
+        """
+        pendentes = {}
+        for produto in produtos:
+            if not produto.codigo_barras:
+                produto._conteudo_codigo_interno()
+                pendentes.setdefault(produto._prefixo_codigo_interno(), []).append(produto)
+
+        for prefixo, lista in pendentes.items():
+            numeros = SequenciaCodigoBarras.reservar(prefixo, len(lista))
+            for produto, numero in zip(lista, numeros):
+                produto.codigo_barras = produto._gerar_codigo_interno(numero)
+
+    def calcular_preco_venda(self):
+        """
+        Folheado e Prata: preço = custo + margem de lucro. Ouro mantém o
+        preço informado (ou zero).
+        """
         if self.tipo != self.TipoProduto.OURO:
             if self.custo is not None and self.margem_lucro is not None:
                 fator = Decimal('1') + (self.margem_lucro / Decimal('100'))
@@ -310,14 +309,21 @@ class Produto(models.Model):
             if self.preco_venda is None:
                 self.preco_venda = Decimal('0.00')
 
-        is_new = self.pk is None
-        codigo_barras_esta_vazio = not self.codigo_barras
+    def save(self, *args, **kwargs):
+        self.calcular_preco_venda()
+
+        if self._state.adding and not self.codigo_barras:
+            # O código é reservado antes do INSERT; se o INSERT falhar, a
+            # reserva é desfeita junto.
+            with transacao_escrita():
+                self.atribuir_codigos_internos([self])
+                super().save(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
 
-        super().save(*args, **kwargs)
+        invalidar_painel()
 
-        if is_new and codigo_barras_esta_vazio:
-            try:
-                self.codigo_barras = self._gerar_codigo_interno()
-                super().save(update_fields=['codigo_barras'])
-            except ValidationError as e:
-                raise e
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        invalidar_painel()
+        return resultado
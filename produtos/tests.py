@@ -1,3 +1,449 @@
-from django.test import TestCase
+from decimal import Decimal
+import importlib
+import io
+import json
+from pathlib import Path
+import tempfile
+import threading
+import time
+import tracemalloc
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection, transaction
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from tarefas.models import TarefaPDF
+
+from . import etiquetas
+from . import views
+from .codigos import CustomEAN13, codigo_ean13_valido, digito_verificador_ean13, validar_codigo_barras
+from .importacao import caminho_progresso, importar_produtos
+from .estoque import baixar_estoque_em_lote, devolver_estoque, reservar_estoque
+from .models import Produto, SequenciaCodigoBarras, TipoPeca
+
+
+class MotorEtiquetasTests(SimpleTestCase):
+    def test_codigo_de_barras_gerado_uma_vez_por_codigo(self):
+        etiquetas.desenho_codigo_barras.cache_clear()
+        lista = [
+            ('Anel', '0000010000500', '50.00', 30),
+            ('Brinco', '0000020000700', '70.00', 20),
+        ]
+
+        total = etiquetas.gerar_pdf_etiquetas(lista, io.BytesIO())
+
+        self.assertEqual(total, 50)
+        info = etiquetas.desenho_codigo_barras.cache_info()
+        self.assertEqual(info.misses, 2)
+
+    def test_cache_sobrevive_entre_documentos(self):
+        etiquetas.desenho_codigo_barras.cache_clear()
+        lista = [('Anel', '0000010000500', '50.00', 3)]
+
+        etiquetas.gerar_pdf_etiquetas(lista, io.BytesIO())
+        etiquetas.gerar_pdf_etiquetas(lista, io.BytesIO())
+
+        self.assertEqual(etiquetas.desenho_codigo_barras.cache_info().misses, 1)
+
+    def _pico_memoria(self, copias):
+        with tempfile.TemporaryFile() as arquivo:
+            tracemalloc.start()
+            try:
+                etiquetas.gerar_pdf_etiquetas([('Anel', '0000010000500', '50.00', copias)], arquivo)
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+    def test_memoria_nao_cresce_com_as_copias(self):
+        self._pico_memoria(1)  # aquece o cache do código de barras
+
+        pequeno = self._pico_memoria(2_000)
+        grande = self._pico_memoria(20_000)
+
+        self.assertLess(grande, pequeno + 256 * 1024)
+
+    def test_tabela_xref_aponta_para_os_objetos(self):
+        buffer = io.BytesIO()
+        lista = [('Anel', '0000010000500', '50.00', 3), ('Brinco', '0000020000700', '70.00', 2)]
+        total = etiquetas.gerar_pdf_etiquetas(lista, buffer)
+        pdf = buffer.getvalue()
+
+        self.assertEqual(total, 5)
+        self.assertIn(b'/Count 5', pdf)
+        posicao_xref = int(pdf.rsplit(b'startxref', 1)[1].split()[0])
+        linhas = pdf[posicao_xref:].split(b'\n')
+        quantidade = int(linhas[1].split()[1])
+        for numero, linha in enumerate(linhas[3:2 + quantidade], start=1):
+            posicao = int(linha.split()[0])
+            self.assertTrue(pdf[posicao:].startswith(b'%d 0 obj' % numero))
+
+
+class DigitoVerificadorTests(SimpleTestCase):
+    def test_mesmo_digito_da_biblioteca_de_codigos(self):
+        from barcode.ean import EuropeanArticleNumber13
+
+        for base in ['789100031550', '000001000050', '212345000123', '999999999999']:
+            esperado = EuropeanArticleNumber13(base).get_fullcode()
+            self.assertEqual(base + digito_verificador_ean13(base), esperado)
+            self.assertTrue(codigo_ean13_valido(esperado))
+            self.assertEqual(CustomEAN13(base).get_fullcode(), esperado)
+
+    def test_validador_recusa_digito_errado(self):
+        validar_codigo_barras('7891000315507')
+        validar_codigo_barras('12345')
+        with self.assertRaises(ValidationError):
+            validar_codigo_barras('7891000315508')
+        with self.assertRaises(ValidationError):
+            validar_codigo_barras('78910A0315507')
+
+
+class CodigoInternoTests(TestCase):
+    def _insercoes(self, consultas):
+        return [c['sql'] for c in consultas if 'produtos_produto' in c['sql'] and not c['sql'].startswith('SELECT')]
+
+    def test_produto_novo_gravado_com_um_unico_insert(self):
+        with CaptureQueriesContext(connection) as consultas:
+            produto = Produto.objects.create(nome='Anel', custo=Decimal('25.00'), margem_lucro=Decimal('100'))
+
+        escritas = self._insercoes(consultas)
+        self.assertEqual(len(escritas), 1)
+        self.assertTrue(escritas[0].startswith('INSERT'))
+        self.assertTrue(codigo_ean13_valido(produto.codigo_barras))
+        self.assertEqual(produto.codigo_barras[:12], '000001000050')
+
+    def test_codigos_reservados_em_bloco_por_prefixo(self):
+        produtos = [
+            Produto(nome=f'Folheado {i}', tipo=Produto.TipoProduto.FOLHEADO, preco_venda=Decimal('10')) for i in range(3)
+        ] + [Produto(nome='Ouro', tipo=Produto.TipoProduto.OURO, gramas=Decimal('1.50'))]
+
+        with self.assertNumQueries(8):
+            Produto.atribuir_codigos_internos(produtos)
+
+        self.assertEqual([p.codigo_barras[:6] for p in produtos], ['000001', '000002', '000003', '200001'])
+        self.assertEqual(produtos[3].codigo_barras[6:12], '000150')
+        self.assertEqual(SequenciaCodigoBarras.objects.get(prefixo='0').proximo, 4)
+
+    def test_id_acima_de_99999_recebe_codigo(self):
+        produto = Produto.objects.create(id=123456, nome='Brinco', custo=Decimal('5.00'), margem_lucro=Decimal('100'))
+        self.assertTrue(codigo_ean13_valido(produto.codigo_barras))
+
+    def test_erro_de_validacao_nao_consome_numero(self):
+        with self.assertRaises(ValidationError):
+            Produto.objects.create(nome='Ouro sem peso', tipo=Produto.TipoProduto.OURO)
+        with self.assertRaises(ValidationError):
+            Produto.atribuir_codigos_internos([Produto(nome='Ouro sem peso', tipo=Produto.TipoProduto.OURO)])
+
+        produto = Produto.objects.create(nome='Ouro', tipo=Produto.TipoProduto.OURO, gramas=Decimal('2'))
+        self.assertEqual(produto.codigo_barras[:6], '200001')
+
+    def test_sequencia_inicia_so_pelos_codigos_internos_antigos(self):
+        migracao = importlib.import_module('produtos.migrations.0009_sequencia_codigo_barras')
+        SequenciaCodigoBarras.objects.all().delete()
+
+        def codigo(base):
+            return base + digito_verificador_ean13(base)
+
+        Produto.objects.bulk_create([
+            # Interno antigo: prefixo do tipo + ID.
+            Produto(id=7, nome='Anel', tipo=Produto.TipoProduto.FOLHEADO, codigo_barras=codigo('000007000050')),
+            Produto(id=9, nome='Anel de ouro', tipo=Produto.TipoProduto.OURO, codigo_barras=codigo('200009000150')),
+            # EAN de fornecedor que começa com 0, e prefixo de outro tipo.
+            Produto(id=8, nome='Colar', tipo=Produto.TipoProduto.FOLHEADO, codigo_barras=codigo('098765432109')),
+            Produto(id=10, nome='Pulseira', tipo=Produto.TipoProduto.PRATA, codigo_barras=codigo('000010000050')),
+        ])
+
+        migracao.iniciar_sequencias(django_apps, None)
+
+        self.assertEqual(
+            dict(SequenciaCodigoBarras.objects.values_list('prefixo', 'proximo')), {'0': 8, '1': 1, '2': 10},
+        )
+
+    def test_codigo_antigo_com_digito_errado_continua_editavel(self):
+        produto = Produto.objects.create(nome='Anel', custo=Decimal('10.00'), margem_lucro=Decimal('100'))
+        Produto.objects.filter(pk=produto.pk).update(codigo_barras='7891000315508')
+        produto.refresh_from_db()
+
+        produto.nome = 'Anel dourado'
+        produto.full_clean()
+
+        produto.codigo_barras = '7891000315509'
+        with self.assertRaises(ValidationError) as erro:
+            produto.full_clean()
+        self.assertIn('codigo_barras', erro.exception.message_dict)
+
+        with self.assertRaises(ValidationError):
+            Produto(nome='Brinco', custo=Decimal('5.00'), codigo_barras='7891000315508').full_clean()
+
+
+class ImportacaoProdutosTests(TestCase):
+    CABECALHO = 'Nome;Tipo;Quantidade;Preço de custo;Margem;Peso;Código de barras;Tipo de peça\n'
+
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.planilha = Path(pasta.name) / 'produtos.csv'
+        TipoPeca.objects.create(nome='Anel')
+
+    def _escrever(self, linhas):
+        self.planilha.write_text(self.CABECALHO + ''.join(f'{linha}\n' for linha in linhas), encoding='utf-8')
+
+    def test_simulacao_valida_sem_gravar(self):
+        Produto.objects.create(nome='Já cadastrado', custo=Decimal('1'), margem_lucro=Decimal('100'))
+        self._escrever([
+            'Colar;Folheado;3;25,50;;;;anel',
+            'Colar;Prata;1;10;;;;',
+            'Já cadastrado;Prata;1;10;;;;',
+            'Aliança;Ouro;1;;;0;;',
+            'Brinco;Bronze;1;10;;;;',
+        ])
+
+        relatorio = importar_produtos(self.planilha, simular=True)
+
+        self.assertEqual(relatorio['importados'], 1)
+        self.assertEqual([linha for linha, _ in relatorio['erros']], [3, 4, 5, 6])
+        self.assertEqual(Produto.objects.count(), 1)
+        self.assertFalse(caminho_progresso(self.planilha).exists())
+
+    def test_importa_em_lotes_com_preco_e_codigo_interno(self):
+        self._escrever(
+            [f'Peça {i};Prata;2;10,00;50;;;' for i in range(7)]
+            + ['Anel de ouro;Ouro;1;;;1,5;;Anel', 'Com código;Folheado;1;5;;;7891000315507;']
+        )
+
+        relatorio = importar_produtos(self.planilha, tamanho_lote=4)
+
+        self.assertEqual(relatorio['importados'], 9)
+        self.assertEqual(relatorio['erros'], [])
+        peca = Produto.objects.get(nome='Peça 6')
+        self.assertEqual(peca.preco_venda, Decimal('15.00'))
+        self.assertTrue(codigo_ean13_valido(peca.codigo_barras))
+        ouro = Produto.objects.get(nome='Anel de ouro')
+        self.assertEqual(ouro.codigo_barras[6:12], '000150')
+        self.assertEqual(ouro.tipo_peca.nome, 'Anel')
+        self.assertEqual(Produto.objects.get(nome='Com código').codigo_barras, '7891000315507')
+        self.assertEqual(Produto.objects.filter(codigo_barras__startswith='1').count(), 7)
+
+    def test_retoma_depois_de_falha(self):
+        self._escrever([f'Peça {i};Folheado;1;10;;;;' for i in range(10)])
+        bulk_create = Produto.objects.bulk_create
+        chamadas = []
+
+        def falhar_no_segundo_lote(*args, **kwargs):
+            chamadas.append(1)
+            if len(chamadas) == 2:
+                raise RuntimeError('queda do banco')
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(Produto.objects, 'bulk_create', side_effect=falhar_no_segundo_lote):
+            with self.assertRaises(RuntimeError):
+                importar_produtos(self.planilha, tamanho_lote=4)
+        self.assertEqual(Produto.objects.count(), 4)
+
+        relatorio = importar_produtos(self.planilha, retomar=True, tamanho_lote=4)
+
+        self.assertEqual(relatorio['puladas'], 4)
+        self.assertEqual(relatorio['importados'], 6)
+        self.assertEqual(relatorio['erros'], [])
+        self.assertEqual(Produto.objects.count(), 10)
+        self.assertFalse(caminho_progresso(self.planilha).exists())
+
+
+class ImprimirEtiquetasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.produtos = [
+            Produto.objects.create(
+                nome=f'Produto {i}', custo=Decimal('10.00'), margem_lucro=Decimal('100'), estoque=5
+            )
+            for i in range(20)
+        ]
+
+    def _imprimir(self, itens):
+        return self.client.post(
+            reverse('imprimir_etiquetas'),
+            data=json.dumps({'produtos': itens}),
+            content_type='application/json',
+        )
+
+    def test_quantidade_de_consultas_constante(self):
+        itens = [{'id': str(p.id), 'quantidade': 2} for p in self.produtos]
+
+        with self.assertNumQueries(1):
+            lista = Produto.montar_etiquetas(itens)
+
+        self.assertEqual(len(lista), len(self.produtos))
+
+    def test_id_inexistente_usa_produto_desconhecido(self):
+        with self.assertNumQueries(1):
+            lista = Produto.montar_etiquetas([{'id': 999999, 'quantidade': 1}])
+
+        self.assertEqual(lista[0][0], 'Produto Desconhecido')
+
+    def test_impressao_e_enfileirada(self):
+        usuario = get_user_model().objects.create_user('balcao', password='senha')
+        self.client.force_login(usuario)
+        itens = [{'id': self.produtos[0].id, 'quantidade': 3}]
+
+        response = self._imprimir(itens)
+
+        self.assertEqual(response.status_code, 202)
+        tarefa = TarefaPDF.objects.get(pk=response.json()['tarefa']['id'])
+        self.assertEqual(tarefa.tipo, TarefaPDF.TipoTarefa.ETIQUETAS)
+        self.assertEqual(tarefa.parametros, {'produtos': itens})
+        self.assertEqual(tarefa.responsavel, usuario)
+
+    def test_impressao_sem_produtos(self):
+        self.client.force_login(get_user_model().objects.create_user('balcao', password='senha'))
+
+        self.assertEqual(self._imprimir([]).status_code, 400)
+        self.assertFalse(TarefaPDF.objects.exists())
+
+
+class CatalogoProdutosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tipo_peca = TipoPeca.objects.create(nome='Anel')
+        cls.produtos = [
+            Produto.objects.create(
+                nome=f'Produto {i}', custo=Decimal('10.00'), margem_lucro=Decimal('100'), estoque=5,
+                tipo=Produto.TipoProduto.OURO if i % 2 else Produto.TipoProduto.PRATA,
+                tipo_peca=cls.tipo_peca, gramas=Decimal('2.5'),
+            )
+            for i in range(views.PRODUTOS_POR_PAGINA + 10)
+        ]
+        cls.usuario = get_user_model().objects.create_user('balcao', password='senha')
+
+    def test_consultar_pagina_limitada_em_uma_consulta(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('produto_consultar'))
+
+        self.assertEqual(len(response.context['produtos']), views.PRODUTOS_POR_PAGINA)
+        self.assertEqual(response.context['produtos'][0], self.produtos[-1])
+        self.assertIsNotNone(response.context['proximo_cursor'])
+
+    def test_api_exige_login(self):
+        response = self.client.get(reverse('produto_catalogo_api'))
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_api_percorre_todas_as_paginas(self):
+        self.client.force_login(self.usuario)
+        ids, cursor = [], None
+        while True:
+            parametros = {'apos': cursor} if cursor else {}
+            data = self.client.get(reverse('produto_catalogo_api'), parametros).json()
+            self.assertEqual(data['status'], 'success')
+            ids += [produto['id'] for produto in data['produtos']]
+            cursor = data['proximo_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(ids, sorted((p.id for p in self.produtos), reverse=True))
+
+    def test_api_aplica_filtro_de_tipo(self):
+        self.client.force_login(self.usuario)
+        data = self.client.get(reverse('produto_catalogo_api'), {'tipo': 'OU'}).json()
+
+        self.assertTrue(data['produtos'])
+        self.assertTrue(all(produto['tipo'] == 'OU' for produto in data['produtos']))
+        self.assertEqual(data['produtos'][0]['tipo_peca'], 'Anel')
+
+
+class BaixaEstoqueEmLoteTests(TestCase):
+    def test_erro_aponta_o_produto_sem_estoque(self):
+        # 'Anel' vem primeiro (menor pk) e, com a baixa parcial aplicada,
+        # ficaria com estoque 2, abaixo da quantidade pedida (3).
+        anel = Produto.objects.create(nome='Anel', custo=Decimal('10.00'), margem_lucro=Decimal('100'), estoque=5)
+        brinco = Produto.objects.create(nome='Brinco', custo=Decimal('10.00'), margem_lucro=Decimal('100'), estoque=1)
+
+        with self.assertRaisesMessage(ValueError, 'Estoque insuficiente para o produto: Brinco'):
+            with transaction.atomic():
+                baixar_estoque_em_lote({anel.id: 3, brinco.id: 4})
+
+        anel.refresh_from_db()
+        brinco.refresh_from_db()
+        self.assertEqual((anel.estoque, brinco.estoque), (5, 1))
+
+
+class ReservaEstoqueConcorrenteTests(TransactionTestCase):
+    TERMINAIS = 8
+    TENTATIVAS = 15
+
+    def _em_paralelo(self, operacao):
+        """Executa 'operacao' em várias threads ao mesmo tempo e retorna os resultados."""
+        largada = threading.Barrier(self.TERMINAIS)
+        resultados = []
+        trava = threading.Lock()
+
+        def terminal():
+            largada.wait()
+            try:
+                for _ in range(self.TENTATIVAS):
+                    resultado = _repetir_se_bloqueado(operacao)
+                    with trava:
+                        resultados.append(resultado)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=terminal) for _ in range(self.TERMINAIS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return resultados
+
+    def test_sem_venda_acima_do_estoque(self):
+        produto = Produto.objects.create(nome='Anel', custo=Decimal('10.00'), margem_lucro=Decimal('100'), estoque=50)
+
+        def vender():
+            try:
+                with transaction.atomic():
+                    reservar_estoque(produto.id, 1)
+                return True
+            except ValueError:
+                return False
+
+        resultados = self._em_paralelo(vender)
+
+        produto.refresh_from_db()
+        self.assertEqual(resultados.count(True), 50)
+        self.assertEqual(resultados.count(False), self.TERMINAIS * self.TENTATIVAS - 50)
+        self.assertEqual(produto.estoque, 0)
+
+    def test_sem_atualizacao_perdida(self):
+        produto = Produto.objects.create(nome='Brinco', custo=Decimal('10.00'), margem_lucro=Decimal('100'), estoque=1000)
+        outro = Produto.objects.create(nome='Colar', custo=Decimal('10.00'), margem_lucro=Decimal('100'), estoque=1000)
+
+        def movimentar():
+            with transaction.atomic():
+                baixar_estoque_em_lote({produto.id: 3, outro.id: 1})
+                devolver_estoque(produto.id, 1)
+            return True
+
+        resultados = self._em_paralelo(movimentar)
+
+        produto.refresh_from_db()
+        outro.refresh_from_db()
+        self.assertEqual(len(resultados), self.TERMINAIS * self.TENTATIVAS)
+        self.assertEqual(produto.estoque, 1000 - 2 * len(resultados))
+        self.assertEqual(outro.estoque, 1000 - len(resultados))
+
+
+def _repetir_se_bloqueado(operacao):
+    """
+    O banco de testes do SQLite fica em memória com cache compartilhado, onde
+    a disputa pela trava falha na hora em vez de esperar o busy_timeout.
+    A transação inteira é desfeita nesse caso, então basta repeti-la.
+    """
+    while True:
+        try:
+            return operacao()
+        except OperationalError as erro:
+            if 'locked' not in str(erro):
+                raise
+            time.sleep(0.001)
@@ -18,5 +18,6 @@ urlpatterns = [
 
 
     path('consultar/', views.produto_consultar, name='produto_consultar'),
+    path('consultar/catalogo/api/', views.produto_catalogo_api, name='produto_catalogo_api'),
     path('produto/deletar/<int:produto_id>/', views.deletar_produto, name='deletar_produto'),
 ]
\ No newline at end of file
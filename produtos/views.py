@@ -1,7 +1,6 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.http import JsonResponse, HttpResponse
-from django.db import transaction
-from django.db.models import Q
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST, require_GET
 from django.contrib import messages
@@ -15,6 +14,13 @@ from svglib.svglib import svg2rlg
 import barcode
 from barcode.writer import SVGWriter
 
+from elderCadastro.banco import transacao_escrita
+from elderCadastro.busca import filtrar_busca
+from elderCadastro.painel import invalidar_painel
+
+from tarefas.models import TarefaPDF
+from tarefas.views import resposta_tarefa
+
 from .forms import ProdutoFolheadoPrataForm, ProdutoOuroForm
 from .models import Produto
 
@@ -86,27 +92,75 @@ def produto_cadastrar_ouro(request):
         form = ProdutoOuroForm()
     return render(request, 'produtos/produto_cadastrar_ouro.html', {'form': form})
 
-def produto_consultar(request):
-    lista_produtos = Produto.objects.all().order_by('-id')
+PRODUTOS_POR_PAGINA = 50
 
-    termo_busca = request.GET.get('buscar')
-    filtro_tipo = request.GET.get('tipo')
-    if termo_busca:
-        lista_produtos = lista_produtos.filter(
-            Q(nome__icontains=termo_busca) | 
-            Q(codigo_barras__icontains=termo_busca)
-        )
+def _pagina_catalogo(parametros):
+    """
+    Retorna uma página do catálogo de produtos, já filtrada, e o cursor da
+    próxima página (ou None). A paginação é por cursor no ID, na ordem '-id',
+    e busca apenas as colunas exibidas nas listagens.
+    """
+    lista_produtos = Produto.objects.select_related('tipo_peca', 'fornecedor').only(
+        'nome', 'tipo', 'estoque', 'preco_venda', 'codigo_barras',
+        'tipo_peca__nome',
+        'fornecedor__nome_completo', 'fornecedor__fornecedor', 'fornecedor__tipo_fornecedor',
+    ).order_by('-id')
+
+    termo_busca = parametros.get('buscar')
+    filtro_tipo = parametros.get('tipo')
+    cursor = parametros.get('apos')
+    # A ordem por '-id' é mantida mesmo na busca, pois é ela que o cursor usa.
+    lista_produtos = filtrar_busca(lista_produtos, 'produto_busca', termo_busca)
 
     if filtro_tipo:
         lista_produtos = lista_produtos.filter(tipo=filtro_tipo)
 
+    if cursor and cursor.isdigit():
+        lista_produtos = lista_produtos.filter(id__lt=int(cursor))
+
+    # Buscamos um produto a mais só para saber se existe próxima página.
+    produtos = list(lista_produtos[:PRODUTOS_POR_PAGINA + 1])
+    proximo_cursor = None
+    if len(produtos) > PRODUTOS_POR_PAGINA:
+        produtos = produtos[:PRODUTOS_POR_PAGINA]
+        proximo_cursor = produtos[-1].id
+    return produtos, proximo_cursor
+
+def produto_consultar(request):
+    produtos, proximo_cursor = _pagina_catalogo(request.GET)
+
     context = {
-        'produtos': lista_produtos,
-        'termo_busca_valor': termo_busca or "",
-        'filtro_tipo_valor': filtro_tipo or "",
+        'produtos': produtos,
+        'proximo_cursor': proximo_cursor,
+        'termo_busca_valor': request.GET.get('buscar') or "",
+        'filtro_tipo_valor': request.GET.get('tipo') or "",
     }
     return render(request, 'produtos/produto_consultar.html/', context)
 
+@login_required
+@require_GET
+def produto_catalogo_api(request):
+    """
+    API usada pela rolagem infinita do inventário e do gerador de etiquetas.
+    Aceita os mesmos filtros das páginas (buscar, tipo) e o cursor 'apos'.
+    """
+    produtos, proximo_cursor = _pagina_catalogo(request.GET)
+
+    dados_produtos = [{
+        'id': produto.id,
+        'nome': produto.nome,
+        'tipo': produto.tipo,
+        'tipo_display': produto.get_tipo_display(),
+        'tipo_peca': str(produto.tipo_peca) if produto.tipo_peca else '',
+        'fornecedor': str(produto.fornecedor) if produto.fornecedor else '',
+        'estoque': produto.estoque,
+        'preco_venda': produto.preco_venda,
+        'codigo_barras': produto.codigo_barras or '',
+        'url_deletar': reverse('deletar_produto', args=[produto.id]),
+    } for produto in produtos]
+
+    return JsonResponse({'status': 'success', 'produtos': dados_produtos, 'proximo_cursor': proximo_cursor})
+
 @login_required
 @require_POST
 def deletar_produto(request, produto_id):
@@ -153,13 +207,14 @@ def salvar_estoque_api(request):
         produtos_para_atualizar = data.get('produtos', [])
         if not isinstance(produtos_para_atualizar, list):
             raise ValueError("Os dados enviados não estão no formato de lista esperado.")
-        with transaction.atomic():
+        with transacao_escrita():
             for item in produtos_para_atualizar:
                 produto_id = item.get('id')
                 nova_quantidade = int(item.get('nova_quantidade'))
                 if nova_quantidade < 0:
                     raise ValueError(f"A quantidade de estoque para o produto ID {produto_id} não pode ser negativa.")
                 Produto.objects.filter(pk=produto_id).update(estoque=nova_quantidade)
+            invalidar_painel()
         return JsonResponse({'status': 'success', 'message': 'Estoque atualizado com sucesso!'})
     except (json.JSONDecodeError, ValueError, KeyError) as e:
         return JsonResponse({'status': 'error', 'message': f'Erro nos dados enviados: {e}'}, status=400)
@@ -167,16 +222,29 @@ def salvar_estoque_api(request):
         return JsonResponse({'status': 'error', 'message': f'Ocorreu um erro inesperado: {e}'}, status=500)
 
 def gerar_etiqueta(request):
+    produtos, proximo_cursor = _pagina_catalogo(request.GET)
     context = {
-        'produtos': Produto.objects.all(),
+        'produtos': produtos,
+        'proximo_cursor': proximo_cursor,
     }
     return render(request, 'produtos/produto_gerar_etiqueta.html', context)
 
 
+@login_required
+@require_POST
 def imprimir_etiquetas(request):
     """
-    View que delega a geração do PDF de etiquetas para o método
-    correspondente no modelo Produto.
+    API que enfileira a geração do PDF de etiquetas dos produtos solicitados
+    ({id, quantidade}) e responde na hora com a tarefa. O PDF é gerado pelo
+    worker ('processar_tarefas') e baixado pelo JavaScript quando fica pronto.
     """
-    # A view apenas chama o método de classe e retorna o que ele produzir.
-    return Produto.imprimir_etiquetas(request)
\ No newline at end of file
+    try:
+        data = json.loads(request.body)
+        produtos = data.get('produtos', [])
+        if not isinstance(produtos, list) or not produtos:
+            raise ValueError("Nenhum produto na fila de impressão.")
+    except (json.JSONDecodeError, ValueError) as e:
+        return JsonResponse({'status': 'error', 'message': f'Erro nos dados enviados: {e}'}, status=400)
+
+    tarefa = TarefaPDF.enfileirar(TarefaPDF.TipoTarefa.ETIQUETAS, {'produtos': produtos}, responsavel=request.user)
+    return resposta_tarefa(tarefa)
\ No newline at end of file
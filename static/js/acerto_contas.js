@@ -248,10 +248,8 @@ document.addEventListener('DOMContentLoaded', function() {
             if (result.status === 'success') {
                 alert(result.message);
                 
-                if (result.pdf_base64 && result.nome_arquivo) {
-                    await baixarPDFAcerto(result.pdf_base64, result.nome_arquivo);
-                } else if (result.pdf_error) {
-                    console.warn('Erro na geração do PDF:', result.pdf_error);
+                if (result.tarefa) {
+                    await baixarPDFAcerto(result.tarefa);
                 }
                 
                 window.location.reload();
@@ -263,14 +261,11 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
-    async function baixarPDFAcerto(pdf_base64, nome_arquivo) {
+    // O recibo é gerado pelo worker depois do acerto gravado; a página
+    // acompanha a tarefa e baixa o PDF antes de recarregar.
+    async function baixarPDFAcerto(tarefa) {
         try {
-            const link = document.createElement('a');
-            link.href = 'data:application/pdf;base64,' + pdf_base64;
-            link.download = nome_arquivo || 'acerto_remessa.pdf';
-            document.body.appendChild(link);
-            link.click();
-            document.body.removeChild(link);
+            await baixarArquivoTarefa(await aguardarTarefa(tarefa));
         } catch (error) {
             console.error('Erro ao baixar PDF de acerto:', error);
             alert('Acerto realizado com sucesso, mas houve erro ao baixar o recibo.');
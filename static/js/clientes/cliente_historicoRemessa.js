@@ -4,16 +4,16 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Seleciona os elementos que serão animados
     const pageHeader = document.querySelector('.page-header');
-    const filterCard = document.querySelector('.filter-card');
+    const filterCards = document.querySelectorAll('.filter-card');
     const resultCards = document.querySelectorAll('.result-card');
 
     // 1. Anima o cabeçalho e o card de filtro
     if (pageHeader) {
         setTimeout(() => pageHeader.classList.add('visible'), 100);
     }
-    if (filterCard) {
-        setTimeout(() => filterCard.classList.add('visible'), 200);
-    }
+    filterCards.forEach(card => {
+        setTimeout(() => card.classList.add('visible'), 200);
+    });
 
     // 2. Anima cada card de resultado com um atraso escalonado
     resultCards.forEach((card, index) => {
@@ -30,6 +30,7 @@ document.addEventListener('DOMContentLoaded', function() {
             e.preventDefault();
             
             const remessaId = this.dataset.remessaId;
+            const reciboUrl = this.dataset.reciboUrl;
             
             // Desabilita o botão temporariamente
             const originalContent = this.innerHTML;
@@ -37,7 +38,7 @@ document.addEventListener('DOMContentLoaded', function() {
             this.disabled = true;
             
             try {
-                await imprimirReciboAntigo(remessaId);
+                await imprimirReciboAntigo(remessaId, reciboUrl);
             } catch (error) {
                 alert(`Erro ao gerar recibo: ${error.message}`);
             } finally {
@@ -49,51 +50,76 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 
     // 4. Função para imprimir recibo antigo
-    async function imprimirReciboAntigo(remessaId) {
-        try {
-            const response = await fetch('/clientes/imprimirReciboAntigo/', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                    'X-CSRFToken': getCookie('csrftoken')
-                },
-                body: JSON.stringify({
-                    remessaID: remessaId
-                })
-            });
-            
-            const data = await response.json();
-            
-            if (data.success && data.pdf_base64) {
-                // Cria um link temporário para iniciar o download do PDF
-                const link = document.createElement('a');
-                link.href = 'data:application/pdf;base64,' + data.pdf_base64;
-                link.download = data.nome_arquivo || `recibo_remessa_${remessaId}.pdf`;
-                document.body.appendChild(link);
-                link.click();
-                document.body.removeChild(link);
-            } else {
-                throw new Error(data.error || 'Não foi possível gerar o PDF.');
-            }
-        } catch (error) {
-            throw error;
+    // O PDF vem do arquivo de recibos do servidor. O navegador guarda a
+    // resposta e revalida pelo ETag: se a remessa não mudou, recebe 304
+    // e reaproveita o PDF que já tem.
+    async function imprimirReciboAntigo(remessaId, reciboUrl) {
+        const response = await fetch(reciboUrl);
+        if (!response.ok) {
+            throw new Error('Não foi possível gerar o PDF.');
         }
+
+        const pdfBlob = await response.blob();
+        const pdfUrl = URL.createObjectURL(pdfBlob);
+
+        // Cria um link temporário para iniciar o download do PDF
+        const link = document.createElement('a');
+        link.href = pdfUrl;
+        link.download = `recibo_remessa_${remessaId}.pdf`;
+        document.body.appendChild(link);
+        link.click();
+        document.body.removeChild(link);
+        URL.revokeObjectURL(pdfUrl);
     }
 
-    // 5. Função auxiliar para pegar o token CSRF
-    function getCookie(name) {
-        let cookieValue = null;
-        if (document.cookie && document.cookie !== '') {
-            const cookies = document.cookie.split(';');
-            for (let i = 0; i < cookies.length; i++) {
-                const cookie = cookies[i].trim();
-                if (cookie.substring(0, name.length + 1) === (name + '=')) {
-                    cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
-                    break;
+    // 5. Exportação dos recibos de um período (ZIP)
+    // A exportação roda no worker de tarefas; aqui só acompanhamos o
+    // progresso e baixamos o arquivo quando ele fica pronto.
+    const formExportar = document.getElementById('form-exportar-recibos');
+    const progressoExportar = document.getElementById('exportar-progresso');
+
+    if (formExportar) {
+        formExportar.addEventListener('submit', async function(e) {
+            e.preventDefault();
+            const botao = this.querySelector('button[type="submit"]');
+            botao.disabled = true;
+            progressoExportar.textContent = 'Enfileirando a exportação...';
+
+            try {
+                const response = await fetch(this.dataset.url, {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRFToken': this.querySelector('[name="csrfmiddlewaretoken"]').value
+                    },
+                    body: JSON.stringify({
+                        inicio: this.inicio.value,
+                        fim: this.fim.value,
+                        status: this.status.value
+                    })
+                });
+                const data = await response.json();
+                if (data.status !== 'success') {
+                    throw new Error(data.message);
                 }
+                await acompanharExportacao(data.tarefa);
+            } catch (error) {
+                progressoExportar.textContent = `Erro na exportação: ${error.message}`;
+            } finally {
+                botao.disabled = false;
             }
-        }
-        return cookieValue;
+        });
+    }
+
+    async function acompanharExportacao(tarefa) {
+        tarefa = await aguardarTarefa(tarefa, atual => {
+            progressoExportar.textContent = atual.total
+                ? `Gerando recibos: ${atual.progresso} de ${atual.total}`
+                : 'Aguardando o início da exportação...';
+        });
+        // ZIPs grandes: o navegador baixa direto, sem passar por um blob.
+        progressoExportar.textContent = 'Exportação concluída. Baixando o arquivo...';
+        window.location.href = tarefa.download_url;
     }
 
     console.log("Página de histórico de remessas carregada.");
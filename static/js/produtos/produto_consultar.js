@@ -16,33 +16,90 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
-    // --- NOVA LÓGICA PARA CONFIRMAÇÃO DE EXCLUSÃO ---
-
-    // 1. Seleciona todos os botões que têm a classe '.btn-delete'.
-    const deleteButtons = document.querySelectorAll('.btn-delete');
-
-    // 2. Itera sobre cada botão encontrado.
-    deleteButtons.forEach(button => {
-        // 3. Adiciona um "escutador de eventos" que será acionado no clique.
-        button.addEventListener('click', function(event) {
-            
-            // 4. Previne que o formulário seja enviado imediatamente.
-            event.preventDefault();
-
-            // 5. Exibe a caixa de diálogo de confirmação padrão do navegador.
-            // A mensagem pode ser personalizada.
-            const userConfirmed = window.confirm("Tem certeza que deseja excluir este produto? Esta ação não pode ser desfeita.");
-
-            // 6. Verifica a resposta do usuário.
-            if (userConfirmed) {
-                // Se o usuário clicou em "OK", encontra o formulário pai do botão
-                // e o envia para o servidor.
-                // 'this.closest("form")' é uma forma segura de encontrar o formulário correto.
-                this.closest('form').submit();
-            }
-            // Se o usuário clicou em "Cancelar", nada acontece.
-        });
+    // --- CONFIRMAÇÃO DE EXCLUSÃO ---
+
+    // O clique é tratado na tabela (delegação), assim vale também para as
+    // linhas que chegam depois pela rolagem infinita.
+    const tbody = document.getElementById('produtos-tbody');
+
+    tbody.addEventListener('click', function(event) {
+        const button = event.target.closest('.btn-delete');
+        if (!button) return;
+
+        // Previne que o formulário seja enviado imediatamente.
+        event.preventDefault();
+
+        const userConfirmed = window.confirm("Tem certeza que deseja excluir este produto? Esta ação não pode ser desfeita.");
+        if (userConfirmed) {
+            button.closest('form').submit();
+        }
     });
 
+    // --- ROLAGEM INFINITA ---
+
+    const sentinela = document.getElementById('carregar-mais');
+    const linhaTemplate = document.getElementById('produto-linha-template');
+    const CLASSES_TIPO = { 'OU': 'bg-warning text-dark', 'PR': 'bg-info' };
+    let carregando = false;
+
+    function preencherBadge(elemento, texto, classes) {
+        if (texto) {
+            elemento.textContent = texto;
+            elemento.className = 'badge ' + classes;
+        } else {
+            elemento.textContent = '-';
+            elemento.className = 'badge bg-light text-muted';
+        }
+    }
+
+    function criarLinha(produto) {
+        const linha = linhaTemplate.content.firstElementChild.cloneNode(true);
+        linha.querySelector('[data-campo="nome"]').textContent = produto.nome;
+        linha.querySelector('[data-campo="codigo_barras"]').textContent = produto.codigo_barras;
+        preencherBadge(linha.querySelector('[data-campo="tipo_display"]'), produto.tipo_display, CLASSES_TIPO[produto.tipo] || 'bg-secondary');
+        preencherBadge(linha.querySelector('[data-campo="tipo_peca"]'), produto.tipo_peca, 'bg-success');
+        preencherBadge(linha.querySelector('[data-campo="fornecedor"]'), produto.fornecedor, 'bg-primary');
+        linha.querySelector('[data-campo="estoque"]').textContent = produto.estoque;
+        linha.querySelector('[data-campo="preco_venda"]').textContent = produto.preco_venda;
+        linha.querySelector('form').action = produto.url_deletar;
+        return linha;
+    }
+
+    async function carregarProximaPagina() {
+        if (carregando || !sentinela.dataset.cursor) return;
+        carregando = true;
+
+        const params = new URLSearchParams({
+            buscar: sentinela.dataset.buscar,
+            tipo: sentinela.dataset.tipo,
+            apos: sentinela.dataset.cursor,
+        });
+
+        try {
+            const response = await fetch(`${sentinela.dataset.url}?${params}`);
+            const data = await response.json();
+            if (data.status !== 'success') throw new Error(data.message);
+
+            data.produtos.forEach(produto => tbody.appendChild(criarLinha(produto)));
+            sentinela.dataset.cursor = data.proximo_cursor || '';
+            if (!data.proximo_cursor) {
+                sentinela.classList.add('d-none');
+            }
+        } catch (error) {
+            console.error('Erro ao carregar mais produtos:', error);
+        } finally {
+            carregando = false;
+        }
+    }
+
+    if (sentinela && sentinela.dataset.cursor) {
+        const observer = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                carregarProximaPagina();
+            }
+        }, { rootMargin: '200px' });
+        observer.observe(sentinela);
+    }
+
     console.log("Página de inventário carregada e confirmação de exclusão ativada.");
 });
@@ -3,7 +3,8 @@ document.addEventListener('DOMContentLoaded', function() {
     // --- 1. SELEÇÃO DOS ELEMENTOS DO DOM ---
     const searchInput = document.getElementById('search-product-input');
     const availableProductsList = document.getElementById('available-products-list');
-    const allProductItems = availableProductsList.querySelectorAll('.product-item');
+    const productItemTemplate = document.getElementById('product-item-template');
+    const sentinela = document.getElementById('carregar-mais');
     
     const printQueueList = document.getElementById('print-queue-list');
     const emptyQueueMessage = document.getElementById('empty-queue-message');
@@ -12,22 +13,77 @@ document.addEventListener('DOMContentLoaded', function() {
     const generatePdfBtn = document.getElementById('generate-pdf-btn');
     // As variáveis para as opções de etiqueta foram removidas
 
-    // --- 2. LÓGICA DA BUSCA DE PRODUTOS (FRONTEND) ---
-    searchInput.addEventListener('input', function() {
-        const searchTerm = this.value.toLowerCase().trim();
+    // --- 2. LÓGICA DA BUSCA E ROLAGEM INFINITA DE PRODUTOS ---
+    // A lista é paginada no servidor: a busca recarrega a primeira página
+    // e a sentinela no fim da lista carrega as próximas.
+    let termoBusca = '';
+    let carregando = false;
+    let timeoutBusca = null;
+
+    function criarProductItem(produto) {
+        const item = productItemTemplate.content.firstElementChild.cloneNode(true);
+        item.dataset.id = produto.id;
+        item.dataset.nome = produto.nome;
+        item.dataset.codigo = produto.codigo_barras;
+        item.querySelector('.item-nome').textContent = produto.nome;
+        item.querySelector('.item-material').textContent = produto.tipo_display;
+        item.querySelector('.item-tipo-peca').textContent = produto.tipo_peca || 'None';
+        item.querySelector('.item-codigo').textContent = produto.codigo_barras || '-';
+        return item;
+    }
 
-        allProductItems.forEach(item => {
-            const productName = item.dataset.nome.toLowerCase();
-            const productCode = item.dataset.codigo ? item.dataset.codigo.toLowerCase() : '';
+    async function carregarProdutos(reiniciar) {
+        if (carregando && !reiniciar) return;
+        if (!reiniciar && !sentinela.dataset.cursor) return;
+        carregando = true;
+
+        const buscaAtual = termoBusca;
+        const params = new URLSearchParams({ buscar: buscaAtual });
+        if (!reiniciar) {
+            params.set('apos', sentinela.dataset.cursor);
+        }
 
-            if (productName.includes(searchTerm) || productCode.includes(searchTerm)) {
-                item.style.display = 'block';
-            } else {
-                item.style.display = 'none';
+        try {
+            const response = await fetch(`${sentinela.dataset.url}?${params}`);
+            const data = await response.json();
+            if (data.status !== 'success') throw new Error(data.message);
+            // Descarta respostas de uma busca que já foi substituída por outra.
+            if (buscaAtual !== termoBusca) return;
+
+            if (reiniciar) {
+                availableProductsList.innerHTML = '';
+                if (data.produtos.length === 0) {
+                    const vazio = document.createElement('li');
+                    vazio.className = 'list-group-item text-center text-muted py-4';
+                    vazio.textContent = 'Nenhum produto encontrado.';
+                    availableProductsList.appendChild(vazio);
+                }
             }
-        });
+            data.produtos.forEach(produto => availableProductsList.appendChild(criarProductItem(produto)));
+            sentinela.dataset.cursor = data.proximo_cursor || '';
+            sentinela.classList.toggle('d-none', !data.proximo_cursor);
+        } catch (error) {
+            console.error('Erro ao carregar produtos:', error);
+        } finally {
+            carregando = false;
+        }
+    }
+
+    searchInput.addEventListener('input', function() {
+        clearTimeout(timeoutBusca);
+        timeoutBusca = setTimeout(() => {
+            termoBusca = this.value.trim();
+            carregarProdutos(true);
+        }, 300);
     });
 
+    const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) {
+            carregarProdutos(false);
+        }
+    }, { root: sentinela.parentElement, rootMargin: '200px' });
+    observer.observe(sentinela);
+
     // --- 3. LÓGICA PARA ADICIONAR PRODUTO À FILA ---
     availableProductsList.addEventListener('click', function(event) {
         if (event.target.classList.contains('add-to-queue-btn')) {
@@ -84,6 +140,12 @@ document.addEventListener('DOMContentLoaded', function() {
 
         // A lógica das opções foi removida
         
+        // O servidor enfileira o PDF e responde com a tarefa; o arquivo é
+        // baixado quando o worker termina de gerá-lo.
+        const textoBotao = generatePdfBtn.innerHTML;
+        generatePdfBtn.disabled = true;
+        generatePdfBtn.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Gerando etiquetas...';
+
         fetch('imprimir-etiquetas/', {
             method: 'POST',
             headers: {
@@ -95,24 +157,21 @@ document.addEventListener('DOMContentLoaded', function() {
                 produtos: itemsToPrint
             })
         })
-        .then(response => {
-            if (!response.ok) {
-                throw new Error("Erro ao gerar etiquetas.");
+        .then(async response => {
+            const data = await response.json();
+            if (data.status !== 'success') {
+                throw new Error(data.message || "Erro ao gerar etiquetas.");
             }
-            return response.blob();
-        })
-        .then(blob => {
-            const url = window.URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = url;
-            a.download = 'etiquetas.pdf'; // Nome do arquivo alterado para .prn
-            document.body.appendChild(a);
-            a.click();
-            a.remove();
+            return aguardarTarefa(data.tarefa);
         })
+        .then(baixarArquivoTarefa)
         .catch(error => {
             alert("Erro: " + error.message);
             console.error(error);
+        })
+        .finally(() => {
+            generatePdfBtn.disabled = false;
+            generatePdfBtn.innerHTML = textoBotao;
         });
     });
 
@@ -185,18 +185,14 @@ document.addEventListener('DOMContentLoaded', function() {
                 },
                 body: JSON.stringify(dadosRecibo)
             });
+            // O servidor enfileira o recibo e responde com a tarefa; o PDF é
+            // baixado quando o worker termina de gerá-lo.
             const data = await response.json();
-
-            if (data.success && data.pdf_base64) {
-                const link = document.createElement('a');
-                link.href = 'data:application/pdf;base64,' + data.pdf_base64;
-                link.download = data.nome_arquivo || 'recibo.pdf';
-                document.body.appendChild(link);
-                link.click();
-                document.body.removeChild(link);
-            } else {
-                throw new Error(data.error || 'Não foi possível gerar o PDF.');
+            if (data.status !== 'success') {
+                throw new Error(data.message || 'Não foi possível gerar o PDF.');
             }
+            finalizeBtn.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Gerando recibo...';
+            await baixarArquivoTarefa(await aguardarTarefa(data.tarefa));
         } catch (error) {
             alert(`A operação foi salva com sucesso, mas houve um erro ao gerar o recibo: ${error.message}`);
         }
@@ -207,15 +203,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
         // --- COLETA DE DADOS ---
         const tipoRemessa = document.querySelector('input[name="tipo_remessa"]:checked').value;
-        const nomeCliente = clientNameDisplay.textContent;
 
-        const produtosParaRecibo = Array.from(productsInList.values()).map(row => ({
-            nome: row.querySelector('.product-name').textContent,
-            quantidade: row.querySelector('.product-quantity').value,
-            preco_unitario: parseFloat(row.dataset.price).toFixed(2),
-            subtotal: (parseFloat(row.dataset.price) * parseInt(row.querySelector('.product-quantity').value)).toFixed(2)
-        }));
-        
         const remessaData = {
             cliente_id: selectedClientId,
             tipo_remessa: tipoRemessa,
@@ -248,19 +236,8 @@ document.addEventListener('DOMContentLoaded', function() {
             if (result.status === 'success') {
                 alert(result.message);
 
-                const dadosRecibo = {
-                    produtos: produtosParaRecibo,
-                    nome_cliente: nomeCliente,
-                    total_itens: totalItemsEl.textContent,
-                    valor_total: totalPriceEl.textContent,
-                    remessaID: remessaID,
-                    tipoRemessa: tipoRemessa,
-                };
-
-                // Adiciona a forma de pagamento aos dados do recibo ---
-                if (tipoRemessa === 'VENDA') {
-                    dadosRecibo.forma_pagamento = paymentMethodSelect.options[paymentMethodSelect.selectedIndex].text;
-                }
+                // O recibo é montado no servidor com os itens gravados na remessa.
+                const dadosRecibo = { remessaID: remessaID };
 
                 await gerarReciboPDF(dadosRecibo);
 
@@ -0,0 +1,54 @@
+// Acompanhamento das tarefas em segundo plano (app 'tarefas').
+// As views que geram PDFs só enfileiram a tarefa e respondem com ela; aqui
+// o status é consultado até o arquivo ficar pronto, e então ele é baixado.
+
+// Tempo máximo (ms) que uma tarefa pode ficar 'Pendente'. Passado esse
+// tempo, nenhum worker a pegou: o processador de tarefas provavelmente
+// não está rodando.
+const LIMITE_TAREFA_PENDENTE_MS = 60000;
+
+// Consulta o status_url da tarefa até ela terminar. 'aoAtualizar' (opcional)
+// recebe a tarefa a cada consulta, para mostrar o andamento.
+// Retorna a tarefa concluída (com download_url) ou lança um erro.
+async function aguardarTarefa(tarefa, aoAtualizar, intervalo = 1000) {
+    const inicio = Date.now();
+    while (tarefa.status !== 'CONCLUIDA') {
+        if (tarefa.status === 'ERRO') {
+            throw new Error(tarefa.erro || 'Não foi possível gerar o arquivo.');
+        }
+        if (tarefa.status === 'PENDENTE' && Date.now() - inicio > LIMITE_TAREFA_PENDENTE_MS) {
+            throw new Error(
+                'O arquivo ainda não começou a ser gerado. Verifique se o processador de tarefas ' +
+                '(python manage.py processar_tarefas) está em execução e tente novamente.'
+            );
+        }
+        if (aoAtualizar) {
+            aoAtualizar(tarefa);
+        }
+        await new Promise(resolve => setTimeout(resolve, intervalo));
+
+        const response = await fetch(tarefa.status_url);
+        if (!response.ok) {
+            throw new Error(`Erro ao consultar a tarefa (HTTP ${response.status}).`);
+        }
+        tarefa = (await response.json()).tarefa;
+    }
+    return tarefa;
+}
+
+// Baixa o arquivo de uma tarefa concluída, com o nome sugerido pelo servidor.
+async function baixarArquivoTarefa(tarefa) {
+    const response = await fetch(tarefa.download_url);
+    if (!response.ok) {
+        throw new Error(`Erro ao baixar o arquivo (HTTP ${response.status}).`);
+    }
+    const url = URL.createObjectURL(await response.blob());
+
+    const link = document.createElement('a');
+    link.href = url;
+    link.download = tarefa.nome_arquivo || 'arquivo.pdf';
+    document.body.appendChild(link);
+    link.click();
+    document.body.removeChild(link);
+    URL.revokeObjectURL(url);
+}
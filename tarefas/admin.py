@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import TarefaPDF
+
+@admin.register(TarefaPDF)
+class TarefaPDFAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'status', 'responsavel', 'criada_em', 'concluida_em')
+    list_filter = ('tipo', 'status')
+    readonly_fields = ('criada_em', 'iniciada_em', 'concluida_em')
@@ -0,0 +1,92 @@
+"""
+Geradores de PDF executados pelas tarefas em segundo plano.
+
+Cada gerador recebe os parâmetros da tarefa, o caminho de destino e uma
+função de progresso (concluidos, total), grava o arquivo nesse caminho e
+retorna o nome de arquivo sugerido para o download.
+"""
+from datetime import date
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from elderCadastro.exportacao import exportar_recibos, filtrar_remessas_exportacao
+from elderCadastro.gerarRecibo import gerar_recibo_remessa, indexar_acerto
+from produtos.etiquetas import gerar_pdf_etiquetas
+from produtos.models import Produto
+
+from .models import TarefaPDF
+
+
+def gerar_etiquetas(parametros, destino, progresso=None):
+    etiquetas = Produto.montar_etiquetas(parametros.get('produtos', []))
+    gerar_pdf_etiquetas(etiquetas, str(destino))
+    return 'etiquetas.pdf'
+
+
+def gerar_recibo(parametros, destino, progresso=None):
+    resultado = gerar_recibo_remessa(parametros['remessaID'])
+    destino.write_bytes(resultado['pdf_bytes'])
+    return f"recibo_remessa_{parametros['remessaID']}.pdf"
+
+
+def gerar_acerto(parametros, destino, progresso=None):
+    resultado = indexar_acerto(
+        itensContinuam=parametros.get('itensContinuam', []),
+        itensRemovidos=parametros.get('itensRemovidos', {}),
+        acaoFinal=parametros.get('acaoFinal'),
+        remessaID=parametros.get('remessaID'),
+    )
+    if 'pdf_bytes' not in resultado:
+        raise ValueError(resultado.get('error', 'Erro desconhecido ao gerar o recibo de acerto.'))
+    destino.write_bytes(resultado['pdf_bytes'])
+    return resultado['nome_arquivo']
+
+
+def gerar_exportacao(parametros, destino, progresso=None):
+    inicio = parametros.get('inicio')
+    fim = parametros.get('fim')
+    remessa_ids = filtrar_remessas_exportacao(
+        inicio=date.fromisoformat(inicio) if inicio else None,
+        fim=date.fromisoformat(fim) if fim else None,
+        status=parametros.get('status', ''),
+        cliente_id=parametros.get('cliente_id'),
+    )
+    # A tarefa já roda em um dos processos do pool do processar_tarefas:
+    # abrir outro pool aqui multiplicaria os processos (N x N). O pool
+    # próprio fica só para o comando exportar_recibos.
+    exportar_recibos(remessa_ids, destino, processos=1, progresso=progresso)
+    return f"recibos_{inicio or 'inicio'}_{fim or 'hoje'}.zip"
+
+
+GERADORES = {
+    TarefaPDF.TipoTarefa.ETIQUETAS: gerar_etiquetas,
+    TarefaPDF.TipoTarefa.RECIBO: gerar_recibo,
+    TarefaPDF.TipoTarefa.ACERTO: gerar_acerto,
+    TarefaPDF.TipoTarefa.EXPORTACAO: gerar_exportacao,
+}
+
+
+def executar_tarefa(tarefa_id):
+    """
+    Executa uma tarefa já reservada (status 'Processando') e grava o resultado.
+    Roda dentro dos processos do worker; retorna o status final.
+    """
+    close_old_connections()
+    tarefa = TarefaPDF.objects.get(pk=tarefa_id)
+    destino = tarefa.caminho_arquivo
+    destino.parent.mkdir(parents=True, exist_ok=True)
+
+    try:
+        tarefa.nome_arquivo = GERADORES[tarefa.tipo](
+            tarefa.parametros, destino, progresso=tarefa.registrar_progresso
+        )
+        tarefa.status = TarefaPDF.StatusTarefa.CONCLUIDA
+    except Exception as e:
+        tarefa.status = TarefaPDF.StatusTarefa.ERRO
+        tarefa.erro = str(e)
+        destino.unlink(missing_ok=True)
+
+    tarefa.concluida_em = timezone.now()
+    tarefa.save(update_fields=['status', 'nome_arquivo', 'erro', 'concluida_em'])
+    return tarefa.status
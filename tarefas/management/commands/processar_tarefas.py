@@ -0,0 +1,125 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from tarefas.geradores import executar_tarefa
+from tarefas.models import TarefaPDF
+from tarefas.processos import inicializar_processo
+
+
+# Segundos entre as verificações de tarefas abandonadas por outro worker.
+INTERVALO_RECUPERACAO = 60
+
+
+class Command(BaseCommand):
+    help = "Executa as tarefas de geração de PDF pendentes usando um pool de processos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processos', type=int, default=os.cpu_count() or 1,
+            help="Quantidade de processos geradores de PDF (padrão: número de CPUs)."
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=1.0,
+            help="Segundos entre as verificações de novas tarefas."
+        )
+        parser.add_argument(
+            '--uma-vez', action='store_true',
+            help="Processa as tarefas pendentes e encerra, em vez de ficar aguardando."
+        )
+        parser.add_argument(
+            '--tempo-limite', type=int, default=30,
+            help="Minutos após os quais uma tarefa 'Processando' é considerada abandonada "
+                 "e volta para a fila (padrão: 30). Deve ser maior que a tarefa mais longa."
+        )
+
+    def criar_pool(self, processos):
+        # Os processos filhos abrem suas próprias conexões com o banco.
+        connections.close_all()
+        return ProcessPoolExecutor(
+            max_workers=processos,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=inicializar_processo,
+        )
+
+    def recuperar_travadas(self, limite, em_andamento):
+        """
+        Devolve para a fila as tarefas deixadas em 'Processando' por um worker
+        encerrado (uma execução anterior deste ou outro worker). As tarefas
+        que este worker está executando ficam de fora.
+        """
+        recuperadas = TarefaPDF.recuperar_travadas(limite, ignorar=em_andamento.values())
+        if recuperadas:
+            self.stdout.write(f"{recuperadas} tarefa(s) interrompida(s) recuperada(s).")
+
+    def handle(self, *args, **options):
+        processos = max(1, options['processos'])
+        intervalo = options['intervalo']
+        limite = timedelta(minutes=options['tempo_limite'])
+
+        self.stdout.write(f"Worker de tarefas iniciado com {processos} processo(s).")
+        pool = self.criar_pool(processos)
+        em_andamento = {}
+        proxima_recuperacao = 0
+        try:
+            while True:
+                # Na partida e depois a cada INTERVALO_RECUPERACAO segundos.
+                if time.monotonic() >= proxima_recuperacao:
+                    self.recuperar_travadas(limite, em_andamento)
+                    proxima_recuperacao = time.monotonic() + INTERVALO_RECUPERACAO
+
+                quebrado = False
+                while len(em_andamento) < processos:
+                    tarefa = TarefaPDF.reservar_proxima()
+                    if tarefa is None:
+                        break
+                    try:
+                        em_andamento[pool.submit(executar_tarefa, tarefa.id)] = tarefa.id
+                    except BrokenProcessPool as e:
+                        TarefaPDF.devolver_para_fila([tarefa.id], str(e))
+                        quebrado = True
+                        break
+
+                if not em_andamento and not quebrado:
+                    if options['uma_vez']:
+                        break
+                    time.sleep(intervalo)
+                    continue
+
+                concluidas, _ = wait(em_andamento, timeout=intervalo, return_when=FIRST_COMPLETED)
+                for futuro in concluidas:
+                    tarefa_id = em_andamento.pop(futuro)
+                    try:
+                        status = futuro.result()
+                    except BrokenProcessPool:
+                        # Um processo filho morreu (ex.: sem memória); não dá para
+                        # saber qual tarefa o derrubou, então todas as que estavam
+                        # no pool voltam para a fila.
+                        em_andamento[futuro] = tarefa_id
+                        quebrado = True
+                        continue
+                    except Exception as e:
+                        # O processo filho falhou antes de registrar o resultado.
+                        status = TarefaPDF.StatusTarefa.ERRO
+                        TarefaPDF.objects.filter(pk=tarefa_id).update(
+                            status=status, erro=str(e), concluida_em=timezone.now()
+                        )
+                    self.stdout.write(f"Tarefa #{tarefa_id}: {status}")
+
+                if quebrado:
+                    TarefaPDF.devolver_para_fila(
+                        list(em_andamento.values()), 'Um processo do worker foi encerrado durante a geração.'
+                    )
+                    em_andamento.clear()
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self.criar_pool(processos)
+                    self.stdout.write("Pool de processos recriado após a falha de um processo.")
+        finally:
+            pool.shutdown()
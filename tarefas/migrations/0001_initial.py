@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TarefaPDF',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('ETIQUETAS', 'Etiquetas de Produtos'), ('RECIBO', 'Recibo de Remessa'), ('ACERTO', 'Recibo de Acerto de Contas')], max_length=10, verbose_name='Tipo da Tarefa')),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('PROCESSANDO', 'Processando'), ('CONCLUIDA', 'Concluída'), ('ERRO', 'Erro')], default='PENDENTE', max_length=11, verbose_name='Status da Tarefa')),
+                ('parametros', models.JSONField(default=dict, verbose_name='Parâmetros')),
+                ('nome_arquivo', models.CharField(blank=True, max_length=200, verbose_name='Nome do Arquivo')),
+                ('erro', models.TextField(blank=True, verbose_name='Mensagem de Erro')),
+                ('criada_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Criada em')),
+                ('iniciada_em', models.DateTimeField(blank=True, null=True, verbose_name='Iniciada em')),
+                ('concluida_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluída em')),
+                ('responsavel', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tarefas_pdf', to=settings.AUTH_USER_MODEL, verbose_name='Responsável')),
+            ],
+            options={
+                'verbose_name': 'Tarefa de PDF',
+                'verbose_name_plural': 'Tarefas de PDF',
+                'ordering': ['criada_em'],
+                'indexes': [models.Index(fields=['status', 'criada_em'], name='tarefas_tar_status_3b9dc3_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tarefas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarefapdf',
+            name='progresso',
+            field=models.PositiveIntegerField(default=0, verbose_name='Itens Concluídos'),
+        ),
+        migrations.AddField(
+            model_name='tarefapdf',
+            name='total',
+            field=models.PositiveIntegerField(default=0, verbose_name='Total de Itens'),
+        ),
+        migrations.AlterField(
+            model_name='tarefapdf',
+            name='tipo',
+            field=models.CharField(choices=[('ETIQUETAS', 'Etiquetas de Produtos'), ('RECIBO', 'Recibo de Remessa'), ('ACERTO', 'Recibo de Acerto de Contas'), ('EXPORTACAO', 'Exportação de Recibos (ZIP)')], max_length=10, verbose_name='Tipo da Tarefa'),
+        ),
+    ]
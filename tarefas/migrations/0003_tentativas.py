@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tarefas', '0002_exportacao_progresso'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarefapdf',
+            name='tentativas',
+            field=models.PositiveIntegerField(default=0, verbose_name='Tentativas'),
+        ),
+    ]
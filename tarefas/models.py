@@ -0,0 +1,181 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+
+# Tarefa: um pedido de geração de PDF feito fora da requisição.
+# Fica na própria base SQLite e é executada pelo comando 'processar_tarefas'.
+class TarefaPDF(models.Model):
+    class TipoTarefa(models.TextChoices):
+        ETIQUETAS = 'ETIQUETAS', 'Etiquetas de Produtos'
+        RECIBO = 'RECIBO', 'Recibo de Remessa'
+        ACERTO = 'ACERTO', 'Recibo de Acerto de Contas'
+        EXPORTACAO = 'EXPORTACAO', 'Exportação de Recibos (ZIP)'
+
+    class StatusTarefa(models.TextChoices):
+        PENDENTE = 'PENDENTE', 'Pendente'
+        PROCESSANDO = 'PROCESSANDO', 'Processando'
+        CONCLUIDA = 'CONCLUIDA', 'Concluída'
+        ERRO = 'ERRO', 'Erro'
+
+    tipo = models.CharField(
+        max_length=10,
+        choices=TipoTarefa.choices,
+        verbose_name="Tipo da Tarefa"
+    )
+    status = models.CharField(
+        max_length=11,
+        choices=StatusTarefa.choices,
+        default=StatusTarefa.PENDENTE,
+        verbose_name="Status da Tarefa"
+    )
+    # Dados recebidos da requisição, repassados ao gerador do PDF.
+    parametros = models.JSONField(
+        default=dict,
+        verbose_name="Parâmetros"
+    )
+    responsavel = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='tarefas_pdf',
+        verbose_name="Responsável"
+    )
+    nome_arquivo = models.CharField(
+        max_length=200,
+        blank=True,
+        verbose_name="Nome do Arquivo"
+    )
+    erro = models.TextField(
+        blank=True,
+        verbose_name="Mensagem de Erro"
+    )
+    # Andamento das tarefas longas (exportação): itens concluídos de 'total'.
+    progresso = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Itens Concluídos"
+    )
+    total = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Total de Itens"
+    )
+    # Quantas vezes a tarefa já foi reservada por um worker. Limita as novas
+    # tentativas de uma tarefa cujo processo morreu no meio da geração.
+    tentativas = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Tentativas"
+    )
+    criada_em = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Criada em"
+    )
+    iniciada_em = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Iniciada em"
+    )
+    concluida_em = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Concluída em"
+    )
+
+    # Depois de tantas tentativas interrompidas, a tarefa fica com 'Erro'.
+    MAXIMO_TENTATIVAS = 3
+
+    class Meta:
+        verbose_name = "Tarefa de PDF"
+        verbose_name_plural = "Tarefas de PDF"
+        ordering = ['criada_em']
+        indexes = [
+            models.Index(fields=['status', 'criada_em']),
+        ]
+
+    def __str__(self):
+        return f"Tarefa #{self.id} - {self.get_tipo_display()} ({self.get_status_display()})"
+
+    @property
+    def extensao_arquivo(self):
+        return 'zip' if self.tipo == self.TipoTarefa.EXPORTACAO else 'pdf'
+
+    @property
+    def caminho_arquivo(self):
+        """
+        Caminho no disco onde o arquivo gerado por esta tarefa é gravado.
+        """
+        return Path(settings.TAREFAS_PDF_DIR) / f"tarefa_{self.id}.{self.extensao_arquivo}"
+
+    def registrar_progresso(self, concluidos, total):
+        """
+        Grava o andamento da tarefa. Para não escrever no banco a cada item,
+        só grava a cada 1% (e no último item).
+        """
+        passo = max(1, total // 100)
+        if concluidos == total or concluidos % passo == 0:
+            TarefaPDF.objects.filter(pk=self.pk).update(progresso=concluidos, total=total)
+            self.progresso, self.total = concluidos, total
+
+    @classmethod
+    def enfileirar(cls, tipo, parametros, responsavel=None):
+        """
+        Registra um pedido de arquivo para o worker. Os parâmetros precisam
+        ser serializáveis em JSON (valores Decimal devem ir como texto).
+        """
+        return cls.objects.create(tipo=tipo, parametros=parametros, responsavel=responsavel)
+
+    @classmethod
+    def reservar_proxima(cls):
+        """
+        Marca a tarefa pendente mais antiga como 'Processando' e a retorna.
+        A troca de status é condicional, então dois workers nunca pegam a mesma tarefa.
+        Retorna None se não houver tarefas pendentes.
+        """
+        while True:
+            tarefa_id = cls.objects.filter(
+                status=cls.StatusTarefa.PENDENTE
+            ).order_by('criada_em', 'id').values_list('id', flat=True).first()
+            if tarefa_id is None:
+                return None
+
+            reservada = cls.objects.filter(
+                pk=tarefa_id, status=cls.StatusTarefa.PENDENTE
+            ).update(
+                status=cls.StatusTarefa.PROCESSANDO,
+                iniciada_em=timezone.now(),
+                tentativas=F('tentativas') + 1,
+            )
+            if reservada:
+                return cls.objects.get(pk=tarefa_id)
+
+    @classmethod
+    def devolver_para_fila(cls, ids, erro):
+        """
+        Tarefas interrompidas (o processo que as executava morreu) voltam para
+        'Pendente'. As que já esgotaram MAXIMO_TENTATIVAS ficam com 'Erro',
+        para que uma tarefa que derruba o worker não seja repetida para sempre.
+        Retorna quantas tarefas foram tratadas.
+        """
+        interrompidas = cls.objects.filter(pk__in=ids, status=cls.StatusTarefa.PROCESSANDO)
+        esgotadas = interrompidas.filter(tentativas__gte=cls.MAXIMO_TENTATIVAS).update(
+            status=cls.StatusTarefa.ERRO, erro=erro, concluida_em=timezone.now()
+        )
+        devolvidas = interrompidas.filter(tentativas__lt=cls.MAXIMO_TENTATIVAS).update(
+            status=cls.StatusTarefa.PENDENTE, iniciada_em=None, progresso=0, total=0
+        )
+        return esgotadas + devolvidas
+
+    @classmethod
+    def recuperar_travadas(cls, limite, ignorar=()):
+        """
+        Recupera as tarefas que estão 'Processando' há mais tempo que 'limite'
+        (timedelta): o worker que as reservou foi encerrado sem concluí-las.
+        'ignorar' são IDs de tarefas que o chamador sabe que ainda estão rodando.
+        """
+        travadas = cls.objects.filter(
+            status=cls.StatusTarefa.PROCESSANDO, iniciada_em__lt=timezone.now() - limite
+        ).exclude(pk__in=list(ignorar)).values_list('id', flat=True)
+        return cls.devolver_para_fila(list(travadas), 'O worker foi encerrado durante a geração do arquivo.')
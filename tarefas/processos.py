@@ -0,0 +1,14 @@
+"""
+Inicialização dos processos do pool usado pelo worker de tarefas.
+
+Este módulo não importa modelos: ele é carregado pelos processos filhos
+antes de o Django estar configurado.
+"""
+import django
+
+
+def inicializar_processo():
+    """
+    Configura o Django em cada processo filho do pool (método 'spawn').
+    """
+    django.setup()
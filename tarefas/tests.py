@@ -0,0 +1,248 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from decimal import Decimal
+import io
+import json
+import tempfile
+from unittest import mock
+import zipfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from clientes.models import Cliente, ItemRemessa, Remessa
+from produtos.models import Produto
+
+from . import geradores
+from .geradores import executar_tarefa
+from .management.commands import processar_tarefas
+from .models import TarefaPDF
+
+
+class TarefasPDFTests(TestCase):
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+        configuracao = override_settings(TAREFAS_PDF_DIR=self.diretorio.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+        usuario = get_user_model().objects.create_user('balcao', password='senha')
+        self.client.force_login(usuario)
+        self.produto = Produto.objects.create(
+            nome='Anel', custo=Decimal('10.00'), margem_lucro=Decimal('100'), estoque=3
+        )
+
+    def test_fluxo_enfileirar_processar_baixar(self):
+        response = self.client.post(
+            reverse('enfileirar_tarefa_api', args=['ETIQUETAS']),
+            data=json.dumps({'produtos': [{'id': self.produto.id, 'quantidade': 2}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 202)
+        tarefa_id = response.json()['tarefa']['id']
+
+        status = self.client.get(reverse('tarefa_status_api', args=[tarefa_id])).json()
+        self.assertEqual(status['tarefa']['status'], TarefaPDF.StatusTarefa.PENDENTE)
+        self.assertEqual(
+            self.client.get(reverse('tarefa_download', args=[tarefa_id])).status_code, 409
+        )
+
+        tarefa = TarefaPDF.reservar_proxima()
+        self.assertEqual(tarefa.id, tarefa_id)
+        self.assertIsNone(TarefaPDF.reservar_proxima())
+        self.assertEqual(executar_tarefa(tarefa.id), TarefaPDF.StatusTarefa.CONCLUIDA)
+
+        download = self.client.get(reverse('tarefa_download', args=[tarefa_id]))
+        self.assertEqual(download.status_code, 200)
+        self.assertTrue(b''.join(download.streaming_content).startswith(b'%PDF'))
+
+    def test_tarefa_de_outro_usuario_nao_e_exposta(self):
+        outro = get_user_model().objects.create_user('caixa', password='senha')
+        tarefa = TarefaPDF.enfileirar(TarefaPDF.TipoTarefa.RECIBO, {'remessaID': 1}, responsavel=outro)
+
+        self.assertEqual(self.client.get(reverse('tarefa_status_api', args=[tarefa.id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('tarefa_download', args=[tarefa.id])).status_code, 404)
+
+        admin = get_user_model().objects.create_superuser('admin', password='senha')
+        self.client.force_login(admin)
+        self.assertEqual(self.client.get(reverse('tarefa_status_api', args=[tarefa.id])).status_code, 200)
+
+    def test_erro_no_gerador_fica_registrado(self):
+        tarefa = TarefaPDF.objects.create(
+            tipo=TarefaPDF.TipoTarefa.RECIBO, parametros={'remessaID': 999}
+        )
+        TarefaPDF.reservar_proxima()
+
+        self.assertEqual(executar_tarefa(tarefa.id), TarefaPDF.StatusTarefa.ERRO)
+        tarefa.refresh_from_db()
+        self.assertTrue(tarefa.erro)
+
+    def test_exportacao_de_recibos_gera_zip_com_progresso(self):
+        cliente = Cliente.objects.create(
+            nome_completo='Maria', cpf_cnpj='1', telefone_whatsapp='1',
+            cep='0', cidade='-', estado='SP', bairro='-', rua='-', numero='0',
+        )
+        remessas = [Remessa.objects.create(cliente=cliente, status='FINALIZADO') for _ in range(3)]
+        for remessa in remessas:
+            ItemRemessa.objects.create(remessa=remessa, produto=self.produto, quantidade=1)
+        Remessa.objects.create(cliente=cliente, status='ABERTO')
+
+        hoje = remessas[0].data_saida.date().isoformat()
+        response = self.client.post(
+            reverse('cliente_exportarRecibos'),
+            data=json.dumps({'inicio': hoje, 'fim': hoje, 'status': 'FINALIZADO'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 202)
+        tarefa = TarefaPDF.objects.get(pk=response.json()['tarefa']['id'])
+
+        TarefaPDF.reservar_proxima()
+        with mock.patch.object(geradores, 'exportar_recibos', wraps=geradores.exportar_recibos) as exportar:
+            self.assertEqual(executar_tarefa(tarefa.id), TarefaPDF.StatusTarefa.CONCLUIDA)
+        # Dentro do worker a exportação não abre um segundo pool de processos.
+        self.assertEqual(exportar.call_args.kwargs['processos'], 1)
+
+        status = self.client.get(reverse('tarefa_status_api', args=[tarefa.id])).json()['tarefa']
+        self.assertEqual((status['progresso'], status['total']), (3, 3))
+        download = self.client.get(status['download_url'])
+        self.assertEqual(download['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(b''.join(download.streaming_content))) as arquivo_zip:
+            self.assertEqual(
+                sorted(arquivo_zip.namelist()),
+                sorted(f'recibo_remessa_{r.id}.pdf' for r in remessas),
+            )
+
+    def test_exportacao_recusa_periodo_invalido(self):
+        response = self.client.post(
+            reverse('cliente_exportarRecibos'),
+            data=json.dumps({'inicio': '2025-02-01', 'fim': '2025-01-01'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(TarefaPDF.objects.exists())
+
+
+class PoolQuebradoFalso:
+    """
+    Substitui o ProcessPoolExecutor: executa as tarefas no próprio processo,
+    mas o primeiro pool criado "perde" um processo na primeira tarefa.
+    """
+    criados = 0
+
+    def __init__(self, **kwargs):
+        PoolQuebradoFalso.criados += 1
+        self.quebrado = PoolQuebradoFalso.criados == 1
+
+    def submit(self, funcao, *args):
+        futuro = Future()
+        if self.quebrado:
+            futuro.set_exception(BrokenProcessPool('processo encerrado'))
+        else:
+            futuro.set_result(funcao(*args))
+        return futuro
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class PoolSincrono:
+    """
+    Substitui o ProcessPoolExecutor executando as tarefas no próprio
+    processo. 'ao_executar' é chamado depois de cada tarefa.
+    """
+    ao_executar = None
+
+    def __init__(self, **kwargs):
+        pass
+
+    def submit(self, funcao, *args):
+        futuro = Future()
+        futuro.set_result(funcao(*args))
+        if PoolSincrono.ao_executar:
+            PoolSincrono.ao_executar()
+        return futuro
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class RecuperacaoTarefasTests(TestCase):
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+        configuracao = override_settings(TAREFAS_PDF_DIR=self.diretorio.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def _etiquetas(self):
+        return TarefaPDF.enfileirar(TarefaPDF.TipoTarefa.ETIQUETAS, {'produtos': []})
+
+    def test_tarefa_travada_volta_para_a_fila(self):
+        antiga, recente = self._etiquetas(), self._etiquetas()
+        TarefaPDF.reservar_proxima()
+        TarefaPDF.reservar_proxima()
+        TarefaPDF.objects.filter(pk=antiga.pk).update(iniciada_em=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(TarefaPDF.recuperar_travadas(timedelta(minutes=30)), 1)
+
+        antiga.refresh_from_db()
+        recente.refresh_from_db()
+        self.assertEqual((antiga.status, antiga.iniciada_em), (TarefaPDF.StatusTarefa.PENDENTE, None))
+        self.assertEqual(recente.status, TarefaPDF.StatusTarefa.PROCESSANDO)
+
+    def test_tarefa_em_execucao_nao_e_recuperada(self):
+        tarefa = self._etiquetas()
+        TarefaPDF.reservar_proxima()
+        TarefaPDF.objects.filter(pk=tarefa.pk).update(iniciada_em=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(TarefaPDF.recuperar_travadas(timedelta(minutes=30), ignorar=[tarefa.id]), 0)
+
+    def test_worker_recupera_tarefas_travadas_periodicamente(self):
+        primeira = self._etiquetas()
+        travadas = []
+
+        def outro_worker_morre():
+            # Enquanto o worker roda, outro worker abandona uma tarefa.
+            if not travadas:
+                tarefa = self._etiquetas()
+                TarefaPDF.objects.filter(pk=tarefa.pk).update(
+                    status=TarefaPDF.StatusTarefa.PROCESSANDO, iniciada_em=timezone.now() - timedelta(hours=1)
+                )
+                travadas.append(tarefa)
+
+        with mock.patch.object(processar_tarefas, 'ProcessPoolExecutor', PoolSincrono), \
+                mock.patch.object(processar_tarefas, 'INTERVALO_RECUPERACAO', 0), \
+                mock.patch.object(PoolSincrono, 'ao_executar', staticmethod(outro_worker_morre)):
+            call_command('processar_tarefas', processos=1, uma_vez=True, stdout=io.StringIO())
+
+        primeira.refresh_from_db()
+        travadas[0].refresh_from_db()
+        self.assertEqual(primeira.status, TarefaPDF.StatusTarefa.CONCLUIDA)
+        self.assertEqual(travadas[0].status, TarefaPDF.StatusTarefa.CONCLUIDA)
+
+    def test_tarefa_que_esgotou_as_tentativas_fica_com_erro(self):
+        tarefa = self._etiquetas()
+        for _ in range(TarefaPDF.MAXIMO_TENTATIVAS):
+            TarefaPDF.reservar_proxima()
+            TarefaPDF.devolver_para_fila([tarefa.id], 'processo encerrado')
+
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, TarefaPDF.StatusTarefa.ERRO)
+        self.assertEqual(tarefa.erro, 'processo encerrado')
+
+    def test_worker_recria_o_pool_quebrado(self):
+        tarefa = self._etiquetas()
+        PoolQuebradoFalso.criados = 0
+
+        with mock.patch.object(processar_tarefas, 'ProcessPoolExecutor', PoolQuebradoFalso):
+            call_command('processar_tarefas', processos=1, uma_vez=True, stdout=io.StringIO())
+
+        tarefa.refresh_from_db()
+        self.assertEqual(PoolQuebradoFalso.criados, 2)
+        self.assertEqual(tarefa.status, TarefaPDF.StatusTarefa.CONCLUIDA)
+        self.assertEqual(tarefa.tentativas, 2)
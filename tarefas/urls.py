@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('enfileirar/<str:tipo>/', views.enfileirar_tarefa_api, name='enfileirar_tarefa_api'),
+    path('<int:tarefa_id>/', views.tarefa_status_api, name='tarefa_status_api'),
+    path('<int:tarefa_id>/download/', views.tarefa_download, name='tarefa_download'),
+]
@@ -0,0 +1,97 @@
+import json
+
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_GET, require_POST
+
+from .models import TarefaPDF
+
+
+def dados_tarefa(tarefa):
+    """
+    Representação JSON de uma tarefa, com as URLs de acompanhamento e download.
+    """
+    dados = {
+        'id': tarefa.id,
+        'tipo': tarefa.tipo,
+        'status': tarefa.status,
+        'status_url': reverse('tarefa_status_api', args=[tarefa.id]),
+    }
+    if tarefa.total:
+        dados['progresso'] = tarefa.progresso
+        dados['total'] = tarefa.total
+    if tarefa.status == TarefaPDF.StatusTarefa.CONCLUIDA:
+        dados['download_url'] = reverse('tarefa_download', args=[tarefa.id])
+        dados['nome_arquivo'] = tarefa.nome_arquivo
+    elif tarefa.status == TarefaPDF.StatusTarefa.ERRO:
+        dados['erro'] = tarefa.erro
+    return dados
+
+
+def obter_tarefa(request, tarefa_id):
+    """
+    Busca a tarefa pedida, desde que seja do usuário logado. Quem tem a
+    permissão de ver tarefas (admin) acessa as de todos. Tarefas de outros
+    usuários respondem 404, como se não existissem.
+    """
+    tarefas = TarefaPDF.objects.all()
+    if not request.user.has_perm('tarefas.view_tarefapdf'):
+        tarefas = tarefas.filter(responsavel=request.user)
+    return get_object_or_404(tarefas, pk=tarefa_id)
+
+
+def resposta_tarefa(tarefa, **dados):
+    """
+    Resposta das views que enfileiram uma tarefa: 202 com os dados da tarefa,
+    que o JavaScript acompanha pelo 'status_url' até o arquivo ficar pronto.
+    """
+    return JsonResponse({'status': 'success', **dados, 'tarefa': dados_tarefa(tarefa)}, status=202)
+
+
+@login_required
+@require_POST
+def enfileirar_tarefa_api(request, tipo):
+    """
+    API que registra um pedido de PDF e devolve o ID da tarefa imediatamente.
+    O corpo JSON é o mesmo enviado para a geração direta do PDF.
+    """
+    if tipo not in TarefaPDF.TipoTarefa.values:
+        return JsonResponse({'status': 'error', 'message': 'Tipo de tarefa inválido.'}, status=400)
+
+    try:
+        parametros = json.loads(request.body or '{}')
+    except json.JSONDecodeError as e:
+        return JsonResponse({'status': 'error', 'message': f'Erro nos dados enviados: {e}'}, status=400)
+
+    tarefa = TarefaPDF.enfileirar(tipo, parametros, responsavel=request.user)
+    return resposta_tarefa(tarefa)
+
+
+@login_required
+@require_GET
+def tarefa_status_api(request, tarefa_id):
+    """
+    API de acompanhamento: retorna o status atual da tarefa.
+    """
+    tarefa = obter_tarefa(request, tarefa_id)
+    return JsonResponse({'status': 'success', 'tarefa': dados_tarefa(tarefa)})
+
+
+@login_required
+@require_GET
+def tarefa_download(request, tarefa_id):
+    """
+    Envia o arquivo gerado pela tarefa (PDF ou ZIP), se ela já foi concluída.
+    """
+    tarefa = obter_tarefa(request, tarefa_id)
+    if tarefa.status != TarefaPDF.StatusTarefa.CONCLUIDA or not tarefa.caminho_arquivo.exists():
+        return JsonResponse({'status': 'error', 'message': 'O PDF desta tarefa ainda não está pronto.'}, status=409)
+
+    return FileResponse(
+        open(tarefa.caminho_arquivo, 'rb'),
+        as_attachment=True,
+        filename=tarefa.nome_arquivo or f'tarefa_{tarefa.id}.{tarefa.extensao_arquivo}',
+        content_type='application/zip' if tarefa.extensao_arquivo == 'zip' else 'application/pdf',
+    )